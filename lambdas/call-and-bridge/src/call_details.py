@@ -0,0 +1,108 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+#
+# Indexed view of an event's CallDetails.
+#
+# Handlers used to find a participant by scanning CallDetails.Participants,
+# with a filter() per direction or by assuming the leg they want is
+# Participants[0].  CallDetails indexes the participants by CallId,
+# ParticipantTag and Direction, so a lookup is a dict access however many legs
+# the call has.  Each index is built on its first lookup, in one pass, and
+# sma_event.Event keeps the view for every handler looking at the same event.
+# Participants stay the event's own dicts; nothing is copied.
+#
+# When a CallId, tag or direction appears more than once the first
+# participant wins, as Participants[0] did.
+#
+# This file is shared by the python lambdas - keep the copies identical.
+#
+
+
+def _first_by(participants, field):
+    # reversed, so the first participant with a value is the one kept
+    return {p.get(field): p for p in reversed(participants)}
+
+
+class CallDetails:
+    __slots__ = ('details', 'participants', 'count',
+                 '_by_call_id', '_by_tag', '_by_direction', '_legs')
+
+    def __init__(self, details):
+        self.details = details
+        self.participants = details.get('Participants') or []
+        self.count = len(self.participants)
+        self._by_call_id = None
+        self._by_tag = None
+        self._by_direction = None
+        self._legs = None
+
+    def __len__(self):
+        return self.count
+
+    def by_call_id(self, call_id):
+        if self._by_call_id is None:
+            self._by_call_id = _first_by(self.participants, 'CallId')
+        return self._by_call_id.get(call_id)
+
+    def by_tag(self, tag):
+        if self._by_tag is None:
+            self._by_tag = _first_by(self.participants, 'ParticipantTag')
+        return self._by_tag.get(tag)
+
+    # the first leg with the direction
+    def first(self, direction):
+        if self._by_direction is None:
+            self._by_direction = _first_by(self.participants, 'Direction')
+        return self._by_direction.get(direction)
+
+    # every leg with the direction, in event order
+    def by_direction(self, direction):
+        if self._legs is None:
+            legs = self._legs = {}
+            for p in self.participants:
+                d = p.get('Direction')
+                if d in legs:
+                    legs[d].append(p)
+                else:
+                    legs[d] = [p]
+        return self._legs.get(direction, ())
+
+    # the caller's leg for an inbound call
+    @property
+    def inbound(self):
+        return self.first('Inbound')
+
+    # the first leg the application placed, e.g. by CallAndBridge
+    @property
+    def outbound(self):
+        return self.first('Outbound')
+
+    # the leg the call started with, which is nearly always listed first
+    @property
+    def leg_a(self):
+        participants = self.participants
+        if not participants:
+            return None
+        if participants[0].get('ParticipantTag', 'LEG-A') == 'LEG-A':
+            return participants[0]
+        return self.by_tag('LEG-A') or participants[0]
+
+    @property
+    def leg_b(self):
+        return self.by_tag('LEG-B')
+
@@ -0,0 +1,263 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+#
+# Dial plan for the numbers callers enter with SpeakAndGetDigits.
+#
+# The plan is a text file, read once per container, with a rule per line:
+#
+#   # prefix  rule   options
+#   *         block                      # anything no prefix matches
+#   1         allow  digits=11 ring_seconds=30
+#   1900      block                      # premium rate
+#   44        allow  caller_id=+15555550100
+#
+# A prefix is the leading digits of an E.164 number, without the '+'; the
+# longest prefix of a number picks its rule, and '*' is the rule for numbers
+# no prefix matches (block, when the plan has none).  Options:
+#   digits        how many digits the number has, without the '+', as 11 or
+#                 10-12; numbers of another length are blocked
+#   ring_seconds  how long the number may ring, CallTimeoutSeconds (1 - 120)
+#   caller_id     the E.164 number to call from, instead of the caller's
+# A '#' starts a comment, to the end of the line; anything else that is not
+# an option is an error.
+#
+# normalize() turns what the caller entered into E.164: spaces and
+# punctuation are dropped, then a leading '+', or '00' or '011' (the ITU and
+# North American international prefixes), and what is left must be 3 to 15
+# digits.
+#
+# The prefixes are held in a PrefixTrie.  Plans can have millions of
+# prefixes, which as nested dicts (a dict per digit) would not fit a lambda's
+# memory, so the trie keeps only its rule nodes, in one dict keyed by their
+# path - the prefix, as an int.  A lookup walks down the number one prefix
+# length at a time, longest first, and only the lengths some prefix has: a
+# division and a dict lookup each.  Rules with the same options are shared,
+# so a million prefixes take about 70 bytes each, a tenth of nested dicts
+# (python3 test/dial-plan-bench.py).
+#
+# Environment:
+#   DIAL_PLAN_FILE  the plan, default dial_plan.txt next to this file
+#
+
+from collections import namedtuple
+import os
+import re
+
+default_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dial_plan.txt')
+
+# the longest number E.164 allows, and the shortest this plan accepts
+max_digits = 15
+min_digits = 3
+
+Rule = namedtuple('Rule', ['allow', 'ring_seconds', 'caller_id', 'digits'], defaults=[None, None, None])
+
+BLOCK = Rule(False)
+
+
+class DialPlanError(ValueError):
+    pass
+
+
+_punctuation = re.compile(r'[\s().\-/]')
+
+
+# ASCII digits, not starting with a 0, as E.164 numbers and their prefixes are
+def _e164_digits(s):
+    return s.isdigit() and s.isascii() and s[0] != '0' and len(s) <= max_digits
+
+
+# E.164 for the digits a caller entered, e.g. '0044 20 7946 0000' -> '+442079460000'
+def normalize(digits):
+    number = digits if digits and digits.isdigit() else _punctuation.sub('', digits or '')
+    if number.startswith('+'):
+        number = number[1:]
+    elif number.startswith('011'):
+        number = number[3:]
+    elif number.startswith('00'):
+        number = number[2:]
+
+    if len(number) < min_digits or not _e164_digits(number):
+        raise DialPlanError(f"{digits!r} is not an E.164 number")
+
+    return '+' + number
+
+
+_powers = [10 ** i for i in range(max_digits + 1)]
+
+
+class PrefixTrie:
+    def __init__(self):
+        self.nodes = {}
+        self.lengths = ()
+
+    def __len__(self):
+        return len(self.nodes)
+
+    @property
+    def lengths(self):
+        return self._lengths
+
+    # the prefix lengths, longest first, and for each length of number the
+    # (length, divisor) that takes each of them off it
+    @lengths.setter
+    def lengths(self, lengths):
+        self._lengths = tuple(sorted(lengths, reverse=True))
+        self._probes = [tuple((length, _powers[n - length]) for length in self._lengths if length <= n)
+                        for n in range(max_digits + 1)]
+
+    def insert(self, prefix, value):
+        if not _e164_digits(prefix):
+            raise DialPlanError(f"bad prefix {prefix!r}")
+
+        self.nodes[int(prefix)] = value
+        if len(prefix) not in self._lengths:
+            self.lengths = (*self._lengths, len(prefix))
+
+    # (prefix, value) for the longest prefix of digits (at most max_digits of
+    # them), or (None, None)
+    def longest_match(self, digits):
+        number = int(digits)
+        nodes = self.nodes
+        for length, divisor in self._probes[len(digits)]:
+            value = nodes.get(number // divisor)
+            if value is not None:
+                return digits[:length], value
+
+        return None, None
+
+
+class DialPlan:
+    def __init__(self, trie=None, default=BLOCK):
+        self.trie = PrefixTrie() if trie is None else trie
+        self.default = default
+
+    def __len__(self):
+        return len(self.trie)
+
+    # (prefix, rule) for an E.164 number, the prefix None for the default rule
+    def rule(self, number):
+        prefix, rule = self.trie.longest_match(number[1:])
+        if rule is None:
+            rule = self.default
+        if rule.digits is not None and not rule.digits[0] <= len(number) - 1 <= rule.digits[1]:
+            return prefix, BLOCK
+
+        return prefix, rule
+
+    # (fewest, most) digits of the numbers the plan can allow, for the input
+    # to collect
+    def lengths(self):
+        allowed = [rule.digits or (min_digits, max_digits)
+                   for rule in {self.default, *self.trie.nodes.values()} if rule.allow]
+        if not allowed:
+            return min_digits, max_digits
+
+        return min(lo for lo, _ in allowed), max(hi for _, hi in allowed)
+
+    # (number, prefix, rule) for the digits a caller entered
+    def check(self, digits):
+        number = normalize(digits)
+        prefix, rule = self.rule(number)
+        return number, prefix, rule
+
+
+def _ring_seconds(value):
+    seconds = int(value)
+    if not 1 <= seconds <= 120:
+        raise ValueError(f"ring_seconds {seconds} is not 1 - 120")
+    return seconds
+
+
+def _digits(value):
+    lo, _, hi = value.partition('-')
+    lo, hi = int(lo), int(hi or lo)
+    if not min_digits <= lo <= hi <= max_digits:
+        raise ValueError(f"digits {value} is not {min_digits} - {max_digits}")
+    return lo, hi
+
+
+_options = {
+    'digits': _digits,
+    'ring_seconds': _ring_seconds,
+    'caller_id': normalize,
+}
+
+
+def _rule(fields, rules):
+    action = fields[0]
+    if action not in ('allow', 'block'):
+        raise ValueError(f"rule {action!r} is not allow or block")
+
+    options = {}
+    for field in fields[1:]:
+        name, eq, value = field.partition('=')
+        if not eq:
+            raise ValueError(f"expected an option, not {field!r}")
+        if name not in _options:
+            raise ValueError(f"unknown option {name!r}")
+        options[name] = _options[name](value)
+
+    key = (action, tuple(sorted(options.items())))
+    rule = rules.get(key)
+    if rule is None:
+        rule = rules[key] = Rule(action == 'allow', **options)
+    return rule
+
+
+# Read a plan from lines of text; name is only used in errors
+def parse(lines, name='<plan>'):
+    plan = DialPlan()
+    nodes = plan.trie.nodes
+    lengths = set()
+    # the rule for each rule column seen, and a rule per distinct set of
+    # options, shared by every prefix that has it
+    columns = {}
+    rules = {}
+    for lineno, line in enumerate(lines, 1):
+        fields = line.partition('#')[0].split()
+        if not fields:
+            continue
+
+        column = tuple(fields[1:])
+        rule = columns.get(column)
+        if rule is None:
+            if not column:
+                raise DialPlanError(f"{name}:{lineno}: expected a prefix and a rule")
+            try:
+                rule = columns[column] = _rule(column, rules)
+            except ValueError as err:
+                raise DialPlanError(f"{name}:{lineno}: {err}") from None
+
+        prefix = fields[0]
+        if prefix == '*':
+            plan.default = rule
+            continue
+        # PrefixTrie.insert(), keeping the lengths until the end
+        if not _e164_digits(prefix):
+            raise DialPlanError(f"{name}:{lineno}: bad prefix {prefix!r}")
+        nodes[int(prefix)] = rule
+        lengths.add(len(prefix))
+
+    plan.trie.lengths = lengths
+    return plan
+
+
+def load(path=None):
+    path = path or os.getenv('DIAL_PLAN_FILE') or default_file
+    with open(path) as f:
+        return parse(f, path)
@@ -16,13 +16,19 @@
 #
 
 from copy import deepcopy
-import json
-import logging
 import os
 
+import dial_plan
+import sma_event
+import sma_log
+import sma_metrics
+import sma_profile
+import sma_router
+import sma_schema
+
 
 # Set LogLevel using environment variable, fallback to INFO if not present
-logger = logging.getLogger()
+logger = sma_log.logger
 log_level = os.getenv('LogLevel', 'INFO')
 if log_level not in ['INFO', 'DEBUG']:
     log_level = 'INFO'
@@ -35,6 +41,17 @@ log_prefix = ''
 #
 wav_file_bucket = os.getenv('WAVFILE_BUCKET', None)
 
+# which numbers may be called, read once per container (DIAL_PLAN_FILE)
+plan = dial_plan.load()
+
+# what SpeakAndGetDigits collects: as many digits as the numbers the dial
+# plan can allow, with room for a 011 international prefix (a keypad has no
+# '+').  The plan decides which numbers are called.
+destination_min_digits, destination_max_digits = plan.lengths()
+destination_max_digits += len('011')
+destination_regex = f"^[0-9]{{{destination_min_digits},{destination_max_digits}}}$"
+destination_prompt = "Please enter the number you would like to call, with its country code, followed by the pound key"
+
 
 # To read more on customizing the Pause action, see https://docs.aws.amazon.com/chime/latest/dg/pause.html
 def pause_action(call_id=None):
@@ -71,8 +88,8 @@ def speak_and_get_digits_action(call_id, regex, speak_text):
                 'TextType': "ssml",
                 'VoiceId': "Joanna"
             },
-            'MinNumberOfDigits': 11,
-            'MaxNumberOfDigits': 11,
+            'MinNumberOfDigits': destination_min_digits,
+            'MaxNumberOfDigits': destination_max_digits,
             'TerminatorDigits': ['#'],
             'InBetweenDigitsDurationInMilliseconds': 5000,
             'Repeat': 3,
@@ -106,11 +123,11 @@ def receive_digits_action(call_id):
 
 
 # To read more on customizing the CallAndBridge action, see https://docs.aws.amazon.com/chime/latest/dg/call-and-bridge.html
-def call_and_bridge_action(caller_id, destination):
+def call_and_bridge_action(caller_id, destination, ring_seconds=None):
     return {
         'Type': 'CallAndBridge',
         'Parameters': {
-            'CallTimeoutSeconds': 30,
+            'CallTimeoutSeconds': ring_seconds or 30,
             'CallerIdNumber': caller_id,
             'RingbackTone': {
                 'Type': "S3",
@@ -141,80 +158,72 @@ def response(*actions):
 
 
 # For new incoming calls, speak a greeting and collect digits of destination number.
-# Regex for digits entered allows US calling, except for premium rate numbers
 def new_call_handler(e):
-    call_id = e['CallDetails']['Participants'][0]['CallId']
+    call_id = sma_event.of(e).call.leg_a['CallId']
 
-    logger.info('SEND {} {}'.format(
-        log_prefix, 'Sending PlayAndGetDigits action to get Destination Number'))
+    logger.info('SEND %s %s',
+        log_prefix, 'Sending PlayAndGetDigits action to get Destination Number')
 
     return response(
         pause_action(call_id),
-        speak_and_get_digits_action(
-            call_id,
-            "^[1][0-9][0-9][0-9][0-9][0-9][0-9][0-9][0-9][0-9][0-9]",
-            "<speak>Hello!  Please enter the number you would like to call, starting with a one followed by ten digits</speak>"
-        ))
+        speak_and_get_digits_action(call_id, destination_regex, f"<speak>Hello!  {destination_prompt}</speak>"))
 
 
+# Bridge the call to the number entered, if the dial plan allows it, or ask
+# for another number
 def place_call(e):
-    call_id = e['CallDetails']['Participants'][0]['CallId']
-    from_number = e['CallDetails']['Participants'][0]['From']
-    received_digits = f"+{e['ActionData']['ReceivedDigits']}"
+    ev = sma_event.of(e)
+    if ev.action.digits is None:
+        return response()
+
+    caller = ev.call.leg_a
+    call_id = caller['CallId']
+    try:
+        number, prefix, rule = plan.check(ev.action.digits)
+    except dial_plan.DialPlanError as err:
+        logger.info("not calling: %s", err)
+        rule = dial_plan.BLOCK
+    else:
+        if rule.allow:
+            logger.debug("calling %s, dial plan prefix %s", number, prefix or '*')
+        else:
+            logger.info("blocked %s, dial plan prefix %s", number, prefix or '*')
+
+    if not rule.allow:
+        return response(
+            pause_action(call_id),
+            speak_and_get_digits_action(
+                call_id, destination_regex, f"<speak>Sorry, that number can not be called.  {destination_prompt}</speak>"))
 
-    return [
+    return response(
         pause_action(call_id),
-        call_and_bridge_action(from_number, received_digits)
-    ]
+        call_and_bridge_action(rule.caller_id or caller['From'], number, rule.ring_seconds))
 
 
 def connect_call(e):
-    caller = list(filter(lambda p: p['Direction'] ==
-                  "Inbound", e['CallDetails']['Participants']))[0]
-    recipient = list(filter(
-        lambda p: p['Direction'] == "Outbound", e['CallDetails']['Participants']))[0]
-
-    return [voicefocus_action(caller['CallId'], False),
-            voicefocus_action(recipient['CallId'], False),
-            receive_digits_action(caller['CallId'])
-            ]
-
+    call = sma_event.of(e).call
+    caller = call.inbound
+    recipient = call.outbound
 
-# If we receive an ACTION_SUCCESSFUL event we can take further actions,
-# or default to responding with a NoOp (empty set of actions)
-action_handlers = {
-    'SpeakAndGetDigits': place_call,
-    'CallAndBridge': connect_call,
-    # 'ReceiveDigits': _,
-    # 'VoiceFocus': _
-}
-def action_succesful_handler(e):
-    actions = []
-
-    try:
-        actions = action_handlers[e['ActionData']['Type']](e)
-    except KeyError:
-        pass
-    except Exception as err:
-        logger.error('Exception with Action Handler. Error: ', exc_info=err)
-    
-    return response(*actions)
+    return response(
+        voicefocus_action(caller['CallId'], False),
+        voicefocus_action(recipient['CallId'], False),
+        receive_digits_action(caller['CallId']))
 
 
 def digits_recevied_handler(e):
     actions = []
 
     try:
-        if (e['ActionData']['Type'] != 'ReceivedDigits'):
+        ev = sma_event.of(e)
+        if (ev.action_type != 'ReceivedDigits'):
             raise Exception('Action Type is not ReceivedDigits')
 
-        caller = list(filter(
-            lambda p: p['Direction'] == "Inbound", e['CallDetails']['Participants']))[0]
-        recipient = list(filter(
-            lambda p: p['Direction'] == "Outbound", e['CallDetails']['Participants']))[0]
+        caller = ev.call.inbound['CallId']
+        recipient = ev.call.outbound['CallId']
 
-        disable = e['ActionData']['ReceivedDigits'] == "0"
-        enable = e['ActionData']['ReceivedDigits'] == "1"
+        disable = ev.action.digits == "0"
+        enable = ev.action.digits == "1"
 
         if not(disable ^ enable):
             raise Exception('digit not [0|1]')
@@ -231,23 +240,26 @@ def digits_recevied_handler(e):
     return response(*actions)
 
 
-# message - handler mapping table
-event_handlers = {
-    'NEW_INBOUND_CALL': new_call_handler,
-    'ACTION_SUCCESSFUL': action_succesful_handler,
-    'DIGITS_RECEIVED': digits_recevied_handler,
-    # 'HANGUP': response()
-}
+# message - handler routing table.  Any other event, like an ACTION_SUCCESSFUL
+# for ReceiveDigits or VoiceFocus, or a HANGUP, gets a NoOp (empty set of actions)
+router = sma_router.Router({
+    ('NEW_INBOUND_CALL', sma_router.ANY, sma_router.ANY): new_call_handler,
+    ('ACTION_SUCCESSFUL', 'SpeakAndGetDigits', sma_router.ANY): place_call,
+    ('ACTION_SUCCESSFUL', 'CallAndBridge', sma_router.ANY): connect_call,
+    ('DIGITS_RECEIVED', sma_router.ANY, sma_router.ANY): digits_recevied_handler,
+})
+@sma_profile.profiled
 def handler(event, context):
-    logger.info(f"called with {json.dumps(event, indent=2)}")
-
-    resp = response()
-    try:
-        resp = event_handlers[event['InvocationEventType']](event)
-    except KeyError:
-        pass
-    except Exception as e:
-        logger.error(f"exception in Event Handler:", exc_info=e)
-
-    logger.info(f"returning {json.dumps(resp, indent=2)}")
-    return resp
+    with sma_log.invocation(event):
+        logger.info("called with event", extra={'data': event})
+
+        resp = response()
+        try:
+            if sma_schema.check_event(event):
+                resp = router.dispatch(event)
+        except Exception as e:
+            logger.error(f"exception in Event Handler:", exc_info=e)
+
+        resp = sma_schema.check_response(resp)
+        logger.info("returning response", extra={'data': resp})
+        return resp
@@ -20,7 +20,6 @@ from ast import expr_context
 from cmath import exp
 from copy import deepcopy
 import json
-from jsonschema import validate
 import os
 import unittest
 from unittest.mock import MagicMock, patch
@@ -28,6 +27,8 @@ import sys
 
 import boto3
 
+import sma_schema
+
 
 class Test_Call_And_Bridge(unittest.TestCase):
     bucket_env_var = "WAVFILE_BUCKET"
@@ -40,10 +41,10 @@ class Test_Call_And_Bridge(unittest.TestCase):
             self.test_event = json.load(f)
 
         with open("./test/cases/basic/basic-schema.json") as f:
-            self.basic_schema = json.load(f)
+            self.basic_schema = sma_schema.compile(json.load(f))
 
         with open("./test/cases/new-call/new-call-schema.json") as f:
-            self.new_call_schema = json.load(f)
+            self.new_call_schema = sma_schema.compile(json.load(f))
 
     def setUp(self) -> None:
         super().setUp()
@@ -63,7 +64,7 @@ class Test_Call_And_Bridge(unittest.TestCase):
 
     def check_validate(self, d, s):
         try:
-            validate(instance=d, schema=s)
+            s(d)
             self.assertTrue(True)
         except Exception as e:
             self.assertTrue(False, e)
@@ -222,6 +223,19 @@ class Test_Call_And_Bridge(unittest.TestCase):
                             self.check_call_and_bridge
                             ])
 
+    def test_action_successful_speak_get_digits_blocked(self):
+        event = deepcopy(self.test_event)
+        event['InvocationEventType'] = "ACTION_SUCCESSFUL"
+        # premium rate, so the dial plan asks for another number
+        event['ActionData'] = {'Type': 'SpeakAndGetDigits',
+                               'ReceivedDigits': "19005551212"}
+
+        self.call_and_test(event,
+                           [self.check_schema_10,
+                            self.check_pause,
+                            self.check_speak_collect_digits
+                            ])
+
     def test_action_successful_call_and_bridge(self):
         event = deepcopy(self.test_event)
         event['InvocationEventType'] = "ACTION_SUCCESSFUL"
@@ -288,6 +302,13 @@ class Test_Call_And_Bridge(unittest.TestCase):
         self.go_digits_received(
             "1", [self.check_schema_10, self.check_voice_focus, self.check_receive_digits])
 
+    def check_call_ids(self, d):
+        caller = self.test_event['CallDetails']['Participants'][0]['CallId']
+        self.assertEqual([a['Parameters']['CallId'] for a in d['Actions']], [caller] * 3)
+
+    def test_digits_received_call_ids(self):
+        self.go_digits_received("1", [self.check_call_ids])
+
     def test_digits_received_N(self):
         self.go_digits_received("7", [self.check_schema_10])
 
@@ -0,0 +1,78 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+import json
+import unittest
+
+import call_details
+
+
+class Test_Call_Details(unittest.TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+
+        with open("../events/inbound.json") as f:
+            self.event = json.load(f)
+        self.caller = self.event['CallDetails']['Participants'][0]
+
+    def add_leg(self, **fields):
+        leg = dict(self.caller, **fields)
+        self.event['CallDetails']['Participants'].append(leg)
+        return leg
+
+    def test_lookups(self):
+        first = self.add_leg(CallId="leg-b", ParticipantTag="LEG-B", Direction="Outbound")
+        second = self.add_leg(CallId="leg-c", ParticipantTag="LEG-C", Direction="Outbound")
+        call = call_details.CallDetails(self.event['CallDetails'])
+
+        self.assertEqual(len(call), 3)
+        self.assertIs(call.inbound, self.caller)
+        self.assertIs(call.outbound, first)
+        self.assertEqual(list(call.by_direction("Outbound")), [first, second])
+        self.assertEqual(call.by_direction("Sideways"), ())
+        self.assertIs(call.by_call_id("leg-c"), second)
+        self.assertIsNone(call.by_call_id("missing"))
+        self.assertIs(call.by_tag("LEG-B"), first)
+        self.assertIs(call.leg_a, self.caller)
+        self.assertIs(call.leg_b, first)
+
+    def test_first_participant_wins(self):
+        # the same CallId and tag, as the call-and-bridge tests build a recipient
+        recipient = self.add_leg(Direction="Outbound")
+        call = call_details.CallDetails(self.event['CallDetails'])
+
+        self.assertIs(call.by_call_id(self.caller['CallId']), self.caller)
+        self.assertIs(call.by_tag("LEG-A"), self.caller)
+        self.assertIs(call.outbound, recipient)
+
+    def test_leg_a_not_first(self):
+        self.caller['ParticipantTag'] = "LEG-B"
+        leg_a = self.add_leg(CallId="leg-a", ParticipantTag="LEG-A")
+        self.assertIs(call_details.CallDetails(self.event['CallDetails']).leg_a, leg_a)
+
+    def test_no_participants(self):
+        self.event['CallDetails']['Participants'] = []
+        call = call_details.CallDetails(self.event['CallDetails'])
+        self.assertIsNone(call.leg_a)
+        self.assertIsNone(call.inbound)
+
+        self.assertIsNone(call_details.CallDetails({}).outbound)
+
+
+if __name__ == '__main__':
+    unittest.main()
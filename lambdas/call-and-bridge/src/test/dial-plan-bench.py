@@ -0,0 +1,156 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+#
+# Dial plan load time, memory and lookups for a plan of a million prefixes
+# (random, 4 - 9 digits, none starting with 1, a few distinct rules), written to a temporary file:
+#
+#   load        dial_plan.load() of the file, as at a cold start
+#   memory      what the loaded plan holds (tracemalloc), and per prefix
+#   check       plan.check() of entered digits: normalize, then the longest
+#               prefix - a number under a plan prefix, and one under none,
+#               which probes every prefix length
+#
+# and the same prefixes (up to 100k of them) in a nested dict trie, a dict
+# per digit, for memory and lookup time against dial_plan.PrefixTrie.
+#
+# Run from the src directory:
+#   python3 test/dial-plan-bench.py [prefixes] [iterations]
+#
+
+import os
+import random
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.getcwd())
+
+import dial_plan
+
+OPTIONS = ['', '', '', 'ring_seconds=20', 'caller_id=+12065550100', 'ring_seconds=60 caller_id=+12065550101']
+
+
+def prefixes(count, rng):
+    seen = set()
+    while len(seen) < count:
+        length = rng.randrange(4, 10)
+        seen.add(str(rng.randrange(2 * 10 ** (length - 1), 10 ** length)))
+    return sorted(seen)
+
+
+def write_plan(path, plan_prefixes, rng):
+    with open(path, 'w') as f:
+        f.write("*  block\n")
+        for p in plan_prefixes:
+            f.write(f"{p}  {rng.choice(['allow', 'block'])}  {rng.choice(OPTIONS)}\n")
+
+
+class NestedTrie:
+    def __init__(self):
+        self.root = {}
+
+    def insert(self, prefix, value):
+        node = self.root
+        for digit in prefix:
+            node = node.setdefault(digit, {})
+        node[None] = value
+
+    def longest_match(self, digits):
+        node, match = self.root, (None, None)
+        for i, digit in enumerate(digits):
+            node = node.get(digit)
+            if node is None:
+                break
+            if None in node:
+                match = digits[:i + 1], node[None]
+        return match
+
+
+def measured(build):
+    tracemalloc.start()
+    start = time.perf_counter()
+    built = build()
+    seconds = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return built, seconds, size
+
+
+def per_call(fn, arg, number):
+    return min(timeit.repeat(lambda: fn(arg), number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    number = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    rng = random.Random(42)
+
+    plan_prefixes = prefixes(count, rng)
+    hit = rng.choice(plan_prefixes).ljust(11, '5')
+    # no prefix starts with a 1, so this one probes every prefix length
+    miss = '1' + hit[1:]
+    fd, path = tempfile.mkstemp(suffix='.txt')
+    os.close(fd)
+    try:
+        write_plan(path, plan_prefixes, rng)
+        # time the load alone, then measure its memory
+        start = time.perf_counter()
+        plan = dial_plan.load(path)
+        load_s = time.perf_counter() - start
+        plan, _, size = measured(lambda: dial_plan.load(path))
+    finally:
+        os.remove(path)
+
+
+    print(f"{len(plan)} prefixes: load {load_s:.2f} s, {size / 2 ** 20:.0f} MiB, {size / len(plan):.0f} bytes/prefix")
+    print(f"{'check':<10} {'us':>7}")
+    for name, digits in [('prefix', hit), ('default', miss), ('normalize', None)]:
+        if digits is None:
+            us = per_call(dial_plan.normalize, "011" + hit, number)
+        else:
+            us = per_call(plan.check, digits, number)
+        print(f"{name:<10} {us:>7.2f}")
+
+    # the same prefixes, both ways, for a set small enough to hold as nested dicts
+    subset = plan_prefixes[::max(len(plan_prefixes) // 100000, 1)]
+    rule = dial_plan.Rule(True)
+
+    def flat():
+        trie = dial_plan.PrefixTrie()
+        for p in subset:
+            trie.insert(p, rule)
+        return trie
+
+    def nested():
+        trie = NestedTrie()
+        for p in subset:
+            trie.insert(p, rule)
+        return trie
+
+    digits = subset[len(subset) // 2].ljust(11, '5')
+    print(f"\n{len(subset)} prefixes  {'build s':>8} {'bytes/prefix':>13} {'lookup us':>10}")
+    for name, build in [('PrefixTrie', flat), ('nested', nested)]:
+        trie, seconds, size = measured(build)
+        assert trie.longest_match(digits)[0] is not None
+        print(f"{name:<17} {seconds:>8.2f} {size / len(subset):>13.0f} {per_call(trie.longest_match, digits, number):>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
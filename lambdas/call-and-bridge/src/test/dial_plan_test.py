@@ -0,0 +1,184 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+import io
+import os
+import re
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import dial_plan
+from dial_plan import DialPlanError, PrefixTrie, Rule
+
+
+PLAN = """
+# prefix  rule   options
+*         block
+1         allow  ring_seconds=30
+1900      block  # premium rate
+44        allow  caller_id=+1-206-555-0100 ring_seconds=20
+4420      allow
+"""
+
+
+class Test_Dial_Plan(unittest.TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.plan = dial_plan.parse(PLAN.splitlines())
+
+    def test_normalize(self):
+        for digits, number in [("12125551212", "+12125551212"),
+                               ("+1 (212) 555-1212", "+12125551212"),
+                               ("0044 20 7946 0000", "+442079460000"),
+                               ("011442079460000", "+442079460000"),
+                               ("1" * 15, "+" + "1" * 15)]:
+            with self.subTest(digits=digits):
+                self.assertEqual(dial_plan.normalize(digits), number)
+
+        for digits in [None, "", "12", "1" * 16, "+0123456789", "1212555121a", "++12125551212"]:
+            with self.subTest(digits=digits), self.assertRaises(DialPlanError):
+                dial_plan.normalize(digits)
+
+    def test_longest_prefix(self):
+        self.assertEqual(self.plan.check("12125551212"), ("+12125551212", "1", Rule(True, 30)))
+        self.assertEqual(self.plan.check("19005551212"), ("+19005551212", "1900", Rule(False)))
+        self.assertEqual(self.plan.check("00442079460000"),
+                         ("+442079460000", "4420", Rule(True)))
+        self.assertEqual(self.plan.check("00441619460000"),
+                         ("+441619460000", "44", Rule(True, 20, "+12065550100")))
+        # no prefix, the '*' rule
+        self.assertEqual(self.plan.check("0033142685300"), ("+33142685300", None, Rule(False)))
+
+    def test_rules_are_shared(self):
+        plan = dial_plan.parse(["1 allow", "2 allow", "3 block # x", "4 block", "5 allow ring_seconds=5",
+                                "6 allow ring_seconds=5"])
+        self.assertIs(plan.rule("+1")[1], plan.rule("+2")[1])
+        self.assertIs(plan.rule("+3")[1], plan.rule("+4")[1])
+        self.assertIs(plan.rule("+5")[1], plan.rule("+6")[1])
+
+    def test_default_blocks(self):
+        plan = dial_plan.parse(["1 allow"])
+        self.assertEqual(plan.check("442079460000")[2], dial_plan.BLOCK)
+        self.assertEqual(len(plan), 1)
+
+    def test_bad_plans(self):
+        for lines in [["1"], ["1 maybe"], ["01 allow"], ["1x allow"], ["1" * 16 + " allow"],
+                      ["1 allow ring_seconds=0"], ["1 allow ring_seconds=x"], ["1 allow caller_id=12"],
+                      ["1 allow color=red"], ["1 allow digits=2"], ["1 allow digits=12-11"],
+                      ["1 allow digits=x"], ["1 block premium ring_seconds=5"], ["1 allow ring_seconds=5 x"]]:
+            with self.subTest(lines=lines), self.assertRaisesRegex(DialPlanError, r"^test:1: "):
+                dial_plan.parse(lines, 'test')
+
+    def test_digits(self):
+        plan = dial_plan.parse(["1 allow digits=11", "44 allow digits=10-12 # UK", "7 block"])
+        self.assertTrue(plan.check("12125551212")[2].allow)
+        for digits in ["1234", "121255512120"]:
+            with self.subTest(digits=digits):
+                self.assertEqual(plan.check(digits), ("+" + digits, "1", dial_plan.BLOCK))
+        self.assertTrue(plan.check("442079460000")[2].allow)
+        self.assertEqual(plan.lengths(), (10, 12))
+
+        self.assertEqual(dial_plan.parse(["* allow", "1 allow digits=11"]).lengths(),
+                         (dial_plan.min_digits, dial_plan.max_digits))
+        self.assertEqual(dial_plan.parse(["1 block"]).lengths(), (dial_plan.min_digits, dial_plan.max_digits))
+
+    def test_trie(self):
+        trie = PrefixTrie()
+        for prefix in ["1", "12", "123", "99"]:
+            trie.insert(prefix, prefix)
+        self.assertEqual(trie.lengths, (3, 2, 1))
+        self.assertEqual(trie.longest_match("1234"), ("123", "123"))
+        self.assertEqual(trie.longest_match("1299"), ("12", "12"))
+        self.assertEqual(trie.longest_match("12"), ("12", "12"))
+        self.assertEqual(trie.longest_match("9"), (None, None))
+        self.assertEqual(trie.longest_match("5123"), (None, None))
+
+    def test_shipped_plan(self):
+        plan = dial_plan.load(dial_plan.default_file)
+        self.assertTrue(plan.check("12125551212")[2].allow)
+        self.assertFalse(plan.check("1234")[2].allow)
+        self.assertFalse(plan.check("19005551212")[2].allow)
+        self.assertFalse(plan.check("12425551212")[2].allow)
+        self.assertFalse(plan.check("442079460000")[2].allow)
+        self.assertEqual(plan.lengths(), (11, 11))
+
+
+class Test_Place_Call(unittest.TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+
+        fd, self.path = tempfile.mkstemp(suffix='.txt')
+        with os.fdopen(fd, 'w') as f:
+            f.write(PLAN)
+        os.environ['DIAL_PLAN_FILE'] = self.path
+        os.environ['WAVFILE_BUCKET'] = "fake-bucket"
+        import index
+        self.index = index
+
+    def tearDown(self) -> None:
+        os.environ.pop('DIAL_PLAN_FILE', None)
+        os.environ.pop('WAVFILE_BUCKET', None)
+        os.remove(self.path)
+        sys.modules.pop('index', None)
+
+        super().tearDown()
+
+    def place_call(self, digits):
+        event = {'InvocationEventType': "ACTION_SUCCESSFUL",
+                 'ActionData': {'Type': "SpeakAndGetDigits", 'ReceivedDigits': digits},
+                 'CallDetails': {'Participants': [{'CallId': "call-a", 'ParticipantTag': "LEG-A",
+                                                   'From': "+12065550199", 'Direction': "Inbound"}]}}
+        with patch('sys.stdout', io.StringIO()):
+            return self.index.handler(event, None)['Actions']
+
+    def test_loaded_from_dial_plan_file(self):
+        self.assertEqual(len(self.index.plan), 4)
+
+    def test_allowed(self):
+        _, bridge = self.place_call("011442079460000")
+        self.assertEqual(bridge['Type'], "CallAndBridge")
+        self.assertEqual(bridge['Parameters']['Endpoints'][0]['Uri'], "+442079460000")
+        self.assertEqual(bridge['Parameters']['CallerIdNumber'], "+12065550199")
+        self.assertEqual(bridge['Parameters']['CallTimeoutSeconds'], 30)
+
+    def test_rule_options(self):
+        _, bridge = self.place_call("441619460000")
+        self.assertEqual(bridge['Parameters']['CallerIdNumber'], "+12065550100")
+        self.assertEqual(bridge['Parameters']['CallTimeoutSeconds'], 20)
+
+    def test_collected_digits_reach_the_plan(self):
+        regex = re.compile(self.index.destination_regex)
+        for digits in ["12125551212", "011442079460000", "00442079460000", "441619460000", "19005551212"]:
+            with self.subTest(digits=digits):
+                self.assertRegex(digits, regex)
+        self.assertNotRegex("12", regex)
+        self.assertNotRegex("0" * 19, regex)
+
+    def test_blocked_asks_again(self):
+        for digits in ["19005551212", "33142685300", "12"]:
+            with self.subTest(digits=digits):
+                _, ask = self.place_call(digits)
+                self.assertEqual(ask['Type'], "SpeakAndGetDigits")
+                self.assertIn("can not be called", ask['Parameters']['SpeechParameters']['Text'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+#
+# Micro-benchmark of the indexed CallDetails (call_details.py, by way of
+# sma_event.py) against the filter()-per-direction lookups connect_call and
+# digits_recevied_handler used to make, for calls with more and more
+# participants.
+#
+# Run from the src directory:
+#   python3 test/participants-bench.py [iterations] [participants ...]
+#
+
+from contextlib import redirect_stdout
+from copy import deepcopy
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.getcwd())
+
+import index
+import sma_event
+
+
+#
+# the original lookups, copied from the handlers (digits_recevied_handler
+# passed whole participants as CallIds, here it passes the CallId)
+#
+def connect_call(e):
+    caller = list(filter(lambda p: p['Direction'] ==
+                  "Inbound", e['CallDetails']['Participants']))[0]
+    recipient = list(filter(
+        lambda p: p['Direction'] == "Outbound", e['CallDetails']['Participants']))[0]
+
+    return index.response(
+        index.voicefocus_action(caller['CallId'], False),
+        index.voicefocus_action(recipient['CallId'], False),
+        index.receive_digits_action(caller['CallId']))
+
+
+def digits_recevied_handler(e):
+    caller = list(filter(
+        lambda p: p['Direction'] == "Inbound", e['CallDetails']['Participants']))[0]
+    recipient = list(filter(
+        lambda p: p['Direction'] == "Outbound", e['CallDetails']['Participants']))[0]
+
+    enable = e['ActionData']['ReceivedDigits'] == "1"
+
+    return index.response(
+        index.voicefocus_action(caller['CallId'], enable),
+        index.voicefocus_action(recipient['CallId'], enable),
+        index.receive_digits_action(caller['CallId'])
+    )
+
+
+# An inbound caller and count - 1 outbound legs, the one connect_call wants last
+def multi_leg_event(base, count):
+    event = deepcopy(base)
+    caller = event['CallDetails']['Participants'][0]
+    legs = [caller]
+    for i in range(1, count):
+        leg = dict(caller, CallId=f"leg-{i}", ParticipantTag=f"LEG-{i}", Direction="Outbound")
+        legs.append(leg)
+    # callers are scanned from the front, so keep the one being looked for at the back
+    legs[1:] = legs[:0:-1]
+    event['CallDetails']['Participants'] = legs
+
+    return event
+
+
+def bench(f, event, number, fresh):
+    def call():
+        if fresh:
+            # a new event: the index is built again
+            sma_event._event = None
+        f(event)
+
+    return min(timeit.repeat(call, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    counts = [int(n) for n in sys.argv[2:]] or [2, 10, 100, 1000]
+
+    with open("../events/inbound.json") as f:
+        base = json.load(f)
+
+    print(f"{'handler':<24} {'legs':>6} {'filter us':>10} {'index us':>10} {'cached us':>10} {'speedup':>8}")
+    for count in counts:
+        event = multi_leg_event(base, count)
+        event['ActionData'] = {'Type': 'ReceivedDigits', 'ReceivedDigits': "1"}
+        n = max(number // count, 100)
+
+        for name, legacy, indexed in [('connect_call', connect_call, index.connect_call),
+                                      ('digits_recevied_handler', digits_recevied_handler, index.digits_recevied_handler)]:
+            with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+                # both paths must produce the same response
+                assert json.dumps(legacy(event), sort_keys=True) == json.dumps(indexed(event), sort_keys=True), name
+
+                old = bench(legacy, event, n, fresh=False)
+                new = bench(indexed, event, n, fresh=True)
+                cached = bench(indexed, event, n, fresh=False)
+            print(f"{name:<24} {count:>6} {old:>10.2f} {new:>10.2f} {cached:>10.2f} {old / new:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
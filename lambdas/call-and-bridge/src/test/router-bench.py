@@ -0,0 +1,121 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+#
+# Cost of resolving a handler with sma_router against the nested lookups it
+# replaced - a dict on InvocationEventType, then a dict on ActionData.Type
+# inside the ACTION_SUCCESSFUL handler - with handlers that do nothing.
+#
+#   nested      event_handlers[type], then action_handlers.get(action type)
+#   router      Router.resolve(event), the route and its handler
+#   ... hit     an ACTION_SUCCESSFUL for CallAndBridge
+#   ... miss    a HANGUP: KeyError from the nested dicts, the default route
+#               from the router
+#
+# and the whole dispatch: sma_metrics.dispatch() on the nested dicts against
+# Router.dispatch(), which also counts the route and its time.
+#
+# Run from the src directory:
+#   python3 test/router-bench.py [iterations]
+#
+
+import os
+import sys
+import timeit
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ['MetricsEnabled'] = 'false'
+sys.path.insert(0, os.getcwd())
+
+import sma_event
+import sma_metrics
+import sma_router
+from sma_router import ANY
+
+
+def noop(e):
+    return {'SchemaVersion': '1.0', 'Actions': []}
+
+
+action_handlers = {'SpeakAndGetDigits': noop, 'CallAndBridge': noop}
+
+
+def action_succesful_handler(e):
+    action_handler = action_handlers.get(sma_event.of(e).action_type)
+    if action_handler is not None:
+        return action_handler(e)
+    return noop(e)
+
+
+event_handlers = {
+    'NEW_INBOUND_CALL': noop,
+    'ACTION_SUCCESSFUL': action_succesful_handler,
+    'DIGITS_RECEIVED': noop,
+}
+
+router = sma_router.Router({
+    ('NEW_INBOUND_CALL', ANY, ANY): noop,
+    ('ACTION_SUCCESSFUL', 'SpeakAndGetDigits', ANY): noop,
+    ('ACTION_SUCCESSFUL', 'CallAndBridge', ANY): noop,
+    ('DIGITS_RECEIVED', ANY, ANY): noop,
+}, default=noop)
+
+
+def nested(e):
+    ev = sma_event.of(e)
+    try:
+        handler = event_handlers[ev.type]
+    except KeyError:
+        return None
+    if handler is action_succesful_handler:
+        return action_handlers.get(ev.action_type)
+    return handler
+
+
+def nested_dispatch(e):
+    try:
+        return sma_metrics.dispatch(event_handlers, sma_event.of(e).type, e)
+    except KeyError:
+        return None
+
+
+def event(event_type, action_type):
+    return {'InvocationEventType': event_type, 'ActionData': {'Type': action_type},
+            'CallDetails': {'TransactionAttributes': {'state': "new"}}}
+
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+    hit = event('ACTION_SUCCESSFUL', 'CallAndBridge')
+    miss = event('HANGUP', 'Hangup')
+
+    print(f"{'lookup':<10} {'nested us':>10} {'router us':>10}")
+    for name, e in [('hit', hit), ('miss', miss)]:
+        old = min(timeit.repeat(lambda: nested(e), number=number, repeat=5)) / number * 1e6
+        new = min(timeit.repeat(lambda: router.resolve(e), number=number, repeat=5)) / number * 1e6
+        print(f"{name:<10} {old:>10.2f} {new:>10.2f}")
+
+    print(f"\n{'dispatch':<10} {'nested us':>10} {'router us':>10}")
+    for name, e in [('hit', hit), ('miss', miss)]:
+        old = min(timeit.repeat(lambda: nested_dispatch(e), number=number, repeat=5)) / number * 1e6
+        new = min(timeit.repeat(lambda: router.dispatch(e), number=number, repeat=5)) / number * 1e6
+        print(f"{name:<10} {old:>10.2f} {new:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+import json
+import unittest
+
+import sma_event
+
+
+class Test_Sma_Event(unittest.TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+
+        with open("../events/inbound.json") as f:
+            self.event = json.load(f)
+        self.event['InvocationEventType'] = "ACTION_SUCCESSFUL"
+        self.event['CallDetails']['TransactionAttributes'] = {'state': "recording", 'params': {'a': "1"}}
+
+    def test_fields(self):
+        ev = sma_event.Event(self.event)
+        self.assertEqual(ev.type, "ACTION_SUCCESSFUL")
+        self.assertEqual(ev.sequence, 1)
+        self.assertEqual(ev.transaction_id, "c5a25427-88f4-4bf6-b4b2-f44659300bdc")
+        self.assertEqual(ev.sip_media_application_id, "266e0891-0fe9-4718-a3a8-15b67842c128")
+        self.assertEqual(ev.state, "recording")
+        self.assertEqual(ev.attribute('params'), {'a': "1"})
+        self.assertEqual(ev.attribute('polls', "0"), "0")
+        self.assertEqual(ev.call.leg_a['CallId'], "9ff01357-23c5-4611-9dd3-f05f9d654faa")
+
+    def test_missing_levels(self):
+        for raw in ({}, {'CallDetails': {}}, {'CallDetails': None}, None):
+            ev = sma_event.Event(raw)
+            self.assertIsNone(ev.type)
+            self.assertIsNone(ev.state)
+            self.assertEqual(ev.attributes, {})
+            self.assertIsNone(ev.action_type)
+            self.assertEqual(ev.action.parameters, {})
+            self.assertIsNone(ev.call.leg_a)
+
+    def test_record_audio(self):
+        self.event['ActionData'] = {'Type': "RecordAudio",
+                                    'Parameters': {'CallId': "call-id"},
+                                    'RecordingDestination': {'Type': "S3", 'BucketName': "bucket", 'Key': "key.wav"}}
+        action = sma_event.Event(self.event).action
+        self.assertIsInstance(action, sma_event.RecordAudio)
+        self.assertEqual((action.bucket, action.key, action.call_id), ("bucket", "key.wav", "call-id"))
+
+    def test_received_digits(self):
+        for action_type in ("ReceiveDigits", "ReceivedDigits", "SpeakAndGetDigits", "PlayAudioAndGetDigits"):
+            self.event['ActionData'] = {'Type': action_type, 'ReceivedDigits': "1"}
+            action = sma_event.Event(self.event).action
+            self.assertIsInstance(action, sma_event.ReceivedDigits)
+            self.assertEqual(action.digits, "1")
+
+    def test_intent_result(self):
+        self.event['ActionData'] = {'Type': "StartBotConversation",
+                                    'IntentResult': {'SessionState': {'Intent': {
+                                        'Name': "FallbackIntent", 'State': "Failed", 'Slots': {'a': None}}}}}
+        action = sma_event.Event(self.event).action
+        self.assertIsInstance(action, sma_event.IntentResult)
+        self.assertEqual((action.intent_name, action.intent_state, action.slots), ("FallbackIntent", "Failed", {'a': None}))
+
+        action = sma_event.Event(dict(self.event, ActionData={'Type': "StartBotConversation"})).action
+        self.assertIsNone(action.intent_name)
+        self.assertEqual(action.slots, {})
+
+    def test_call_and_bridge(self):
+        self.event['ActionData'] = {'Type': "CallAndBridge",
+                                    'Parameters': {'CallerIdNumber': "+14155551212",
+                                                   'Endpoints': [{'Uri': "+12125551212", 'BridgeEndpointType': "PSTN"}]}}
+        action = sma_event.Event(self.event).action
+        self.assertIsInstance(action, sma_event.CallAndBridge)
+        self.assertEqual((action.caller_id, action.destination), ("+14155551212", "+12125551212"))
+        self.assertIsNone(sma_event.action_data({'Type': "CallAndBridge"}).destination)
+
+    def test_untyped_action_data(self):
+        # as the tests and simulator build them, without a Type
+        self.assertIsInstance(sma_event.action_data({'RecordingDestination': {}}), sma_event.RecordAudio)
+        self.assertIsInstance(sma_event.action_data({'IntentResult': {}}), sma_event.IntentResult)
+        self.assertIsInstance(sma_event.action_data({'ReceivedDigits': "1"}), sma_event.ReceivedDigits)
+        self.assertIs(type(sma_event.action_data({'Type': "Pause"})), sma_event.ActionData)
+
+    def test_shared_per_event(self):
+        ev = sma_event.of(self.event)
+        self.assertIs(sma_event.of(self.event), ev)
+        self.assertIsNot(sma_event.of(json.loads(json.dumps(self.event))), ev)
+
+    def test_sees_updates_to_the_event(self):
+        ev = sma_event.of(self.event)
+        call = ev.call
+        self.assertIs(ev.call, call)
+        self.assertIsNone(ev.action.type)
+
+        self.event['CallDetails']['TransactionAttributes'] = {'state': "transcribing"}
+        self.event['ActionData'] = {'Type': "ReceivedDigits", 'ReceivedDigits': "0"}
+        self.event['CallDetails']['Participants'].append(dict(call.leg_a, CallId="leg-b", Direction="Outbound"))
+
+        ev = sma_event.of(self.event)
+        self.assertEqual(ev.state, "transcribing")
+        self.assertEqual(ev.action.digits, "0")
+        self.assertEqual(ev.call.outbound['CallId'], "leg-b")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+import io
+import json
+import logging
+import unittest
+from unittest.mock import patch
+
+import sma_log
+
+
+class Unserializable:
+    def __str__(self):
+        raise AssertionError('serialized a payload that was never emitted')
+
+
+class Test_Sma_Log(unittest.TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+
+        self.event = {'InvocationEventType': "NEW_INBOUND_CALL",
+                      'CallDetails': {'TransactionId': "c5a25427-88f4-4bf6-b4b2-f44659300bdc"}}
+        self.level = sma_log.logger.level
+        self.rate = sma_log.sample_rate
+
+    def tearDown(self) -> None:
+        sma_log.logger.setLevel(self.level)
+        sma_log.sample_rate = self.rate
+
+        super().tearDown()
+
+    def run_invocation(self, *records):
+        out = io.StringIO()
+        with patch('sys.stdout', out):
+            with sma_log.invocation(self.event) as log:
+                for level, msg, data in records:
+                    log.log(level, msg, extra={'data': data})
+
+                # nothing is written until the invocation ends
+                self.assertEqual(out.getvalue(), '')
+
+        return [json.loads(line) for line in out.getvalue().splitlines()]
+
+    def test_compact_json_lines(self):
+        lines = self.run_invocation((logging.INFO, "called with event", self.event),
+                                    (logging.INFO, "returning response", {'Actions': []}))
+
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(lines[0], {'level': "INFO",
+                                    'txn': "c5a25427-88f4-4bf6-b4b2-f44659300bdc",
+                                    'msg': "called with event",
+                                    'data': self.event})
+        self.assertEqual(lines[1]['data'], {'Actions': []})
+
+    def test_payload_serialized_only_when_emitted(self):
+        sma_log.logger.setLevel(logging.INFO)
+        lines = self.run_invocation((logging.DEBUG, "dropped", Unserializable()),
+                                    (logging.INFO, "kept", None))
+
+        self.assertEqual([l['msg'] for l in lines], ["kept"])
+
+    def test_sampling_drops_payloads(self):
+        sma_log.sample_rate = 0.0
+        lines = self.run_invocation((logging.INFO, "called with event", self.event))
+
+        self.assertEqual(lines[0]['msg'], "called with event")
+        self.assertNotIn('data', lines[0])
+
+    def test_sampling_is_per_transaction(self):
+        sma_log.sample_rate = 0.5
+        ids = [f"call-{i}" for i in range(1000)]
+
+        decisions = [sma_log.sampled(i) for i in ids]
+        self.assertEqual(decisions, [sma_log.sampled(i) for i in ids])
+        self.assertTrue(400 < sum(decisions) < 600)
+
+    def test_exceptions_stay_on_one_line(self):
+        out = io.StringIO()
+        with patch('sys.stdout', out):
+            with sma_log.invocation({}) as log:
+                try:
+                    raise ValueError('Boom!')
+                except ValueError as err:
+                    log.error("exception in Event Handler:", exc_info=err)
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertIsNone(json.loads(lines[0])['txn'])
+        self.assertIn('Boom!', json.loads(lines[0])['exc'])
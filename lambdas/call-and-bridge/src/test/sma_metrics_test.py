@@ -0,0 +1,200 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+import importlib
+import io
+import json
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+import sma_metrics
+
+
+def handler_name(event):
+    return event['InvocationEventType']
+
+
+def calls_aws(event):
+    sma_metrics.record_call('s3.get_object', 1.5)
+    sma_metrics.record_call('s3.get_object', 2.5)
+    sma_metrics.record_call('transcribe.get_transcription_job', 3, error=True)
+
+
+def calls_aws_often(event):
+    for i in range(sma_metrics.max_values + 1):
+        sma_metrics.record_call('s3.get_object', i)
+
+
+def failing_handler(event):
+    raise ValueError('boom')
+
+
+class Test_Sma_Metrics(unittest.TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+
+        self.event = {'InvocationEventType': "ACTION_SUCCESSFUL",
+                      'CallDetails': {'TransactionId': "c5a25427-88f4-4bf6-b4b2-f44659300bdc",
+                                      'TransactionAttributes': {'state': "new"}}}
+        self.enabled = sma_metrics.enabled
+        self.batch_size = sma_metrics.batch_size
+        sma_metrics.enabled = True
+        sma_metrics.batch_size = 1
+        # drop anything buffered by the handler tests
+        with patch('sys.stdout', io.StringIO()):
+            sma_metrics.flush()
+
+    def tearDown(self) -> None:
+        with patch('sys.stdout', io.StringIO()):
+            sma_metrics.flush()
+        sma_metrics.enabled = self.enabled
+        sma_metrics.batch_size = self.batch_size
+        sys.modules.pop('index', None)
+
+        super().tearDown()
+
+    def dispatch(self, fn, event=None):
+        event = self.event if event is None else event
+        table = {'ACTION_SUCCESSFUL': fn, 'NEW_INBOUND_CALL': fn, 'HANGUP': fn}
+
+        out = io.StringIO()
+        with patch('sys.stdout', out):
+            r = sma_metrics.dispatch(table, event['InvocationEventType'], event)
+
+        return r, [json.loads(line) for line in out.getvalue().splitlines()]
+
+    def test_emf_line(self):
+        r, lines = self.dispatch(calls_aws)
+        self.assertEqual(len(lines), 1)
+        doc = lines[0]
+
+        directive = doc['_aws']['CloudWatchMetrics'][0]
+        self.assertEqual(directive['Namespace'], sma_metrics.namespace)
+        self.assertEqual(directive['Dimensions'], [['LambdaName', 'EventType', 'State']])
+        self.assertEqual(directive['Metrics'],
+                         [{'Name': 'HandlerLatency', 'Unit': 'Milliseconds'},
+                          {'Name': 's3.get_object', 'Unit': 'Milliseconds'},
+                          {'Name': 'transcribe.get_transcription_job', 'Unit': 'Milliseconds'},
+                          {'Name': 'transcribe.get_transcription_job.Errors', 'Unit': 'Count'}])
+        self.assertIsInstance(doc['_aws']['Timestamp'], int)
+
+        self.assertEqual(doc['LambdaName'], sma_metrics.lambda_name)
+        self.assertEqual(doc['EventType'], "ACTION_SUCCESSFUL")
+        self.assertEqual(doc['State'], "new")
+        self.assertEqual(doc['Handler'], "calls_aws")
+        self.assertGreaterEqual(doc['HandlerLatency'], 0)
+        self.assertEqual(doc['s3.get_object'], [1.5, 2.5])
+        self.assertEqual(doc['transcribe.get_transcription_job'], 3)
+        self.assertEqual(doc['transcribe.get_transcription_job.Errors'], 1)
+
+    def test_returns_the_handler_result(self):
+        r, _ = self.dispatch(handler_name)
+        self.assertEqual(r, "ACTION_SUCCESSFUL")
+
+    def test_timed_when_the_handler_raises(self):
+        with patch('sys.stdout', io.StringIO()) as out, self.assertRaises(ValueError):
+            sma_metrics.dispatch({'ACTION_SUCCESSFUL': failing_handler}, 'ACTION_SUCCESSFUL', self.event)
+
+        doc = json.loads(out.getvalue())
+        self.assertEqual(doc['Handler'], "failing_handler")
+        self.assertIn('HandlerLatency', doc)
+
+    def test_missing_handler(self):
+        with self.assertRaises(KeyError):
+            sma_metrics.dispatch({}, 'HANGUP', self.event)
+
+    def test_missing_dimensions(self):
+        _, (doc,) = self.dispatch(handler_name, {'InvocationEventType': "NEW_INBOUND_CALL", 'CallDetails': {}})
+        self.assertEqual((doc['EventType'], doc['State']), ("NEW_INBOUND_CALL", 'none'))
+
+    def test_batched(self):
+        sma_metrics.batch_size = 3
+        hangup = {'InvocationEventType': "HANGUP", 'CallDetails': self.event['CallDetails']}
+
+        self.assertEqual(self.dispatch(handler_name)[1], [])
+        self.assertEqual(self.dispatch(handler_name, hangup)[1], [])
+
+        # the third invocation fills the batch and writes a line per set of dimensions
+        _, lines = self.dispatch(handler_name)
+        self.assertEqual([(doc['EventType'], doc['State']) for doc in lines],
+                         [("ACTION_SUCCESSFUL", "new"), ("HANGUP", "new")])
+        self.assertEqual(len(lines[0]['HandlerLatency']), 2)
+        self.assertIsInstance(lines[1]['HandlerLatency'], float)
+
+    def test_batched_by_handler(self):
+        sma_metrics.batch_size = 2
+
+        self.assertEqual(self.dispatch(handler_name)[1], [])
+        _, lines = self.dispatch(calls_aws)
+        self.assertEqual([doc['Handler'] for doc in lines], ["handler_name", "calls_aws"])
+        self.assertNotIn('s3.get_object', lines[0])
+        self.assertEqual(lines[1]['s3.get_object'], [1.5, 2.5])
+
+    def test_unbatched_by_default(self):
+        env = {k: v for k, v in os.environ.items() if k != 'MetricsBatchSize'}
+        with patch.dict(os.environ, env, clear=True):
+            importlib.reload(sma_metrics)
+        self.assertEqual(sma_metrics.batch_size, 1)
+
+    def test_flushed_after_flush_seconds(self):
+        sma_metrics.batch_size = 100
+        with patch.object(sma_metrics, 'flush_seconds', 0):
+            _, (doc,) = self.dispatch(handler_name)
+        self.assertIn('HandlerLatency', doc)
+
+    def test_at_most_max_values_per_line(self):
+        _, (first, second) = self.dispatch(calls_aws_often)
+        self.assertEqual(first['s3.get_object'], list(range(sma_metrics.max_values)))
+        self.assertIn('HandlerLatency', first)
+        self.assertEqual(second['s3.get_object'], sma_metrics.max_values)
+        self.assertNotIn('HandlerLatency', second)
+        self.assertEqual([m['Name'] for m in second['_aws']['CloudWatchMetrics'][0]['Metrics']], ['s3.get_object'])
+
+    def test_disabled(self):
+        sma_metrics.enabled = False
+        r, lines = self.dispatch(calls_aws)
+        self.assertEqual(lines, [])
+
+        with patch('sys.stdout', io.StringIO()) as out:
+            sma_metrics.flush()
+        self.assertEqual(out.getvalue(), '')
+
+    def test_outside_an_invocation(self):
+        sma_metrics.record_call('s3.get_object', 1)
+        with patch('sys.stdout', io.StringIO()) as out:
+            sma_metrics.flush()
+        self.assertEqual(out.getvalue(), '')
+
+    def test_handler_writes_one_line(self):
+        import index
+
+        out = io.StringIO()
+        with patch('sys.stdout', out):
+            index.handler(self.event, None)
+
+        docs = [json.loads(line) for line in out.getvalue().splitlines() if '"_aws"' in line]
+        self.assertEqual(len(docs), 1)
+        # an ACTION_SUCCESSFUL with no ActionData has no route of its own
+        self.assertEqual(docs[0]['Handler'], "no_action")
+        self.assertEqual(docs[0]['EventType'], "ACTION_SUCCESSFUL")
+
+
+if __name__ == '__main__':
+    unittest.main()
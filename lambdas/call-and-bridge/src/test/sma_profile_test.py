@@ -0,0 +1,145 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+import importlib
+import io
+import json
+import os
+import pstats
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import sma_profile
+
+
+def handler(event, context):
+    return {'SchemaVersion': '1.0', 'Actions': [sorted(range(100))]}
+
+
+class Test_Sma_Profile(unittest.TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.event = {'InvocationEventType': "NEW_INBOUND_CALL", 'Sequence': 3,
+                      'CallDetails': {'TransactionId': "c5a25427-88f4-4bf6-b4b2-f44659300bdc"}}
+
+    def tearDown(self) -> None:
+        importlib.reload(sma_profile)
+        super().tearDown()
+
+    def reload(self, **env):
+        with patch.dict(os.environ, env):
+            importlib.reload(sma_profile)
+
+    def test_off_by_default(self):
+        self.reload()
+        self.assertEqual(sma_profile.modes, set())
+        self.assertIs(sma_profile.profiled(handler), handler)
+
+    def test_unknown_mode_is_off(self):
+        self.reload(ProfileMode="yappi")
+        self.assertIs(sma_profile.profiled(handler), handler)
+
+    def test_files(self):
+        with tempfile.TemporaryDirectory() as d:
+            self.reload(ProfileMode="cprofile,tracemalloc", ProfileOutput=d)
+            wrapped = sma_profile.profiled(handler)
+
+            self.assertEqual(wrapped(self.event, None), handler(self.event, None))
+
+            files = sorted(os.listdir(d))
+            self.assertEqual(len(files), 2)
+            self.assertTrue(files[0].startswith("c5a25427-88f4-4bf6-b4b2-f44659300bdc-3-"))
+            self.assertTrue(files[0].endswith('.prof'))
+            self.assertTrue(files[1].endswith('.tracemalloc'))
+
+            stats = pstats.Stats(os.path.join(d, files[0])).stats
+            self.assertTrue(any(func == 'handler' for _, _, func in stats))
+
+    def test_output_created(self):
+        with tempfile.TemporaryDirectory() as d:
+            out = os.path.join(d, "prof", "new")
+            self.reload(ProfileMode="cprofile", ProfileOutput=out)
+            sma_profile.profiled(handler)(self.event, None)
+            self.assertEqual(len(os.listdir(out)), 1)
+
+    def test_write_error_keeps_result(self):
+        self.reload(ProfileMode="cprofile,tracemalloc", ProfileOutput="/nonexistent/dir")
+        with patch('os.makedirs', side_effect=PermissionError), \
+                patch('sys.stdout', new_callable=io.StringIO) as out:
+            wrapped = sma_profile.profiled(handler)
+            self.assertEqual(wrapped(self.event, None), handler(self.event, None))
+
+        # logged when they happen, not left for the next invocation's flush
+        lines = [json.loads(l) for l in out.getvalue().splitlines()]
+        self.assertEqual([l['level'] for l in lines], ['ERROR'] * 3)
+        self.assertTrue(lines[0]['msg'].startswith("can not create ProfileOutput"))
+
+    def test_bad_numbers(self):
+        with patch('sys.stdout', new_callable=io.StringIO) as out:
+            self.reload(ProfileMode="cprofile", ProfileTop="lots", ProfileKeep="", ProfileSampleRate="half")
+        self.assertEqual((sma_profile.top, sma_profile.keep, sma_profile.sample_rate), (50, 100, 1.0))
+        self.assertEqual(len(out.getvalue().splitlines()), 3)
+
+    def test_keep(self):
+        with tempfile.TemporaryDirectory() as d:
+            self.reload(ProfileMode="cprofile", ProfileOutput=d, ProfileKeep="2")
+            wrapped = sma_profile.profiled(handler)
+            for seq in range(4):
+                wrapped(dict(self.event, Sequence=seq), None)
+
+            files = sorted(os.listdir(d))
+            self.assertEqual(len(files), 2)
+            self.assertEqual([f.split('-')[5] for f in files], ['2', '3'])
+
+    def test_stdout(self):
+        self.reload(ProfileMode="cprofile,tracemalloc", ProfileOutput="stdout", ProfileTop="5")
+        wrapped = sma_profile.profiled(handler)
+
+        with patch('sys.stdout', new_callable=io.StringIO) as out:
+            wrapped(self.event, None)
+
+        lines = [json.loads(l) for l in out.getvalue().splitlines()]
+        self.assertEqual([l['profile'] for l in lines], ['cprofile', 'tracemalloc'])
+        for l in lines:
+            self.assertEqual(l['txn'], "c5a25427-88f4-4bf6-b4b2-f44659300bdc")
+            self.assertLessEqual(len(l['stats']), 5)
+        self.assertGreater(lines[1]['peak'], 0)
+
+    def test_sample_rate(self):
+        self.reload(ProfileMode="cprofile", ProfileOutput="stdout", ProfileSampleRate="0")
+        wrapped = sma_profile.profiled(handler)
+
+        with patch('sys.stdout', new_callable=io.StringIO) as out:
+            wrapped(self.event, None)
+        self.assertEqual(out.getvalue(), '')
+
+    def test_exception_still_written(self):
+        self.reload(ProfileMode="cprofile", ProfileOutput="stdout")
+
+        def broken(event, context):
+            raise ValueError('Boom!')
+
+        with patch('sys.stdout', new_callable=io.StringIO) as out:
+            with self.assertRaises(ValueError):
+                sma_profile.profiled(broken)(self.event, None)
+        self.assertEqual(json.loads(out.getvalue())['profile'], 'cprofile')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+import io
+import unittest
+from unittest.mock import patch
+
+import sma_log
+import sma_router
+from sma_router import ANY, Router
+
+
+def event(event_type, action_type=None, state=None):
+    e = {'InvocationEventType': event_type,
+         'CallDetails': {'TransactionAttributes': {} if state is None else {'state': state}}}
+    if action_type is not None:
+        e['ActionData'] = {'Type': action_type}
+    return e
+
+
+def returns(name):
+    def handler(e):
+        return name
+    handler.__name__ = name
+    return handler
+
+
+def is_retry(e):
+    return e['CallDetails']['TransactionAttributes'].get('state') == 'retry'
+
+
+class Test_Sma_Router(unittest.TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+
+        self.router = Router({
+            ('NEW_INBOUND_CALL', ANY, ANY): returns('new_call'),
+            ('ACTION_SUCCESSFUL', ANY, ANY): returns('any_action'),
+            ('ACTION_SUCCESSFUL', 'CallAndBridge', ANY): returns('bridged'),
+            ('ACTION_SUCCESSFUL', ANY, 'playing'): returns('playing'),
+            ('ACTION_SUCCESSFUL', 'CallAndBridge', 'playing'): returns('bridged_playing'),
+            ('ACTION_FAILED', ANY, 'finishing'): None,
+            ('ACTION_FAILED', ANY, ANY): [(is_retry, returns('retry'))],
+        }, default=returns('default'))
+
+    def test_most_specific_wins(self):
+        for e, expected in [(event('NEW_INBOUND_CALL'), 'new_call'),
+                            (event('ACTION_SUCCESSFUL', 'PlayAudio'), 'any_action'),
+                            (event('ACTION_SUCCESSFUL', 'CallAndBridge'), 'bridged'),
+                            (event('ACTION_SUCCESSFUL', 'PlayAudio', 'playing'), 'playing'),
+                            (event('ACTION_SUCCESSFUL', 'CallAndBridge', 'playing'), 'bridged_playing'),
+                            (event('ACTION_SUCCESSFUL', 'CallAndBridge', 'new'), 'bridged')]:
+            with self.subTest(e=e):
+                self.assertEqual(self.router.dispatch(e), expected)
+
+    def test_one_lookup(self):
+        # values no route names are looked up as ANY
+        self.assertEqual(self.router.key(event('ACTION_SUCCESSFUL', 'PlayAudio', 'bogus')),
+                         ('ACTION_SUCCESSFUL', ANY, ANY))
+        # and parts no route of the event type names are not read
+        self.assertEqual(self.router.raw_key(event('ACTION_FAILED', 'CallAndBridge', 'playing')),
+                         ('ACTION_FAILED', ANY, 'playing'))
+        self.assertEqual(self.router.key(event('HANGUP', 'CallAndBridge', 'playing')), (ANY, ANY, ANY))
+
+        e = event('ACTION_SUCCESSFUL', 'CallAndBridge', 'playing')
+        self.assertIs(self.router.route(e), self.router.table[('ACTION_SUCCESSFUL', 'CallAndBridge', 'playing')])
+        self.assertIs(self.router.seen[('ACTION_SUCCESSFUL', 'CallAndBridge', 'playing')], self.router.route(e))
+
+    def test_seen_is_bounded(self):
+        with patch.object(sma_router, 'max_seen', 3):
+            for i in range(5):
+                self.assertEqual(self.router.dispatch(event('ACTION_SUCCESSFUL', 'PlayAudio', f"s{i}")), 'any_action')
+                self.assertLessEqual(len(self.router.seen), 3)
+
+    def test_default_route(self):
+        for e in [event('HANGUP'), {}, event('ACTION_FAILED', state='finishing'), event('ACTION_FAILED', state='new')]:
+            with self.subTest(e=e):
+                self.assertEqual(self.router.dispatch(e), 'default')
+        self.assertEqual(self.router.dispatch(event('ACTION_FAILED', state='retry')), 'retry')
+        self.assertEqual(self.router.default.hits, 4)
+
+    def test_no_action(self):
+        router = Router({('NEW_INBOUND_CALL', ANY, ANY): returns('new_call')})
+        level = sma_log.logger.level
+        sma_log.logger.setLevel('INFO')
+        try:
+            with patch('sys.stdout', io.StringIO()) as out, sma_log.invocation(event('HANGUP')):
+                r = router.dispatch(event('HANGUP', state='new'))
+        finally:
+            sma_log.logger.setLevel(level)
+
+        self.assertEqual(r, {'SchemaVersion': '1.0', 'Actions': []})
+        self.assertIn("no route for HANGUP/None/new", out.getvalue())
+
+    def test_stats(self):
+        for _ in range(3):
+            self.router.dispatch(event('ACTION_SUCCESSFUL', 'CallAndBridge'))
+        self.router.dispatch(event('HANGUP'))
+
+        stats = self.router.stats()
+        self.assertEqual(set(stats), {'ACTION_SUCCESSFUL/CallAndBridge/*', sma_router.DEFAULT})
+        bridged = stats['ACTION_SUCCESSFUL/CallAndBridge/*']
+        self.assertEqual(bridged['hits'], 3)
+        self.assertEqual(sum(bridged['histogram'].values()), 3)
+        self.assertLessEqual(bridged['p50_us'], bridged['p99_us'])
+
+        self.router.reset()
+        self.assertEqual(self.router.stats(), {})
+
+    def test_histogram_buckets(self):
+        route = sma_router.Route('r', ())
+        for seconds in [0, 0.0000009, 0.000003, 0.000003, 0.001, 3600]:
+            route.record(seconds)
+        self.assertEqual(route.histogram[0], 2)
+        self.assertEqual(route.histogram[2], 2)
+        self.assertEqual(route.histogram[10], 1)
+        self.assertEqual(route.histogram[-1], 1)
+        self.assertEqual(route.percentile(0.5), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
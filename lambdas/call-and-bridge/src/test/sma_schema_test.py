@@ -0,0 +1,183 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+import io
+import json
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+import sma_log
+import sma_schema
+from sma_schema import ValidationError
+
+try:
+    import jsonschema
+except ImportError:
+    jsonschema = None
+
+
+def error(check, instance):
+    try:
+        check(instance)
+    except ValidationError as e:
+        return str(e)
+    return None
+
+
+class Test_Sma_Schema(unittest.TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+
+        with open("../events/inbound.json") as f:
+            self.event = json.load(f)
+        self.mode = sma_schema.mode
+        self.response = {'SchemaVersion': "1.0",
+                         'Actions': [{'Type': "Hangup", 'Parameters': {'SipResponseCode': "0"}}]}
+
+    def tearDown(self) -> None:
+        sma_schema.mode = self.mode
+        sys.modules.pop('index', None)
+        os.environ.pop('WAVFILE_BUCKET', None)
+        super().tearDown()
+
+    def logged(self, fn, *args):
+        sma_log.logger.flush()
+        with patch('sys.stdout', new_callable=io.StringIO) as out:
+            r = fn(*args)
+            sma_log.logger.flush()
+        return r, [json.loads(line) for line in out.getvalue().splitlines()]
+
+    def test_paths(self):
+        check = sma_schema.compile(sma_schema.response_schema)
+        self.assertIsNone(error(check, self.response))
+
+        self.assertEqual(error(check, []), "$: expected object")
+        self.assertEqual(error(check, {'Actions': []}), "$: missing SchemaVersion")
+        self.assertEqual(error(check, {'SchemaVersion': "2.0", 'Actions': []}), "$.SchemaVersion: expected '1.0'")
+
+        self.response['Actions'].append({'Type': "Pause", 'Parameters': None})
+        self.assertEqual(error(check, self.response), "$.Actions[1].Parameters: expected object")
+
+    def test_keywords(self):
+        check = sma_schema.compile({
+            'type': ['integer', 'string'],
+            'minimum': 1, 'maximum': 9,
+            'minLength': 2, 'pattern': '^[0-9]+$',
+        })
+        for ok in (1, 9, "12", "0123"):
+            self.assertIsNone(error(check, ok), ok)
+        for bad in (0, 10, 1.5, True, None, "1", "1a"):
+            self.assertIsNotNone(error(check, bad), bad)
+
+        check = sma_schema.compile({'type': 'array', 'minItems': 1, 'maxItems': 2, 'items': {'enum': ["a", 1]}})
+        self.assertIsNone(error(check, ("a", 1)))
+        self.assertEqual(error(check, ["a", 2]), "$[1]: expected one of 'a', 1")
+        self.assertIsNotNone(error(check, []))
+        self.assertIsNotNone(error(check, ["a", "a", "a"]))
+
+        check = sma_schema.compile({'properties': {'a': True}, 'additionalProperties': False})
+        self.assertIsNone(error(check, {'a': 1}))
+        self.assertEqual(error(check, {'a': 1, 'b': 2}), "$.b: not allowed")
+
+    def test_unsupported_keywords(self):
+        with self.assertRaises(ValueError):
+            sma_schema.compile({'type': 'object', 'oneOf': []})
+        with self.assertRaises(ValueError):
+            sma_schema.compile({'type': 'date'})
+
+    @unittest.skipIf(jsonschema is None, "jsonschema is not installed")
+    def test_agrees_with_jsonschema(self):
+        instances = [self.response, {}, [], None, "1.0",
+                     {'SchemaVersion': "1.0"},
+                     {'SchemaVersion': 1.0, 'Actions': []},
+                     {'SchemaVersion': "1.0", 'Actions': {}},
+                     {'SchemaVersion': "1.0", 'Actions': [{'Type': "Hangup"}]},
+                     {'SchemaVersion': "1.0", 'Actions': [{'Type': 1, 'Parameters': {}}]},
+                     {'SchemaVersion': "1.0", 'Actions': [], 'TransactionAttributes': "new"}]
+        schemas = [sma_schema.event_schema, sma_schema.response_schema]
+        for case in ("basic/basic-schema.json", "new-call/new-call-schema.json"):
+            with open("./test/cases/" + case) as f:
+                schemas.append(json.load(f))
+
+        for schema in schemas:
+            check = sma_schema.compile(schema)
+            for instance in instances + [self.event]:
+                self.assertEqual(error(check, instance) is None,
+                                 jsonschema.Draft7Validator(schema).is_valid(instance),
+                                 (schema, instance))
+
+    def test_sma_event(self):
+        self.assertIsNone(error(sma_schema.validate_event, self.event))
+
+        del self.event['CallDetails']['Participants'][0]['CallId']
+        self.assertEqual(error(sma_schema.validate_event, self.event),
+                         "$.CallDetails.Participants[0]: missing CallId")
+
+    def test_off(self):
+        sma_schema.mode = 'off'
+        self.assertTrue(sma_schema.check_event({}))
+        self.assertIs(sma_schema.check_response(None), None)
+
+    def test_log(self):
+        sma_schema.mode = 'log'
+        r, (line,) = self.logged(sma_schema.check_event, {})
+        self.assertTrue(r)
+        self.assertEqual(line['level'], "WARNING")
+        self.assertEqual(line['msg'], "invalid event: $: missing SchemaVersion")
+
+        self.response['Actions'][0]['Type'] = ""
+        r, (line,) = self.logged(sma_schema.check_response, self.response)
+        self.assertIs(r, self.response)
+        self.assertEqual(line['level'], "WARNING")
+
+    def test_strict(self):
+        sma_schema.mode = 'strict'
+        self.assertEqual(self.logged(sma_schema.check_event, self.event), (True, []))
+        self.assertEqual(self.logged(sma_schema.check_response, self.response), (self.response, []))
+
+        r, (line,) = self.logged(sma_schema.check_event, {})
+        self.assertFalse(r)
+        self.assertEqual(line['level'], "ERROR")
+
+        r, (line,) = self.logged(sma_schema.check_response, {'Actions': [{}]})
+        self.assertEqual(r, {'SchemaVersion': "1.0", 'Actions': []})
+        self.assertEqual(line['level'], "ERROR")
+
+    def test_handler_strict(self):
+        sma_schema.mode = 'strict'
+        os.environ['WAVFILE_BUCKET'] = "fake-bucket"
+        import index
+
+        with patch('sys.stdout', new_callable=io.StringIO):
+            r = index.handler(self.event, None)
+        self.assertEqual(sma_schema.check_response(r), r)
+        self.assertTrue(r['Actions'])
+
+        del self.event['Sequence']
+        new_call = MagicMock()
+        with patch.object(index.router, 'dispatch', new_call), \
+                patch('sys.stdout', new_callable=io.StringIO) as out:
+            r = index.handler(self.event, None)
+        new_call.assert_not_called()
+        self.assertEqual(r['Actions'], [])
+        self.assertIn("invalid event, not dispatched", out.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -15,29 +15,37 @@
 # SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 # 
 
-import boto3
-from copy import deepcopy
 import os
 
+import sma_event
+import sma_log
+import sma_metrics
+import sma_profile
+import sma_router
+import sma_schema
+from sma_actions import fragment, with_params, response
+
+# Set LogLevel using environment variable, fallback to INFO if not present
+logger = sma_log.logger
+log_level = os.getenv('LogLevel', 'INFO')
+if log_level not in ['INFO', 'DEBUG']:
+    log_level = 'INFO'
+logger.setLevel(log_level)
+
 # 
 # statics
 #
 bot_alias = os.getenv('BOT_ARN', 'paste-arn-here')
 
-response_template = {
-    'SchemaVersion': '1.0',
-    'Actions': []
-}
-
-pause_action = {
+pause_action = fragment({
     'Type': "Pause",
     'Parameters': {
         'DurationInMilliseconds': "1000"
     }
-}
+})
 
 
-speak_action = {
+speak_action = fragment({
   'Type': "Speak",
   'Parameters': {
     'Engine': "neural",     #Required. Either standard or neural
@@ -46,17 +54,17 @@ speak_action = {
     'TextType': "ssml",     # Optional. Defaults to text
     'VoiceId': "Matthew"    # Required
   }
-}
+})
 
-voice_focus_action = {
+voice_focus_action = fragment({
   'Type': "VoiceFocus",
   'Parameters': {
     'Enable': True, # false         # required
     'CallId': "call-id-1",          # required
   }
-}
+})
 
-start_bot_conversation_action = {
+start_bot_conversation_action = fragment({
   'Type': "StartBotConversation",
   'Parameters': {
     'BotAliasArn': "none",
@@ -75,70 +83,64 @@ start_bot_conversation_action = {
       ]
     }
   },
-}
+})
 
-hangup_action = {
+hangup_action = fragment({
     'Type': "Hangup",
     'Parameters': {
         'SipResponseCode': "0",
         'ParticipantTag': ""
     }
-}
+})
+
+# the bot alias is fixed for the life of the container, so build it in once
+start_bot_action = fragment(with_params(start_bot_conversation_action, BotAliasArn=bot_alias))
 
 
 #
 # handlers
 #
 
-chime_client = boto3.client('chime')
-
 def new_call_actions(e):
-    print("new call action")
-    response = deepcopy(response_template)
-
-    response['Actions'].append(deepcopy(pause_action))
-
-    voice = deepcopy(voice_focus_action)
-    voice['Parameters']['Enable'] = True
-    voice['Parameters']['CallId'] = e['CallDetails']['Participants'][0]['CallId']
-    response['Actions'].append(voice)
+    logger.debug("new call action")
 
-    start_bot = deepcopy(start_bot_conversation_action)
-    start_bot['Parameters']['BotAliasArn'] = bot_alias
-    response['Actions'].append(start_bot)
+    voice = with_params(voice_focus_action,
+        Enable=True,
+        CallId=sma_event.of(e).call.leg_a['CallId'])
 
-    return response
+    return response(
+        pause_action,
+        voice,
+        start_bot_action)
 
 def action_succesful(e):
-    response = deepcopy(response_template)
-
-    response['Actions'].append(deepcopy(pause_action))
-    last_action = deepcopy(hangup_action)
-    try:
-        if (e['ActionData']['IntentResult']['SessionState']['Intent']['Name'] == 'FallbackIntent'):
-            start_bot = deepcopy(start_bot_conversation_action)
-            start_bot['Parameters']['BotAliasArn'] = bot_alias
-            last_action = start_bot
-    except Exception as err:
-        pass
-
-    response['Actions'].append(last_action)
-
-    return response 
+    last_action = hangup_action
+    action = sma_event.of(e).action
+    if isinstance(action, sma_event.IntentResult) and action.intent_name == 'FallbackIntent':
+        last_action = start_bot_action
+
+    return response(
+        pause_action,
+        last_action)
     
-# message - handler mapping table
-action_handlers = {
-    'NEW_INBOUND_CALL': new_call_actions,
-    'ACTION_SUCCESSFUL': action_succesful
-}
+# message - handler routing table, a NoOp for anything else
+router = sma_router.Router({
+    ('NEW_INBOUND_CALL', sma_router.ANY, sma_router.ANY): new_call_actions,
+    ('ACTION_SUCCESSFUL', sma_router.ANY, sma_router.ANY): action_succesful,
+})
 
+@sma_profile.profiled
 def handler(event, context):
-    print(f"called with {event}")
-    response = deepcopy(response_template)
-
-    try:
-        response = action_handlers[event['InvocationEventType']](event)
-    except Exception as e:
-        print(e)
-    
-    return response
\ No newline at end of file
+    with sma_log.invocation(event):
+        logger.info("called with event", extra={'data': event})
+        r = response()
+
+        try:
+            if sma_schema.check_event(event):
+                r = router.dispatch(event)
+        except Exception as e:
+            logger.error("exception in Event Handler:", exc_info=e)
+
+        r = sma_schema.check_response(r)
+        logger.info("returning response", extra={'data': r})
+        return r
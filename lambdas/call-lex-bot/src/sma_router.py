@@ -0,0 +1,220 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+#
+# Routing table for the SMA handlers, keyed by (event type, action type, state).
+#
+#   router = sma_router.Router({
+#       ('NEW_INBOUND_CALL', ANY, ANY):                  new_call_handler,
+#       ('ACTION_SUCCESSFUL', 'SpeakAndGetDigits', ANY): place_call,
+#       ('ACTION_SUCCESSFUL', ANY, 'recording'):         [(has_recording, playback_recording)],
+#       ('ACTION_FAILED', ANY, 'finishing'):             None,
+#   })
+#
+# The parts of the key are the event's InvocationEventType, ActionData.Type
+# and 'state' TransactionAttribute.  ANY matches every value, and the more
+# specific route wins: an exact state over an exact action type over an exact
+# event type.  A list of (guard, handler) pairs goes to the first handler
+# whose guard(event) is true (a None guard always is).
+#
+# Router() expands the routes once, at import, over every value they name.
+# route() reads only the parts of the event its event type's routes name,
+# and resolves them in one dict lookup: the first time a key is seen its
+# unnamed values are mapped to ANY, and the route it lands on is kept for the
+# next time.  Keys with no route, None routes and routes with no true guard
+# all go to the default route (no_action, a NoOp, unless given) - nothing is
+# raised for an event the lambda does not handle.
+#
+# dispatch(event) calls the handler through sma_metrics.call() and counts it
+# against its route: hits, and a histogram of the handler's time in
+# power-of-two microsecond buckets.  stats() reports them for the container's
+# lifetime; `python3 -m tools.timing --routes` prints them after a run.
+#
+# This file is shared by the python lambdas - keep the copies identical.
+#
+
+from itertools import product
+import time
+
+import sma_event
+import sma_log
+import sma_metrics
+
+
+logger = sma_log.logger
+
+ANY = '*'
+
+DEFAULT = 'default'
+
+# bucket i counts handler times under 2**i us, the last one everything slower
+buckets = 24
+
+# the most event keys remembered, in case states are not a small, fixed set
+max_seen = 1024
+
+_clock = time.perf_counter
+
+
+def no_action(event):
+    ev = sma_event.of(event)
+    logger.info("no route for %s/%s/%s", ev.type, ev.action_type, ev.state)
+    return {'SchemaVersion': '1.0', 'Actions': []}
+
+
+class Route:
+    __slots__ = ('name', 'handlers', 'fn', 'hits', 'histogram')
+
+    def __init__(self, name, handlers):
+        self.name = name
+        self.handlers = handlers
+        # the handler of a route with one unguarded handler, to skip select()
+        self.fn = handlers[0][1] if len(handlers) == 1 and handlers[0][0] is None else None
+        self.hits = 0
+        self.histogram = [0] * buckets
+
+    def select(self, event):
+        for guard, fn in self.handlers:
+            if guard is None or guard(event):
+                return fn
+
+        return None
+
+    def record(self, seconds):
+        self.hits += 1
+        self.histogram[min(int(seconds * 1e6).bit_length(), buckets - 1)] += 1
+
+    # the bucket bound (us) under which fraction q of the hits fall
+    def percentile(self, q):
+        remaining = q * self.hits
+        for i, count in enumerate(self.histogram):
+            remaining -= count
+            if remaining <= 0:
+                return 2 ** i
+
+        return None
+
+    def reset(self):
+        self.hits = 0
+        self.histogram = [0] * buckets
+
+
+def _handlers(handlers):
+    if handlers is None:
+        return ()
+    if callable(handlers):
+        return ((None, handlers),)
+
+    return tuple(handlers)
+
+
+# routes with more exact parts override those with fewer, state counting most
+def _specificity(key):
+    event_type, action_type, state = key
+    return (state != ANY) * 4 + (action_type != ANY) * 2 + (event_type != ANY)
+
+
+class Router:
+    def __init__(self, routes, default=no_action):
+        self.default = Route(DEFAULT, ((None, default),))
+        self.routes = {key: Route('/'.join(map(str, key)), _handlers(h)) for key, h in routes.items()}
+
+        # the values each part of the key is routed on
+        self.values = tuple(frozenset(key[i] for key in routes) - {ANY} for i in range(3))
+
+        self.table = {}
+        for key in sorted(self.routes, key=_specificity):
+            parts = [(part,) if part != ANY else (ANY, *values) for part, values in zip(key, self.values)]
+            for expanded in product(*parts):
+                self.table[expanded] = self.routes[key]
+
+        # whether an event type's routes name action types and states, so the
+        # event is only read for the parts that can change its route
+        self.parts = {}
+        for event_type in (ANY, *self.values[0]):
+            named = [key for key in routes if key[0] in (event_type, ANY)]
+            self.parts[event_type] = (any(key[1] != ANY for key in named), any(key[2] != ANY for key in named))
+        self.parts_any = self.parts[ANY]
+
+        # the event's own (event type, action type, state) -> its route, filled
+        # in on first sight, so a key is only mapped to its ANY parts once
+        self.seen = {}
+
+    # the event's (event type, action type, state), ANY for the parts its
+    # event type's routes do not name
+    def raw_key(self, event):
+        ev = sma_event.of(event)
+        event_type = ev.type
+        by_action, by_state = self.parts.get(event_type, self.parts_any)
+
+        return (event_type, ev.action_type if by_action else ANY, ev.state if by_state else ANY)
+
+    # the route key: the raw key, with values no route names as ANY
+    def key(self, event):
+        return self._key(self.raw_key(event))
+
+    def _key(self, raw):
+        event_type, action_type, state = raw
+        event_types, action_types, states = self.values
+
+        return (event_type if event_type in event_types else ANY,
+                action_type if action_type in action_types else ANY,
+                state if state in states else ANY)
+
+    # raw_key() inlined, then one lookup for a key seen before
+    def route(self, event):
+        ev = sma_event.of(event)
+        event_type = ev.type
+        by_action, by_state = self.parts.get(event_type, self.parts_any)
+        raw = (event_type, ev.action_type if by_action else ANY, ev.state if by_state else ANY)
+
+        route = self.seen.get(raw)
+        if route is None:
+            route = self.table.get(self._key(raw), self.default)
+            if len(self.seen) >= max_seen:
+                self.seen.clear()
+            self.seen[raw] = route
+
+        return route
+
+    # the route and the handler to call: the default route's when the route
+    # has no handler, or no guard is true
+    def resolve(self, event):
+        route = self.route(event)
+        fn = route.fn or route.select(event)
+        if fn is None:
+            return self.default, self.default.fn
+
+        return route, fn
+
+    def dispatch(self, event):
+        route, fn = self.resolve(event)
+        start = _clock()
+        try:
+            return sma_metrics.call(fn, event)
+        finally:
+            route.record(_clock() - start)
+
+    # {route name: {'hits', 'p50_us', 'p99_us', 'histogram'}} for every route hit
+    def stats(self):
+        return {r.name: {'hits': r.hits, 'p50_us': r.percentile(0.5), 'p99_us': r.percentile(0.99),
+                         'histogram': {2 ** i: n for i, n in enumerate(r.histogram) if n}}
+                for r in (*self.routes.values(), self.default) if r.hits}
+
+    def reset(self):
+        for r in (*self.routes.values(), self.default):
+            r.reset()
@@ -0,0 +1,418 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+#
+# JSON Schema checks for the SMA invocation events and handler responses.
+#
+# compile() generates the source of one Python function per schema, once,
+# with every keyword unrolled into plain isinstance() calls, comparisons and
+# dict lookups, so checking an instance is a single call with no walk of the
+# schema.  The function returns None or raises ValidationError naming the
+# offending path, e.g. "$.Actions[0].Parameters: expected object"; the path
+# is only built when the check fails.  Only the keywords the SMA schemas use
+# are supported and any other keyword is rejected by compile() rather than
+# silently ignored.
+#
+# The handlers pass each event through check_event() before dispatching it
+# and their response through check_response().  Both return at once unless
+# SchemaValidation is set:
+#   log     invalid events and responses are logged as warnings and passed on
+#   strict  invalid events are not dispatched and invalid responses are
+#           replaced by an empty one, the response a failing handler returns,
+#           both logged as errors
+#
+# Environment:
+#   SchemaValidation   off, log or strict, default off
+#
+# This file is shared by the python lambdas - keep the copies identical.
+#
+
+import os
+import re
+
+import sma_log
+
+
+class ValidationError(ValueError):
+
+    def __init__(self, message, path=()):
+        super().__init__(message)
+        self.message = message
+        self.path = path
+
+    def __str__(self):
+        return '$' + ''.join(f"[{k}]" if isinstance(k, int) else f".{k}" for k in self.path) + \
+            ': ' + self.message
+
+
+_types = {
+    'object': (dict,),
+    'array': (list, tuple),
+    'string': (str,),
+    'integer': (int,),
+    'number': (int, float),
+    'boolean': (bool,),
+    'null': (type(None),),
+}
+
+_keywords = {
+    'type', 'const', 'enum',
+    'required', 'properties', 'additionalProperties',
+    'items', 'minItems', 'maxItems',
+    'minLength', 'maxLength', 'pattern',
+    'minimum', 'maximum',
+    # annotations, which don't constrain anything
+    '$schema', '$id', '$comment', 'title', 'description', 'default', 'examples',
+}
+
+_missing = object()
+
+
+# const and enum compare like JSON: True is not 1
+def _equal(a, b):
+    return a == b and (a.__class__ is bool) is (b.__class__ is bool)
+
+
+def _member(v, values):
+    return any(_equal(v, value) for value in values)
+
+
+def _range(low, high, unit=''):
+    return f"expected {low if low is not None else 'any'} to {high if high is not None else 'any'}" + \
+        (' ' + unit if unit else '')
+
+
+# Writes the source of a check function.  Values the code needs (messages,
+# type tuples, enum sets...) are passed in as globals named c0, c1...
+class _Source:
+
+    def __init__(self):
+        self.lines = []
+        self.constants = {'_error': ValidationError, '_missing': _missing, '_member': _member}
+        self.names = 0
+
+    def constant(self, value):
+        name = f"c{len(self.constants)}"
+        self.constants[name] = value
+        return name
+
+    def name(self, prefix):
+        self.names += 1
+        return f"{prefix}{self.names}"
+
+    def fail(self, message, path, indent):
+        where = '(' + ''.join(p + ', ' for p in path) + ')'
+        self.lines.append(' ' * indent + f"raise _error({self.constant(message)}, {where})")
+
+    # Emit the checks of one schema against the value named v, with path the
+    # expressions for its location.  Returns False if there was nothing to check.
+    def schema(self, schema, v, path, indent):
+        start = len(self.lines)
+        pad = ' ' * indent
+
+        if schema is True or schema == {}:
+            return False
+        if schema is False:
+            self.fail("not allowed", path, indent)
+            return True
+        if not isinstance(schema, dict):
+            raise ValueError(f"not a schema: {schema!r}")
+
+        unsupported = set(schema) - _keywords
+        if unsupported:
+            raise ValueError(f"unsupported schema keywords: {', '.join(sorted(unsupported))}")
+
+        types = schema.get('type')
+        if types is not None:
+            types = [types] if isinstance(types, str) else list(types)
+            try:
+                classes = tuple(c for t in types for c in _types[t])
+            except KeyError as e:
+                raise ValueError(f"unsupported schema type: {e}") from None
+            test = f"not isinstance({v}, {self.constant(classes[0] if len(classes) == 1 else classes)})"
+            # True and False are ints to isinstance(), but not to JSON Schema
+            if int in classes and bool not in classes:
+                test += f" or {v}.__class__ is bool"
+            self.lines.append(pad + f"if {test}:")
+            self.fail('expected ' + ' or '.join(types), path, indent + 4)
+
+        if 'const' in schema:
+            value = schema['const']
+            if isinstance(value, str):
+                self.lines.append(pad + f"if {v} != {self.constant(value)}:")
+            else:
+                self.lines.append(pad + f"if not _member({v}, ({self.constant(value)},)):")
+            self.fail(f"expected {value!r}", path, indent + 4)
+
+        if 'enum' in schema:
+            values = list(schema['enum'])
+            message = 'expected one of ' + ', '.join(repr(value) for value in values)
+            if all(isinstance(value, str) for value in values):
+                self.lines.append(pad + f"if not isinstance({v}, str) or {v} not in {self.constant(frozenset(values))}:")
+            else:
+                self.lines.append(pad + f"if not _member({v}, {self.constant(tuple(values))}):")
+            self.fail(message, path, indent + 4)
+
+        self.guarded(types, 'object', _types['object'], v, indent,
+                     lambda indent: self.object(schema, v, path, indent))
+        self.guarded(types, 'array', _types['array'], v, indent,
+                     lambda indent: self.array(schema, v, path, indent))
+        self.guarded(types, 'string', _types['string'], v, indent,
+                     lambda indent: self.string(schema, v, path, indent))
+        self.guarded(types, 'number', (int, float), v, indent,
+                     lambda indent: self.number(schema, v, path, indent))
+
+        return len(self.lines) > start
+
+    # Keywords only apply to values of their type, so unless the type is
+    # already known their checks go under an isinstance() test.
+    def guarded(self, types, kind, classes, v, indent, emit):
+        if types == [kind] or (kind == 'number' and types in (['integer'], ['number'])):
+            emit(indent)
+            return
+
+        test = f"isinstance({v}, {self.constant(classes[0] if len(classes) == 1 else classes)})"
+        if kind == 'number':
+            test += f" and {v}.__class__ is not bool"
+        header = len(self.lines)
+        self.lines.append(' ' * indent + f"if {test}:")
+        if not emit(indent + 4):
+            del self.lines[header:]
+
+    def object(self, schema, v, path, indent):
+        start = len(self.lines)
+        pad = ' ' * indent
+        required = list(schema.get('required', ()))
+        properties = schema.get('properties', {})
+
+        for k in required:
+            self.lines.append(pad + f"if {k!r} not in {v}:")
+            self.fail(f"missing {k}", path, indent + 4)
+
+        for k, s in properties.items():
+            x = self.name('x')
+            header = len(self.lines)
+            if k in required:
+                self.lines.append(pad + f"{x} = {v}[{k!r}]")
+                inner = indent
+            else:
+                self.lines.append(pad + f"{x} = {v}.get({k!r}, _missing)")
+                self.lines.append(pad + f"if {x} is not _missing:")
+                inner = indent + 4
+            if not self.schema(s, x, path + [repr(k)], inner):
+                del self.lines[header:]
+
+        additional = schema.get('additionalProperties', True)
+        if additional is not True and additional != {}:
+            k, x = self.name('k'), self.name('x')
+            known = self.constant(frozenset(properties))
+            self.lines.append(pad + f"for {k}, {x} in {v}.items():")
+            self.lines.append(pad + f"    if {k} not in {known}:")
+            self.schema(additional, x, path + [k], indent + 8)
+
+        return len(self.lines) > start
+
+    def array(self, schema, v, path, indent):
+        start = len(self.lines)
+        pad = ' ' * indent
+        low, high = schema.get('minItems', 0), schema.get('maxItems')
+
+        if low or high is not None:
+            test = f"len({v}) < {low}" + (f" or len({v}) > {high}" if high is not None else '')
+            self.lines.append(pad + f"if {test}:")
+            self.fail(_range(low, high, 'items'), path, indent + 4)
+
+        if 'items' in schema:
+            i, x = self.name('i'), self.name('x')
+            header = len(self.lines)
+            self.lines.append(pad + f"for {i}, {x} in enumerate({v}):")
+            if not self.schema(schema['items'], x, path + [i], indent + 4):
+                del self.lines[header:]
+
+        return len(self.lines) > start
+
+    def string(self, schema, v, path, indent):
+        start = len(self.lines)
+        pad = ' ' * indent
+        low, high = schema.get('minLength', 0), schema.get('maxLength')
+
+        if low or high is not None:
+            test = f"len({v}) < {low}" + (f" or len({v}) > {high}" if high is not None else '')
+            self.lines.append(pad + f"if {test}:")
+            self.fail(_range(low, high, 'characters'), path, indent + 4)
+
+        if 'pattern' in schema:
+            search = self.constant(re.compile(schema['pattern']).search)
+            self.lines.append(pad + f"if {search}({v}) is None:")
+            self.fail(f"expected to match {schema['pattern']!r}", path, indent + 4)
+
+        return len(self.lines) > start
+
+    def number(self, schema, v, path, indent):
+        start = len(self.lines)
+        pad = ' ' * indent
+        low, high = schema.get('minimum'), schema.get('maximum')
+
+        tests = ([f"{v} < {self.constant(low)}"] if low is not None else []) + \
+                ([f"{v} > {self.constant(high)}"] if high is not None else [])
+        if tests:
+            self.lines.append(pad + f"if {' or '.join(tests)}:")
+            self.fail(_range(low, high), path, indent + 4)
+
+        return len(self.lines) > start
+
+
+# Build the check function for a schema
+def compile(schema):
+    source = _Source()
+    if not source.schema(schema, 'v', [], 4):
+        source.lines.append("    pass")
+
+    code = '\n'.join(["def check(v):"] + source.lines)
+    namespace = dict(source.constants)
+    exec(code, namespace)
+
+    check = namespace['check']
+    check.source = code
+    return check
+
+
+_string_schema = {'type': 'string'}
+_object_schema = {'type': 'object'}
+
+event_schema = {
+    'type': 'object',
+    'required': ['SchemaVersion', 'Sequence', 'InvocationEventType', 'CallDetails'],
+    'properties': {
+        'SchemaVersion': _string_schema,
+        'Sequence': {'type': 'integer', 'minimum': 0},
+        'InvocationEventType': {
+            'enum': ['NEW_INBOUND_CALL', 'NEW_OUTBOUND_CALL', 'RINGING', 'CALL_ANSWERED',
+                     'ACTION_SUCCESSFUL', 'ACTION_FAILED', 'ACTION_INTERRUPTED',
+                     'INVALID_LAMBDA_RESPONSE', 'DIGITS_RECEIVED', 'CALL_UPDATE_REQUESTED',
+                     'HANGUP']
+        },
+        'CallDetails': {
+            'type': 'object',
+            'required': ['TransactionId', 'Participants'],
+            'properties': {
+                'TransactionId': _string_schema,
+                'SipMediaApplicationId': _string_schema,
+                'TransactionAttributes': _object_schema,
+                'Participants': {
+                    'type': 'array',
+                    'items': {
+                        'type': 'object',
+                        'required': ['CallId'],
+                        'properties': {
+                            'CallId': {'type': 'string', 'minLength': 1},
+                            'ParticipantTag': _string_schema,
+                            'To': _string_schema,
+                            'From': _string_schema,
+                            'Direction': {'enum': ['Inbound', 'Outbound']},
+                            'Status': _string_schema,
+                        }
+                    }
+                }
+            }
+        },
+        'ActionData': {
+            'type': 'object',
+            'properties': {
+                'Type': _string_schema,
+                'Parameters': _object_schema,
+            }
+        }
+    }
+}
+
+response_schema = {
+    'type': 'object',
+    'required': ['SchemaVersion', 'Actions'],
+    'properties': {
+        'SchemaVersion': {'const': '1.0'},
+        'Actions': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'required': ['Type', 'Parameters'],
+                'properties': {
+                    'Type': {'type': 'string', 'minLength': 1},
+                    'Parameters': _object_schema,
+                }
+            }
+        },
+        'TransactionAttributes': _object_schema,
+    }
+}
+
+def _mode():
+    mode = os.getenv('SchemaValidation', 'off').strip().lower()
+    return mode if mode in ('log', 'strict') else 'off'
+
+
+mode = _mode()
+
+
+# Compiling a schema takes about a millisecond, so the validators are only
+# compiled at cold start when validation is on; otherwise the first call
+# compiles the validator and replaces itself with it.
+def _lazy(name, schema):
+    def validate(instance):
+        check = globals()[name] = compile(schema)
+        return check(instance)
+
+    return validate
+
+
+if mode == 'off':
+    validate_event = _lazy('validate_event', event_schema)
+    validate_response = _lazy('validate_response', response_schema)
+else:
+    validate_event = compile(event_schema)
+    validate_response = compile(response_schema)
+
+
+# True when the event should be dispatched
+def check_event(event):
+    if mode == 'off':
+        return True
+
+    try:
+        validate_event(event)
+    except ValidationError as e:
+        if mode == 'strict':
+            sma_log.logger.error("invalid event, not dispatched: %s", e)
+            return False
+        sma_log.logger.warning("invalid event: %s", e)
+
+    return True
+
+
+# The response to return to the service
+def check_response(resp):
+    if mode == 'off':
+        return resp
+
+    try:
+        validate_response(resp)
+    except ValidationError as e:
+        if mode == 'strict':
+            sma_log.logger.error("invalid response, replaced by an empty one: %s", e, extra={'data': resp})
+            return {'SchemaVersion': '1.0', 'Actions': []}
+        sma_log.logger.warning("invalid response: %s", e, extra={'data': resp})
+
+    return resp
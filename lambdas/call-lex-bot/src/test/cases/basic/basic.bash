@@ -21,7 +21,7 @@ echo ""; echo "Testing Client Construction"; echo ""; echo ""
 
 # TS validates as part of every call
 pushd ../../..
-single_client_py=$(python3 -m unittest -v -k test_static_client  test/lambda_function_test.py >/dev/null && echo true || echo false)
+single_client_py=$(python3 -m unittest -v -k test_no_client  test/lambda_function_test.py >/dev/null && echo true || echo false)
 popd
 
 single_client_valid=$($single_client_py)
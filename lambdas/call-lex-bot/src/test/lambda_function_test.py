@@ -19,7 +19,6 @@ from array import array
 from ast import expr_context
 from copy import deepcopy
 import json
-from jsonschema import validate
 import os
 import unittest
 from unittest.mock import MagicMock, patch
@@ -27,6 +26,8 @@ import sys
 
 import boto3 
 
+import sma_schema
+
 
 class Test_Lambda_Function(unittest.TestCase):
     
@@ -37,10 +38,10 @@ class Test_Lambda_Function(unittest.TestCase):
             self.test_event = json.load(f)
 
         with open("./test/cases/basic/basic-schema.json") as f:
-            self.basic_schema = json.load(f)
+            self.basic_schema = sma_schema.compile(json.load(f))
 
         with open("./test/cases/new-call/new-call-schema.json") as f:
-            self.new_call_schema = json.load(f)
+            self.new_call_schema = sma_schema.compile(json.load(f))
 
     def tearDown(self):
         # force an import the target function each and every time
@@ -50,7 +51,7 @@ class Test_Lambda_Function(unittest.TestCase):
 
     def check_validate(self, d, s):
         try:
-            validate(instance=d, schema=s)
+            s(d)
             self.assertTrue(True)
         except Exception as e:
             self.assertTrue(False, e.message)
@@ -138,11 +139,12 @@ class Test_Lambda_Function(unittest.TestCase):
     # patch (spy on) boto to trap the client create
     #
     #   NB: the import is cached, so need to remove module after each test
+    #   NB: this lambda makes no AWS calls, so it should never build a client
     #
     @patch('boto3.client')
-    def test_static_client(self, client):
+    def test_no_client(self, client):
         from index import handler
-        self.assertTrue(client.called and (client.call_args.args[0] == 'chime'))
+        self.assertFalse(client.called)
 
     def test_empty(self): 
         event = {}
@@ -0,0 +1,103 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+#
+# Lazily built, per-container AWS clients.
+#
+# Importing boto3 and building a client costs a few hundred milliseconds,
+# which every cold start paid at import whether or not the call ever reached
+# the code that used the client.  client('s3') returns a stand-in that
+# builds (and caches) the real client the first time it is used.
+#
+# Calls made through the stand-in are timed and recorded as sma_metrics
+# "<service>.<operation>" values.
+#
+# Environment:
+#   PREWARM_CLIENTS   comma separated services to build at import, e.g. "transcribe,s3"
+#
+# This file is shared by the python lambdas - keep the copies identical.
+#
+
+import os
+from time import perf_counter
+
+import sma_metrics
+
+
+_clients = {}
+
+
+def get(service):
+    c = _clients.get(service)
+    if c is None:
+        import boto3
+        c = _clients[service] = boto3.client(service)
+
+    return c
+
+
+# Use a ready-made client for a service, e.g. a fake in local tools
+def register(service, c):
+    _clients[service] = c
+
+
+def reset():
+    _clients.clear()
+
+
+def prewarm(*services):
+    for service in services:
+        get(service)
+
+
+def _timed(metric, method):
+    def call(*args, **kwargs):
+        error = False
+        start = perf_counter()
+        try:
+            return method(*args, **kwargs)
+        except Exception:
+            error = True
+            raise
+        finally:
+            sma_metrics.record_call(metric, (perf_counter() - start) * 1000, error)
+
+    return call
+
+
+class LazyClient:
+    def __init__(self, service):
+        self.service = service
+
+    # only called for attributes not set on the stand-in itself, so tests can
+    # still patch.object() a client method
+    def __getattr__(self, name):
+        attr = getattr(get(self.service), name)
+        if not callable(attr):
+            return attr
+
+        return _timed(f"{self.service}.{name}", attr)
+
+    def __repr__(self):
+        return f"LazyClient({self.service!r})"
+
+
+def client(service):
+    return LazyClient(service)
+
+
+prewarm(*[s.strip() for s in os.getenv('PREWARM_CLIENTS', '').split(',') if s.strip()])
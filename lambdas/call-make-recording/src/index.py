@@ -15,28 +15,38 @@
 # SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 # 
 
-import boto3
-from copy import deepcopy 
 import os
 
+import aws_clients
+import session_store
+import sma_event
+import sma_fsm
+import sma_log
+import sma_metrics
+import sma_profile
+import sma_schema
+from sma_actions import fragment, with_params, response
+
+# Set LogLevel using environment variable, fallback to INFO if not present
+logger = sma_log.logger
+log_level = os.getenv('LogLevel', 'INFO')
+if log_level not in ['INFO', 'DEBUG']:
+    log_level = 'INFO'
+logger.setLevel(log_level)
+
 # 
 # statics
 #
-response_template = {
-    'SchemaVersion': '1.0',
-    'Actions': []
-}
-
 wav_file_bucket = os.getenv('WAVFILE_BUCKET', None)
 
-pause_action = {
+pause_action = fragment({
     'Type': "Pause",
     'Parameters': {
         'DurationInMilliseconds': "1000"
     }
-}
+})
 
-play_audio_action = {
+play_audio_action = fragment({
     'Type': "PlayAudio",
     'Parameters': {
         'Repeat': "1",
@@ -46,9 +56,9 @@ play_audio_action = {
             'Key': "",
         }
     }
-}
+})
 
-record_audio_action = {
+_record_audio_action = {
   'Type': "RecordAudio",
   'Parameters': {
     'DurationInSeconds': "30",
@@ -65,8 +75,12 @@ record_audio_action = {
     }
   }
 }
+# the SMA default bucket is used when we don't have one of our own
+if wav_file_bucket is None:
+    _record_audio_action['Parameters']['RecordingDestination'].pop('BucketName')
+record_audio_action = fragment(_record_audio_action)
 
-speak_action = {
+speak_action = fragment({
   'Type': "Speak",
   'Parameters': {
     'Engine': "neural",     #Required. Either standard or neural
@@ -75,168 +89,138 @@ speak_action = {
     'TextType': "ssml",     # Optional. Defaults to text
     'VoiceId': "Matthew"    # Required
   }
-}
+})
 
-hangup_action = {
+hangup_action = fragment({
     'Type': "Hangup",
     'Parameters': {
         'SipResponseCode': "0",
         'ParticipantTag': ""
     }
-}
+})
+
+# actions that never change between calls are built once, here
+greeting_speak = fragment(with_params(speak_action,
+    Text="<speak>Hello!  Please record a message after the tone, and press pound when you are done.</speak>"))
+beep_play = fragment(with_params(play_audio_action, AudioSource={'Key': "500hz-beep.wav"}))
+playback_speak = fragment(with_params(speak_action, Text="<speak>Your message said</speak>"))
+goodbye_speak = fragment(with_params(speak_action, Text="<speak>Thank you!  Goodbye!</speak>"))
+error_speak = fragment(with_params(speak_action, Text="<speak>Sorry, there was an error.</speak>"))
+call_back_speak = fragment(with_params(speak_action,
+    Text="<speak>Hello!  I am just calling you back!  Goodbye!</speak>"))
 
 
 #
 # handlers
 #
 
-chime_client = boto3.client('chime')
+chime_client = aws_clients.client('chime')
 
 def new_call_actions(e):
-    print("new call action")
-    response = deepcopy(response_template)
-    print(f"actions are {response['Actions']}")
-
-    response['Actions'].append(deepcopy(pause_action))
+    logger.debug("new call action")
 
-    speak = deepcopy(speak_action)
-    speak['Parameters']['Text'] =  "<speak>Hello!  Please record a message after the tone, and press pound when you are done.</speak>"
-    response['Actions'].append(speak)    
-
-    response['TransactionAttributes'] = { "state": "new" }
-
-    return response
+    return response(
+        pause_action,
+        greeting_speak,
+        attributes={"state": "new"})
 
 def beep_call(e):
-    response = deepcopy(response_template)
-    print(f"actions are {response['Actions']}")
-
-    response['TransactionAttributes'] = { "state": "beeping" }
-
-    response['Actions'].append(deepcopy(pause_action))
-
-    play = deepcopy(play_audio_action)
-    play['Parameters']['AudioSource']['Key'] = "500hz-beep.wav"
-
-    response['Actions'].append(play)
-
-    return response
+    return response(
+        pause_action,
+        beep_play,
+        attributes={"state": "beeping"})
 
 def record_call(e):
-    response = deepcopy(response_template)
-    print(f"actions are {response['Actions']}")
+    call_id = sma_event.of(e).call.leg_a['CallId']
+    record = with_params(record_audio_action,
+        CallId=call_id,
+        RecordingDestination={'Prefix': f"{call_id}-"})
 
-    response['TransactionAttributes'] = { "state": "recording" }
-    record = deepcopy(record_audio_action)
-    try:
-        if (record['Parameters']['RecordingDestination']['BucketName'] == None):
-            record['Parameters']['RecordingDestination'].pop('BucketName')
-    except:
-        pass
+    return response(
+        record,
+        attributes={"state": "recording"})
 
-    record['Parameters']['CallId'] = e['CallDetails']['Participants'][0]['CallId']
-    record['Parameters']['RecordingDestination']['Prefix'] = f"{e['CallDetails']['Participants'][0]['CallId']}-"
-    response['Actions'].append(record)
-
-    return response
+def has_recording(e):
+    recording = sma_event.of(e).action
+    return isinstance(recording, sma_event.RecordAudio) and recording.key is not None
 
 def playback_recording(e):
-    response = deepcopy(response_template)
-    print(f"actions are {response['Actions']}")
-
-    response['TransactionAttributes'] = { "state": "playing" }
+    play = with_params(play_audio_action,
+        AudioSource={'Key': sma_event.of(e).action.key})
 
-    response['Actions'].append(deepcopy(pause_action))
-
-    speak = deepcopy(speak_action)
-    speak['Parameters']['Text'] =   "<speak>Your message said</speak>"
-    response['Actions'].append(speak)    
-
-    play = deepcopy(play_audio_action)
-    play['Parameters']['AudioSource']['Key'] = e['ActionData']['RecordingDestination']['Key']
-    response['Actions'].append(play)
-
-    return response
+    return response(
+        pause_action,
+        playback_speak,
+        play,
+        attributes={"state": "playing"})
 
 def end_call(e):
-    response = deepcopy(response_template)
-    print(f"actions are {response['Actions']}")
-
-    response['TransactionAttributes'] = { "state": "finishing" }
-    
-    response['Actions'].append(deepcopy(pause_action))
+    return response(
+        pause_action,
+        goodbye_speak,
+        hangup_action,
+        attributes={"state": "finishing"})
 
-    speak = deepcopy(speak_action)
-    speak['Parameters']['Text'] = "<speak>Thank you!  Goodbye!</speak>"
-    response['Actions'].append(speak)  
-
-    response['Actions'].append(deepcopy(hangup_action))
-
-    return response
-
-# state transition table - maps current state to next
-# the tranisition trigger is the 'ACTION_SUCCESSFUL' event 
-transitions = {
-    # current: handler to create next state
-    'new': beep_call,
-    'beeping': record_call,
-    'recording': playback_recording,
-    'playing': end_call
-}
-def run_state_machine(e):
-    response = deepcopy(response_template)
-
-    try:
-        current_state = e['CallDetails']['TransactionAttributes']['state']
-        print(f"current state: {current_state}")
-        response = transitions[e['CallDetails']['TransactionAttributes']['state']](e)
-    except Exception as err:
-        print(f"caught {err}")
-    
-    return response
+def action_failed(e):
+    return response(
+        error_speak,
+        hangup_action,
+        attributes={"state": "finishing"})
 
+def call_ended(e):
+    return response()
 
 def hangup_and_new_call(e):
+    ev = sma_event.of(e)
+    caller = ev.call.leg_a
     params = {
-        'FromPhoneNumber': e['CallDetails']['Participants'][0]['To'],
-        'SipMediaApplicationId': e['CallDetails']['SipMediaApplicationId'],
-        'ToPhoneNumber': e['CallDetails']['Participants'][0]['From'],
+        'FromPhoneNumber': caller['To'],
+        'SipMediaApplicationId': ev.sip_media_application_id,
+        'ToPhoneNumber': caller['From'],
         'SipHeaders': {},
     }
-    response = chime_client.create_sip_media_application_call(**params)
-    print(response)
+    r = chime_client.create_sip_media_application_call(**params)
+    logger.info("create_sip_media_application_call", extra={'data': r})
 
-    return deepcopy(response_template)
+    return response()
 
 
 def call_answered(e):
-    response = deepcopy(response_template)
-
-    response['Actions'].append(deepcopy(pause_action))
-
-    speak = deepcopy(speak_action)
-    speak['Parameters']['Text'] = "<speak>Hello!  I am just calling you back!  Goodbye!</speak>"
-    response['Actions'].append(speak)
-
-    response['Actions'].append(deepcopy(pause_action))
-    response['Actions'].append(deepcopy(hangup_action))
-
-    return response
+    return response(
+        pause_action,
+        call_back_speak,
+        pause_action,
+        hangup_action)
     
-# message - handler mapping table
-action_handlers = {
-    'NEW_INBOUND_CALL': new_call_actions,
-    'ACTION_SUCCESSFUL': run_state_machine
-}
-
+# the call flow - maps the current state and the event that arrived to the
+# handler that creates the next state
+flow = sma_fsm.Flow({
+    'new': {'ACTION_SUCCESSFUL': beep_call},
+    'beeping': {'ACTION_SUCCESSFUL': record_call},
+    'recording': {'ACTION_SUCCESSFUL': [(has_recording, playback_recording)]},
+    'playing': {'ACTION_SUCCESSFUL': end_call},
+    'finishing': {'ACTION_FAILED': None},
+    sma_fsm.ANY: {
+        'NEW_INBOUND_CALL': new_call_actions,
+        'ACTION_FAILED': action_failed,
+        'HANGUP': call_ended,
+    },
+})
+
+
+@sma_profile.profiled
 def handler(event, context):
-    print(f"called with {event}")
-    response = deepcopy(response_template)
-
-    try:
-        response = action_handlers[event['InvocationEventType']](event)
-    except Exception as e:
-        print(e)
-    
-    print(f"returning {response}")
-    return response
\ No newline at end of file
+    with sma_log.invocation(event):
+        logger.info("called with event", extra={'data': event})
+        r = response()
+
+        try:
+            if sma_schema.check_event(event):
+                r = flow.dispatch(event)
+        except Exception as e:
+            logger.error("exception in Event Handler:", exc_info=e)
+
+        r = session_store.finish(sma_event.of(event), r)
+        r = sma_schema.check_response(r)
+        logger.info("returning response", extra={'data': r})
+        return r
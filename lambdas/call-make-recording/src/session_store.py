@@ -0,0 +1,316 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+#
+# Per-call session data, keyed by TransactionId.
+#
+# TransactionAttributes are small and go back and forth with every
+# invocation; anything richer a flow wants to remember about a call is kept
+# here instead, and only its version travels in the attributes (as 'session').
+#
+#   data = session_store.load(ev)              # {} for a new call
+#   data['recordings'] = ...
+#   attrs = session_store.save(ev, data, {'state': 'playing'})
+#
+# Reads are read-through: a per-container LRU answers a warm invocation
+# whose attributes carry the version it holds, and anything else (a cold
+# container, or a newer version written by another container) is read from
+# the backend.  Writes are write-behind: save() updates the LRU, and the
+# writes of an invocation are coalesced and sent to the backend by finish(),
+# which the handler calls once before it returns, so the next invocation
+# finds them wherever it runs.  finish() also carries the version on to
+# responses that set new attributes without saving.  A call that has never
+# saved has no version, and load() doesn't look for its session at all.
+#
+# Since finish() adds the last attribute, it also checks the response's
+# attributes against the budget these lambdas keep for TransactionAttributes,
+# and answers with an empty response when they are over it.
+#
+# A backend only needs get(txn) -> (version, data) or None, put(txn,
+# version, data) and delete(txn).
+#
+# Environment:
+#   SESSION_STORE         memory (default), sqlite or dynamodb
+#   SESSION_CACHE_SIZE    LRU entries per container, default 1024 (0 disables the LRU)
+#   SESSION_TTL_SECONDS   lifetime of a session, default 3600
+#   SESSION_TABLE         DynamoDB table, partition key TransactionId (S)
+#   SESSION_SQLITE_PATH   database file for the sqlite backend, default /tmp/sessions.sqlite3
+#   SMA_ATTRIBUTES_MAX_BYTES  largest TransactionAttributes a response may set, default 1024
+#
+# This file is shared by the python lambdas - keep the copies identical.
+#
+
+from collections import OrderedDict
+import json
+import os
+import time
+
+import aws_clients
+import sma_log
+
+
+logger = sma_log.logger
+
+max_attributes_bytes = int(os.getenv('SMA_ATTRIBUTES_MAX_BYTES', '1024'))
+
+
+# Bytes the attributes take in the event, as compact JSON
+def size(attributes):
+    return len(json.dumps(attributes, separators=(',', ':')).encode())
+
+
+# Per-container dict, holding the sessions as JSON like the other backends.
+# Fine for tests and local tools.  Sessions are kept in the order they were
+# written, so expired ones are dropped from the front as new ones come in, and
+# the oldest beyond max_sessions with them.
+class MemoryBackend:
+    def __init__(self, ttl_seconds=3600, clock=time.time, max_sessions=4096):
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.max_sessions = max_sessions
+        self.sessions = OrderedDict()
+
+    def get(self, txn):
+        entry = self.sessions.get(txn)
+        if entry is None:
+            return None
+        if entry[0] <= self.clock():
+            del self.sessions[txn]
+            return None
+
+        return entry[1], json.loads(entry[2])
+
+    def put(self, txn, version, data):
+        now = self.clock()
+        self.sessions[txn] = (now + self.ttl_seconds, version, json.dumps(data))
+        self.sessions.move_to_end(txn)
+        while self.sessions:
+            oldest = next(iter(self.sessions.values()))
+            if oldest[0] > now and len(self.sessions) <= self.max_sessions:
+                break
+            self.sessions.popitem(last=False)
+
+    def delete(self, txn):
+        self.sessions.pop(txn, None)
+
+
+# A local database file, shared by the processes on one machine, e.g. the
+# lambda-runner workers.
+class SQLiteBackend:
+    def __init__(self, path, ttl_seconds=3600, clock=time.time):
+        import sqlite3
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.db.execute("CREATE TABLE IF NOT EXISTS sessions "
+                        "(txn TEXT PRIMARY KEY, version INTEGER, data TEXT, expires REAL)")
+
+    def get(self, txn):
+        row = self.db.execute("SELECT version, data FROM sessions WHERE txn = ? AND expires > ?",
+                              (txn, self.clock())).fetchone()
+        return None if row is None else (row[0], json.loads(row[1]))
+
+    def put(self, txn, version, data):
+        self.db.execute("INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?)",
+                        (txn, version, json.dumps(data), self.clock() + self.ttl_seconds))
+
+    def delete(self, txn):
+        self.db.execute("DELETE FROM sessions WHERE txn = ?", (txn,))
+
+
+# A write only replaces the same or an older version, so a late write from
+# one container never undoes a newer one from another, while a retried event
+# still replaces what its first attempt wrote.
+class DynamoDBBackend:
+    def __init__(self, table, ttl_seconds=3600):
+        self.table = table
+        self.ttl_seconds = ttl_seconds
+        self.client = aws_clients.client('dynamodb')
+
+    def get(self, txn):
+        r = self.client.get_item(TableName=self.table,
+                                 Key={'TransactionId': {'S': txn}},
+                                 ConsistentRead=True)
+        item = r.get('Item')
+        if item is None or int(item['ExpiresAt']['N']) <= time.time():
+            return None
+
+        return int(item['Version']['N']), json.loads(item['Data']['S'])
+
+    def put(self, txn, version, data):
+        try:
+            self.client.put_item(TableName=self.table, Item={
+                'TransactionId': {'S': txn},
+                'Version': {'N': str(version)},
+                'Data': {'S': json.dumps(data)},
+                'ExpiresAt': {'N': str(int(time.time()) + self.ttl_seconds)}
+            }, ConditionExpression="attribute_not_exists(TransactionId) OR Version <= :v",
+                ExpressionAttributeValues={':v': {'N': str(version)}})
+
+        except Exception as err:
+            if getattr(err, 'response', {}).get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+                raise
+            logger.warning("session %s already has a version newer than %d", txn, version)
+
+    def delete(self, txn):
+        self.client.delete_item(TableName=self.table, Key={'TransactionId': {'S': txn}})
+
+
+class SessionStore:
+    def __init__(self, backend, cache_size=1024):
+        self.backend = backend
+        self.cache_size = cache_size
+        self.lru = OrderedDict()
+        self.pending = {}
+        self.stats = {'hits': 0, 'reads': 0, 'writes': 0, 'errors': 0}
+
+    def _cache(self, txn, version, data):
+        if self.cache_size <= 0:
+            return
+
+        self.lru[txn] = (version, data)
+        self.lru.move_to_end(txn)
+        while len(self.lru) > self.cache_size:
+            self.lru.popitem(last=False)
+
+    # The session at version (or the latest, when version is None) as
+    # (version, data), or (0, {}) when there is none.
+    def get(self, txn, version=None):
+        entry = self.lru.get(txn)
+        if entry is not None and (version is None or entry[0] >= version):
+            self.stats['hits'] += 1
+            self.lru.move_to_end(txn)
+            return entry[0], dict(entry[1])
+
+        self.stats['reads'] += 1
+        try:
+            entry = self.backend.get(txn)
+        except Exception as err:
+            self.stats['errors'] += 1
+            logger.error("exception reading session store:", exc_info=err)
+            entry = None
+
+        if entry is None:
+            return 0, {}
+        if version is not None and entry[0] < version:
+            logger.warning("session %s is at version %d, expected %d", txn, entry[0], version)
+
+        self._cache(txn, *entry)
+        return entry[0], dict(entry[1])
+
+    # Keep data as the version after the given one (the one the event
+    # carried), and return it.  The SMA may retry an event, and the retry
+    # saves the same version as the first attempt.
+    def put(self, txn, data, version=0):
+        version += 1
+
+        data = dict(data)
+        self._cache(txn, version, data)
+        self.pending[txn] = (version, data)
+        return version
+
+    def delete(self, txn):
+        self.lru.pop(txn, None)
+        self.pending.pop(txn, None)
+        try:
+            self.backend.delete(txn)
+        except Exception as err:
+            self.stats['errors'] += 1
+            logger.error("exception deleting from session store:", exc_info=err)
+
+    # Write the sessions saved since the last flush
+    def flush(self):
+        while self.pending:
+            txn, (version, data) = self.pending.popitem()
+            self.stats['writes'] += 1
+            try:
+                self.backend.put(txn, version, data)
+            except Exception as err:
+                self.stats['errors'] += 1
+                logger.error("exception writing session store:", exc_info=err)
+
+
+def from_env():
+    ttl_seconds = int(os.getenv('SESSION_TTL_SECONDS', '3600'))
+    cache_size = int(os.getenv('SESSION_CACHE_SIZE', '1024'))
+
+    kind = os.getenv('SESSION_STORE', 'memory')
+    if kind == 'memory':
+        return SessionStore(MemoryBackend(ttl_seconds), cache_size)
+    if kind == 'sqlite':
+        return SessionStore(SQLiteBackend(os.getenv('SESSION_SQLITE_PATH', '/tmp/sessions.sqlite3'), ttl_seconds),
+                            cache_size)
+    if kind == 'dynamodb':
+        return SessionStore(DynamoDBBackend(os.environ['SESSION_TABLE'], ttl_seconds), cache_size)
+
+    raise ValueError(f"unknown SESSION_STORE {kind!r}")
+
+
+store = from_env()
+
+
+# Swap the store, e.g. for a fresh one in tests
+def set_store(s):
+    global store
+    store = s
+
+
+def _version(ev):
+    try:
+        return int(ev.attribute('session', 0))
+    except ValueError:
+        return 0
+
+
+# The session for an event (an sma_event.Event), {} when there is none yet
+def load(ev):
+    version = _version(ev)
+    if version == 0 or ev.transaction_id is None:
+        return {}
+
+    return store.get(ev.transaction_id, version)[1]
+
+
+# Save the session for an event, and return the response's attributes with
+# the new version in them
+def save(ev, data, attributes):
+    attributes = dict(attributes)
+    attributes['session'] = str(store.put(ev.transaction_id, data, _version(ev)))
+    return attributes
+
+
+# Called by the handler before it returns: write this invocation's sessions
+# (and, on HANGUP, delete the call's), keep the event's session version in the
+# response's attributes and check them against max_attributes_bytes
+def finish(ev, resp):
+    if ev.type == 'HANGUP' and _version(ev) > 0 and ev.transaction_id is not None:
+        store.delete(ev.transaction_id)
+    store.flush()
+
+    version = ev.attribute('session')
+    attrs = resp.get('TransactionAttributes')
+    if attrs is None:
+        return resp
+    if version is not None and 'session' not in attrs:
+        attrs['session'] = version
+
+    n = size(attrs)
+    if n > max_attributes_bytes:
+        logger.error("attributes are %d bytes, more than %d", n, max_attributes_bytes, extra={'data': attrs})
+        return {'SchemaVersion': resp.get('SchemaVersion', '1.0'), 'Actions': []}
+
+    return resp
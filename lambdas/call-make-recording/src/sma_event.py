@@ -0,0 +1,258 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+#
+# Typed view of an SMA invocation event.
+#
+# Handlers read the event through Event rather than walking dict paths such
+# as e['CallDetails']['TransactionAttributes']['params'] and catching the
+# KeyError when a level is missing: every accessor returns None (or an empty
+# dict) instead.  Nothing is decoded up front.  The participant index and the
+# typed ActionData are built on first use and kept while the event holds the
+# same dicts, and every view reads the event's own dicts, so nothing is copied.
+#
+# ActionData comes back as the class for its Type (or, without one, for the
+# fields it carries), with accessors for the fields that action reports:
+#   RecordAudio     .destination, .bucket, .key
+#   ReceivedDigits  .digits (ReceiveDigits, SpeakAndGetDigits, PlayAudioAndGetDigits)
+#   IntentResult    .intent, .intent_name, .intent_state, .slots (StartBotConversation)
+#   CallAndBridge   .endpoints, .destination, .caller_id
+#
+# This file is shared by the python lambdas - keep the copies identical.
+#
+
+from types import MappingProxyType
+
+from call_details import CallDetails
+
+
+# read-only, so a missing level can be shared
+_empty = MappingProxyType({})
+
+
+class ActionData:
+    __slots__ = ('raw',)
+
+    def __init__(self, raw):
+        self.raw = raw
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.raw!r})"
+
+    @property
+    def type(self):
+        return self.raw.get('Type')
+
+    @property
+    def parameters(self):
+        return self.raw.get('Parameters') or _empty
+
+    @property
+    def call_id(self):
+        return self.parameters.get('CallId')
+
+    @property
+    def error_type(self):
+        return self.raw.get('ErrorType')
+
+    @property
+    def error_message(self):
+        return self.raw.get('ErrorMessage')
+
+
+class RecordAudio(ActionData):
+    __slots__ = ()
+
+    @property
+    def destination(self):
+        return self.raw.get('RecordingDestination') or _empty
+
+    @property
+    def bucket(self):
+        return self.destination.get('BucketName')
+
+    @property
+    def key(self):
+        return self.destination.get('Key')
+
+
+class ReceivedDigits(ActionData):
+    __slots__ = ()
+
+    @property
+    def digits(self):
+        return self.raw.get('ReceivedDigits')
+
+
+class IntentResult(ActionData):
+    __slots__ = ('_intent',)
+
+    def __init__(self, raw):
+        super().__init__(raw)
+        self._intent = None
+
+    @property
+    def intent_result(self):
+        return self.raw.get('IntentResult') or _empty
+
+    @property
+    def intent(self):
+        if self._intent is None:
+            session = self.intent_result.get('SessionState') or _empty
+            self._intent = session.get('Intent') or _empty
+        return self._intent
+
+    @property
+    def intent_name(self):
+        return self.intent.get('Name')
+
+    @property
+    def intent_state(self):
+        return self.intent.get('State')
+
+    @property
+    def slots(self):
+        return self.intent.get('Slots') or _empty
+
+
+class CallAndBridge(ActionData):
+    __slots__ = ()
+
+    @property
+    def endpoints(self):
+        return self.parameters.get('Endpoints') or ()
+
+    # the first endpoint's Uri, the number that was called
+    @property
+    def destination(self):
+        endpoints = self.endpoints
+        return endpoints[0].get('Uri') if endpoints else None
+
+    @property
+    def caller_id(self):
+        return self.parameters.get('CallerIdNumber')
+
+
+action_types = {
+    'RecordAudio': RecordAudio,
+    'ReceiveDigits': ReceivedDigits,
+    'ReceivedDigits': ReceivedDigits,
+    'SpeakAndGetDigits': ReceivedDigits,
+    'PlayAudioAndGetDigits': ReceivedDigits,
+    'StartBotConversation': IntentResult,
+    'CallAndBridge': CallAndBridge,
+}
+
+
+# for ActionData without a Type we know, the field that gives the variant away
+action_fields = (
+    ('RecordingDestination', RecordAudio),
+    ('IntentResult', IntentResult),
+    ('ReceivedDigits', ReceivedDigits),
+)
+
+
+def action_data(raw):
+    cls = action_types.get(raw.get('Type'))
+    if cls is None:
+        cls = next((c for field, c in action_fields if field in raw), ActionData)
+    return cls(raw)
+
+
+_no_action = ActionData(_empty)
+
+
+class Event:
+    __slots__ = ('raw', '_call', '_action')
+
+    def __init__(self, raw):
+        self.raw = raw if isinstance(raw, dict) else _empty
+        self._call = None
+        self._action = None
+
+    def __repr__(self):
+        return f"Event({self.type!r}, state={self.state!r}, action={self.action.type!r})"
+
+    @property
+    def type(self):
+        return self.raw.get('InvocationEventType')
+
+    @property
+    def sequence(self):
+        return self.raw.get('Sequence')
+
+    @property
+    def details(self):
+        return self.raw.get('CallDetails') or _empty
+
+    @property
+    def transaction_id(self):
+        return self.details.get('TransactionId')
+
+    @property
+    def sip_media_application_id(self):
+        return self.details.get('SipMediaApplicationId')
+
+    @property
+    def attributes(self):
+        return self.details.get('TransactionAttributes') or _empty
+
+    def attribute(self, name, default=None):
+        return self.attributes.get(name, default)
+
+    @property
+    def state(self):
+        return self.attributes.get('state')
+
+    # The views below are kept for as long as the dicts they index are the ones
+    # in the event, so a handler that updates the event still sees its changes.
+
+    # the participants, indexed (see call_details.py)
+    @property
+    def call(self):
+        details = self.details
+        c = self._call
+        if c is None or c.details is not details or c.count != len(c.participants):
+            c = self._call = CallDetails(details)
+        return c
+
+    @property
+    def action(self):
+        raw = self.raw.get('ActionData') or _empty
+        a = self._action
+        if a is None or a.raw is not raw:
+            a = self._action = action_data(raw) if raw else _no_action
+        return a
+
+    @property
+    def action_type(self):
+        return self.action.type
+
+
+_event = None
+
+
+# The Event for a raw event, shared by every handler that looks at the same
+# invocation.
+def of(raw):
+    global _event
+
+    e = _event
+    if e is None or raw is not e.raw:
+        e = _event = Event(raw)
+
+    return e
@@ -0,0 +1,146 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+#
+# State machine engine for SMA call flows.
+#
+# A flow maps each state (the 'state' TransactionAttribute) to the handlers
+# for the events that can arrive in it:
+#
+#   flow = sma_fsm.Flow({
+#       'new':       {'ACTION_SUCCESSFUL': beep_call},
+#       'recording': {'ACTION_SUCCESSFUL': [(has_recording, playback_recording)]},
+#       'finishing': {'ACTION_FAILED': None},
+#       sma_fsm.ANY: {'NEW_INBOUND_CALL': new_call, 'ACTION_FAILED': action_failed, 'HANGUP': call_ended},
+#   }, timeouts={'recording': (60000, action_failed)})
+#
+# ANY entries apply to every state that has no entry of its own for the event,
+# and to calls in no known state; None takes an entry away.  A list of
+# (guard, handler) pairs goes to the first handler whose guard(event) is true.
+# A Flow is an sma_router.Router with a route per (event type, ANY, state), so
+# dispatch(event) resolves the handler in one lookup, calls it through
+# sma_metrics.call() and counts it against its route.  Events with no
+# handler, or no true guard, go to the default route, a NoOp.
+#
+# Handlers move the call to another state by returning it in the response's
+# TransactionAttributes, as before.  When they do, the time the call entered
+# the new state (ms since the epoch) is kept next to it, as the 'entered'
+# attribute, and the time it spent in the old one is recorded as the
+# StateDwell metric.  A HANGUP ends the time in the last state.  Keeping it in
+# the attributes rather than a session means any container handling the next
+# event has it; responses that set new attributes for the same state carry it
+# on.
+#
+# A state with a timeout, entered longer than its timeout ago, goes to the
+# timeout handler instead of its own handlers.  ANY entries (HANGUP...) are
+# not affected.
+#
+# This file is shared by the python lambdas - keep the copies identical.
+#
+
+import functools
+import time
+
+import sma_event
+import sma_log
+import sma_metrics
+import sma_router
+
+
+logger = sma_log.logger
+
+ANY = sma_router.ANY
+
+
+# The time the call entered its current state, or None when it isn't known
+def _entered(ev):
+    try:
+        return int(ev.attribute('entered'))
+    except (TypeError, ValueError):
+        return None
+
+
+class Flow(sma_router.Router):
+    def __init__(self, states, timeouts=None, clock=time.time, default=sma_router.no_action):
+        self.clock = clock
+        self.states = states
+        self.timeouts = {state: (ms, self._transition(fn)) for state, (ms, fn) in (timeouts or {}).items()}
+
+        routes = {}
+        for state, handlers in states.items():
+            for event_type, routed in handlers.items():
+                routed = self._routes(routed)
+                # the timeout goes first, as a guard on the state's own routes
+                if state in self.timeouts and routed is not None:
+                    routed = ((self._timeout_guard(state), self.timeouts[state][1]), *routed)
+                routes[(event_type, ANY, state)] = routed
+
+        super().__init__(routes, default)
+
+    def _routes(self, handlers):
+        if handlers is None:
+            return None
+        if callable(handlers):
+            return ((None, self._transition(handlers)),)
+
+        return tuple((guard, self._transition(fn)) for guard, fn in handlers)
+
+    # The handler, with the state bookkeeping done while sma_metrics still
+    # times it (and under its name)
+    def _transition(self, fn):
+        @functools.wraps(fn)
+        def transition(event):
+            r = fn(event)
+            self._record(sma_event.of(event), r)
+            return r
+
+        return transition
+
+    def _record(self, ev, r):
+        state = ev.state
+        attrs = r.get('TransactionAttributes') if isinstance(r, dict) else None
+        next_state = attrs.get('state') if attrs else None
+        ended = ev.type == 'HANGUP'
+        if not ended and (next_state is None or next_state == state):
+            entered = ev.attribute('entered')
+            if attrs is not None and entered is not None and 'entered' not in attrs:
+                r['TransactionAttributes'] = dict(attrs, entered=entered)
+            return
+
+        now = self.clock() * 1000
+        entered = _entered(ev)
+        if entered is not None:
+            sma_metrics.record_call('StateDwell', now - entered)
+        if ended:
+            return
+
+        r['TransactionAttributes'] = dict(attrs, entered=str(int(now)))
+
+    def _timeout_guard(self, state):
+        def timed_out(event):
+            return self._timed_out(sma_event.of(event), state)
+
+        return timed_out
+
+    def _timed_out(self, ev, state):
+        ms, _ = self.timeouts[state]
+        entered = _entered(ev)
+        if entered is None or self.clock() * 1000 - entered < ms:
+            return False
+
+        logger.info("%s timed out after %d ms", state, ms)
+        return True
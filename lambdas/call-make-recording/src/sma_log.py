@@ -0,0 +1,159 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+#
+# Structured logging for the SMA handlers.
+#
+# - one compact JSON object per line: {"level", "txn", "msg", "data", "exc"}
+# - payloads are passed as extra={'data': obj} and only serialized when the
+#   record is actually emitted, so a dropped DEBUG line costs nothing
+# - full payloads are only logged for a sampled fraction of calls, chosen by
+#   TransactionId so every invocation of a sampled call is logged
+# - lines are buffered and written with a single write when the invocation ends
+#
+# Environment:
+#   LogSampleRate   fraction (0.0 - 1.0) of calls whose payloads are logged, default 1.0
+#
+# This file is shared by the python lambdas - keep the copies identical.
+#
+
+from contextlib import contextmanager
+import json
+import logging
+import os
+import sys
+import traceback
+import zlib
+
+
+def _sample_rate():
+    try:
+        return min(max(float(os.getenv('LogSampleRate', '1.0')), 0.0), 1.0)
+    except ValueError:
+        return 1.0
+
+
+sample_rate = _sample_rate()
+
+# the largest number of lines held before an early flush
+max_buffered_lines = 1000
+
+# json.dumps() with any non-default option builds a new encoder per call
+_encode = json.JSONEncoder(separators=(',', ':'), default=str, check_circular=False).encode
+
+
+def sampled(transaction_id):
+    if sample_rate >= 1.0:
+        return True
+    if not transaction_id:
+        return False
+
+    return zlib.crc32(transaction_id.encode()) % 10000 < sample_rate * 10000
+
+
+class _Invocation:
+    __slots__ = ('transaction_id', 'sampled')
+
+    def __init__(self, transaction_id=None):
+        self.transaction_id = transaction_id
+        self.sampled = sampled(transaction_id)
+
+
+_current = _Invocation()
+
+
+# A deliberately small stand-in for logging.Logger: the stdlib builds a
+# LogRecord, walks the stack for the caller and takes a lock for every line,
+# which costs more than the line itself in a handler this size.  The method
+# signatures match logging.Logger for the calls the handlers make.
+class Logger:
+    __slots__ = ('level', 'lines')
+
+    def __init__(self, level=logging.INFO):
+        self.level = level
+        self.lines = []
+
+    def setLevel(self, level):
+        if isinstance(level, str):
+            level = logging.getLevelName(level)
+        self.level = level
+
+    def isEnabledFor(self, level):
+        return level >= self.level
+
+    def log(self, level, msg, *args, exc_info=None, extra=None):
+        if level < self.level:
+            return
+
+        entry = {
+            'level': logging.getLevelName(level),
+            'txn': _current.transaction_id,
+            'msg': msg % args if args else msg,
+        }
+        if extra and _current.sampled and extra.get('data') is not None:
+            entry['data'] = extra['data']
+        if exc_info:
+            if exc_info is True:
+                exc_info = sys.exc_info()[1]
+            elif isinstance(exc_info, tuple):
+                exc_info = exc_info[1]
+            entry['exc'] = ''.join(traceback.format_exception(
+                type(exc_info), exc_info, exc_info.__traceback__))
+
+        self.lines.append(_encode(entry))
+        if len(self.lines) >= max_buffered_lines:
+            self.flush()
+
+    def debug(self, msg, *args, **kwargs):
+        self.log(logging.DEBUG, msg, *args, **kwargs)
+
+    def info(self, msg, *args, **kwargs):
+        self.log(logging.INFO, msg, *args, **kwargs)
+
+    def warning(self, msg, *args, **kwargs):
+        self.log(logging.WARNING, msg, *args, **kwargs)
+
+    def error(self, msg, *args, **kwargs):
+        self.log(logging.ERROR, msg, *args, **kwargs)
+
+    def flush(self):
+        if self.lines:
+            lines, self.lines = self.lines, []
+            # resolved on every flush so redirected stdout is honored
+            sys.stdout.write('\n'.join(lines) + '\n')
+
+
+logger = Logger()
+
+
+# Wrap each invocation: tag lines with the TransactionId, make the sampling
+# decision for the call and flush the buffered lines once at the end.
+@contextmanager
+def invocation(event):
+    global _current
+
+    try:
+        transaction_id = event['CallDetails']['TransactionId']
+    except (KeyError, TypeError):
+        transaction_id = None
+
+    _current = _Invocation(transaction_id)
+    try:
+        yield logger
+    finally:
+        logger.flush()
+        _current = _Invocation()
@@ -0,0 +1,229 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+#
+# CloudWatch embedded metric format (EMF) for the SMA handlers.
+#
+# Metrics are written to stdout as JSON lines, which CloudWatch Logs turns
+# into metrics without a PutMetricData call:
+#   HandlerLatency                time spent in the dispatched handler (ms)
+#   <service>.<operation>         time spent in each AWS call (ms)
+#   <service>.<operation>.Errors  calls that raised
+#   StateDwell                    time the call spent in State, when it leaves (ms, sma_fsm)
+# all with the dimensions LambdaName, EventType and State (the state the call
+# was in when the event arrived).  The dispatched handler is kept as a plain
+# property so the lines can be searched in Logs Insights; values of different
+# handlers go on different lines.
+#
+# Handlers call dispatch(), or call() for a handler they looked up themselves
+# (sma_router does), which times the handler and collects the AWS calls
+# (aws_clients records them) made while it runs.
+#
+# By default each invocation writes its lines before it returns.  Encoding a
+# line costs several times the bookkeeping, about as much as a small handler,
+# so invocations with the same dimensions can be batched instead: with
+# MetricsBatchSize > 1 lines carry up to that many invocations' values (EMF
+# allows 100 per metric) and are written at the end of the invocation that
+# fills the batch, or the first one after MetricsFlushSeconds.  Values still
+# buffered when a container is shut down are lost, so batching is opt-in.
+#
+# Environment:
+#   MetricsEnabled       "false" turns metrics off, default on
+#   MetricsNamespace     CloudWatch namespace, default SmaLambdas
+#   MetricsBatchSize     invocations per line, 1 - 100, default 1 (no batching)
+#   MetricsFlushSeconds  the longest a batched value is held, default 60
+#
+# This file is shared by the python lambdas - keep the copies identical.
+#
+
+from json.encoder import encode_basestring as _string
+import os
+import sys
+import time
+
+
+def _env_number(name, default, cast, low, high):
+    try:
+        return min(max(cast(os.getenv(name, default)), low), high)
+    except ValueError:
+        return cast(default)
+
+
+enabled = os.getenv('MetricsEnabled', 'true').lower() not in ('false', '0', 'off', 'no')
+namespace = os.getenv('MetricsNamespace', 'SmaLambdas')
+batch_size = _env_number('MetricsBatchSize', '1', int, 1, 100)
+flush_seconds = _env_number('MetricsFlushSeconds', '60', float, 0.0, 3600.0)
+
+# set by the Lambda runtime, otherwise the lambda's directory when run locally
+lambda_name = os.getenv('AWS_LAMBDA_FUNCTION_NAME') or \
+    os.path.basename(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+dimensions = ('LambdaName', 'EventType', 'State')
+
+# the most values EMF accepts for one metric in one line
+max_values = 100
+
+_clock = time.perf_counter
+
+
+# Everything measured for one set of dimensions and handler since the last flush
+class _Batch:
+    __slots__ = ('event_type', 'state', 'started', 'handler', 'latencies', 'calls', 'errors')
+
+    def __init__(self, event_type, state, handler):
+        self.event_type = event_type
+        self.state = state
+        self.started = time.time()
+        self.handler = handler
+        self.latencies = []
+        self.calls = {}
+        self.errors = {}
+
+
+_batches = {}
+_buffered = 0
+_first = None
+_current = None
+
+# the "_aws" metadata only depends on the metric names, so each distinct set is
+# encoded once
+_directives = {}
+
+
+def _directive(names):
+    d = _directives.get(names)
+    if d is None:
+        metrics = ','.join('{"Name":%s,"Unit":"%s"}' % (_string(n), 'Count' if n.endswith('.Errors') else 'Milliseconds')
+                           for n in names)
+        d = _directives[names] = '"CloudWatchMetrics":[{"Namespace":%s,"Dimensions":[[%s]],"Metrics":[%s]}]' % (
+            _string(namespace), ','.join(map(_string, dimensions)), metrics)
+
+    return d
+
+
+# Milliseconds to three places, one format for the whole list: formatting
+# the values dominates the cost of a line.
+def _values(values, fmt='%.3f'):
+    if len(values) == 1:
+        return fmt % values[0]
+    return '[' + ((fmt + ',') * len(values) % tuple(values))[:-1] + ']'
+
+
+# Encode the EMF lines for a batch, with at most max_values per metric in each.
+def lines(batch):
+    series = []
+    if batch.latencies:
+        series.append(('HandlerLatency', batch.latencies, '%.3f'))
+    for name, values in batch.calls.items():
+        series.append((name, values, '%.3f'))
+    for name, count in batch.errors.items():
+        series.append((name + '.Errors', [count], '%d'))
+
+    out = []
+    head = '{"LambdaName":%s,"EventType":%s,"State":%s' % (
+        _string(lambda_name), _string(batch.event_type or 'none'), _string(batch.state or 'none'))
+    if batch.handler:
+        head += ',"Handler":' + _string(batch.handler)
+    for i in range(0, max((len(v) for _, v, _ in series), default=0), max_values):
+        line = head
+        names = []
+        for name, values, fmt in series:
+            chunk = values[i:i + max_values]
+            if chunk:
+                names.append(name)
+                line += ',%s:%s' % (_string(name), _values(chunk, fmt))
+        out.append('%s,"_aws":{"Timestamp":%d,%s}}' % (line, batch.started * 1000, _directive(tuple(names))))
+
+    return out
+
+
+# Write everything buffered.  Called at the end of an invocation that fills the
+# batch; there is no flush at exit, since the Lambda runtime does not run exit
+# handlers.
+def flush():
+    global _buffered, _first
+
+    out = []
+    for batch in _batches.values():
+        out.extend(lines(batch))
+    _batches.clear()
+    _buffered = 0
+    _first = None
+
+    if out:
+        sys.stdout.write('\n'.join(out) + '\n')
+
+
+def _batch(event, handler):
+    try:
+        key = (event['InvocationEventType'], event['CallDetails']['TransactionAttributes']['state'], handler)
+    except (KeyError, TypeError):
+        try:
+            key = (event.get('InvocationEventType'), None, handler)
+        except AttributeError:
+            key = (None, None, handler)
+
+    batch = _batches.get(key)
+    if batch is None:
+        batch = _batches[key] = _Batch(*key)
+
+    return batch
+
+
+# Call table[key](event), timing the handler and any AWS calls it makes, and
+# write the buffered lines if this invocation fills the batch.  A missing key
+# raises KeyError exactly as the plain lookup would.
+def dispatch(table, key, event):
+    return call(table[key], event)
+
+
+# Call fn(event), timed as dispatch() does
+def call(fn, event):
+    global _current, _buffered, _first
+
+    if not enabled:
+        return fn(event)
+
+    batch = _current = _batch(event, fn.__name__)
+    start = _clock()
+    try:
+        return fn(event)
+    finally:
+        end = _clock()
+        batch.latencies.append((end - start) * 1000)
+        _current = None
+
+        if _first is None:
+            _first = end
+        _buffered += 1
+        if _buffered >= batch_size or end - _first >= flush_seconds:
+            flush()
+
+
+# Record one AWS call (or other duration), in milliseconds, against the
+# current invocation.
+def record_call(name, ms, error=False):
+    batch = _current
+    if batch is None:
+        return
+
+    values = batch.calls.get(name)
+    if values is None:
+        values = batch.calls[name] = []
+    values.append(ms)
+    if error:
+        batch.errors[name] = batch.errors.get(name, 0) + 1
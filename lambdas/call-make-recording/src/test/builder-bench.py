@@ -0,0 +1,196 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+#
+# Micro-benchmark of the fragment based response builder against the
+# deepcopy-the-template handlers it replaced.
+#
+# Run from the src directory:
+#   python3 test/builder-bench.py [iterations]
+#
+
+from contextlib import redirect_stdout
+from copy import deepcopy
+import json
+import os
+import sys
+import timeit
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.setdefault('WAVFILE_BUCKET', 'fake-bucket')
+sys.path.insert(0, os.getcwd())
+
+import index
+
+
+#
+# the original handlers, copied verbatim apart from the debug prints
+#
+response_template = {
+    'SchemaVersion': '1.0',
+    'Actions': []
+}
+
+wav_file_bucket = os.getenv('WAVFILE_BUCKET', None)
+
+pause_action = {
+    'Type': "Pause",
+    'Parameters': {
+        'DurationInMilliseconds': "1000"
+    }
+}
+
+play_audio_action = {
+    'Type': "PlayAudio",
+    'Parameters': {
+        'Repeat': "1",
+        'AudioSource': {
+            'Type': "S3",
+            'BucketName': wav_file_bucket,
+            'Key': "",
+        }
+    }
+}
+
+record_audio_action = {
+  'Type': "RecordAudio",
+  'Parameters': {
+    'DurationInSeconds': "30",
+    'CallId': "call-id-1",
+    'SilenceDurationInSeconds': 3,
+    'SilenceThreshold': 100,
+    'RecordingTerminators': [
+      "#"
+    ],
+    'RecordingDestination': {
+      'Type': "S3",
+      'BucketName': wav_file_bucket,
+      'Prefix': ""
+    }
+  }
+}
+
+speak_action = {
+  'Type': "Speak",
+  'Parameters': {
+    'Engine': "neural",
+    'LanguageCode': "en-US",
+    'Text': "",
+    'TextType': "ssml",
+    'VoiceId': "Matthew"
+  }
+}
+
+hangup_action = {
+    'Type': "Hangup",
+    'Parameters': {
+        'SipResponseCode': "0",
+        'ParticipantTag': ""
+    }
+}
+
+
+def new_call_actions(e):
+    response = deepcopy(response_template)
+    response['Actions'].append(deepcopy(pause_action))
+    speak = deepcopy(speak_action)
+    speak['Parameters']['Text'] =  "<speak>Hello!  Please record a message after the tone, and press pound when you are done.</speak>"
+    response['Actions'].append(speak)
+    response['TransactionAttributes'] = { "state": "new" }
+    return response
+
+def beep_call(e):
+    response = deepcopy(response_template)
+    response['TransactionAttributes'] = { "state": "beeping" }
+    response['Actions'].append(deepcopy(pause_action))
+    play = deepcopy(play_audio_action)
+    play['Parameters']['AudioSource']['Key'] = "500hz-beep.wav"
+    response['Actions'].append(play)
+    return response
+
+def record_call(e):
+    response = deepcopy(response_template)
+    response['TransactionAttributes'] = { "state": "recording" }
+    record = deepcopy(record_audio_action)
+    try:
+        if (record['Parameters']['RecordingDestination']['BucketName'] == None):
+            record['Parameters']['RecordingDestination'].pop('BucketName')
+    except:
+        pass
+    record['Parameters']['CallId'] = e['CallDetails']['Participants'][0]['CallId']
+    record['Parameters']['RecordingDestination']['Prefix'] = f"{e['CallDetails']['Participants'][0]['CallId']}-"
+    response['Actions'].append(record)
+    return response
+
+def playback_recording(e):
+    response = deepcopy(response_template)
+    response['TransactionAttributes'] = { "state": "playing" }
+    response['Actions'].append(deepcopy(pause_action))
+    speak = deepcopy(speak_action)
+    speak['Parameters']['Text'] =   "<speak>Your message said</speak>"
+    response['Actions'].append(speak)
+    play = deepcopy(play_audio_action)
+    play['Parameters']['AudioSource']['Key'] = e['ActionData']['RecordingDestination']['Key']
+    response['Actions'].append(play)
+    return response
+
+def end_call(e):
+    response = deepcopy(response_template)
+    response['TransactionAttributes'] = { "state": "finishing" }
+    response['Actions'].append(deepcopy(pause_action))
+    speak = deepcopy(speak_action)
+    speak['Parameters']['Text'] = "<speak>Thank you!  Goodbye!</speak>"
+    response['Actions'].append(speak)
+    response['Actions'].append(deepcopy(hangup_action))
+    return response
+
+
+def bench(f, event, number):
+    return min(timeit.repeat(lambda: f(event), number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    with open("../events/inbound.json") as f:
+        event = json.load(f)
+    event['ActionData'] = {'RecordingDestination': {
+        'Type': "S3",
+        'BucketName': "fake-bucket",
+        'Key': "9ff01357-23c5-4611-9dd3-f05f9d654faa-/9ff01357-23c5-4611-9dd3-f05f9d654faa-0.wav"}}
+
+    print(f"{'handler':<20} {'deepcopy us':>12} {'builder us':>12} {'speedup':>8}")
+    for name, legacy in [('new_call_actions', new_call_actions),
+                         ('beep_call', beep_call),
+                         ('record_call', record_call),
+                         ('playback_recording', playback_recording),
+                         ('end_call', end_call)]:
+        builder = getattr(index, name)
+
+        # both paths must produce the same response
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            assert json.dumps(builder(event), sort_keys=True) == json.dumps(legacy(event), sort_keys=True), name
+
+        # the handlers' debug prints are not what we are measuring
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            old = bench(legacy, event, number)
+            new = bench(builder, event, number)
+        print(f"{name:<20} {old:>12.2f} {new:>12.2f} {old / new:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
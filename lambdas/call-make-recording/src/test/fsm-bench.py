@@ -0,0 +1,92 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+#
+# Dispatch cost per transition of sma_fsm.Flow against the hand-written
+# state -> handler dict it replaced, with handlers that do nothing else.
+#
+#   dict          transitions.get(state)(event)
+#   stay          Flow.dispatch, the handler keeps the call in its state
+#   guarded       the same, through a route with a guard
+#   transition    Flow.dispatch to a new state: the entry time is added to the
+#                 attributes and the dwell time recorded
+#   timeout       a state with a timeout, so the entry time is checked first
+#
+# Run from the src directory:
+#   python3 test/fsm-bench.py [iterations]
+#
+
+import os
+import sys
+import time
+import timeit
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ['MetricsEnabled'] = 'false'
+sys.path.insert(0, os.getcwd())
+
+import sma_fsm
+
+TXN = "c5a25427-88f4-4bf6-b4b2-f44659300bdc"
+
+
+def stay(e):
+    return {'SchemaVersion': '1.0', 'Actions': []}
+
+
+def move(e):
+    return {'SchemaVersion': '1.0', 'Actions': [], 'TransactionAttributes': {'state': 'next'}}
+
+
+def recorded(e):
+    return True
+
+
+def event(state, entered):
+    return {'InvocationEventType': 'ACTION_SUCCESSFUL', 'ActionData': {},
+            'CallDetails': {'TransactionId': TXN, 'TransactionAttributes': {'state': state, 'entered': entered}}}
+
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    now = str(int(time.time() * 1000))
+    transitions = {'stay': stay}
+    flow = sma_fsm.Flow({
+        'stay': {'ACTION_SUCCESSFUL': stay},
+        'guarded': {'ACTION_SUCCESSFUL': [(recorded, stay)]},
+        'move': {'ACTION_SUCCESSFUL': move},
+        'timed': {'ACTION_SUCCESSFUL': stay},
+        sma_fsm.ANY: {'HANGUP': stay, 'ACTION_FAILED': stay},
+    }, timeouts={'timed': (3600000, move)})
+
+    cases = [
+        ('dict', event('stay', now), lambda e: transitions.get(e['CallDetails']['TransactionAttributes']['state'])(e)),
+        ('stay', event('stay', now), flow.dispatch),
+        ('guarded', event('guarded', now), flow.dispatch),
+        ('transition', event('move', now), flow.dispatch),
+        ('timeout', event('timed', now), flow.dispatch),
+    ]
+
+    print(f"{'dispatch':<11} {'us':>7}")
+    for name, e, f in cases:
+        us = min(timeit.repeat(lambda: f(e), number=number, repeat=5)) / number * 1e6
+        print(f"{name:<11} {us:>7.2f}")
+
+
+if __name__ == '__main__':
+    main()
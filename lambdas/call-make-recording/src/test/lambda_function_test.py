@@ -19,7 +19,6 @@ from array import array
 from ast import expr_context
 import json
 from tabnanny import check
-from jsonschema import validate
 import os
 import unittest
 from unittest.mock import MagicMock, patch
@@ -27,6 +26,8 @@ import sys
 
 import boto3 
 
+import sma_schema
+
 
 class Test_Lambda_Function(unittest.TestCase):
     
@@ -37,10 +38,10 @@ class Test_Lambda_Function(unittest.TestCase):
             self.test_event = json.load(f)
 
         with open("./test/cases/basic/basic-schema.json") as f:
-            self.basic_schema = json.load(f)
+            self.basic_schema = sma_schema.compile(json.load(f))
 
         with open("./test/cases/new-call/new-call-schema.json") as f:
-            self.new_call_schema = json.load(f)
+            self.new_call_schema = sma_schema.compile(json.load(f))
 
     def setUp(self) -> None:
         super().setUp()
@@ -60,7 +61,7 @@ class Test_Lambda_Function(unittest.TestCase):
 
     def check_validate(self, d, s):
         try:
-            validate(instance=d, schema=s)
+            s(d)
             self.assertTrue(True)
         except Exception as e:
             self.assertTrue(False, e.message)
@@ -148,11 +149,20 @@ class Test_Lambda_Function(unittest.TestCase):
     # patch (spy on) boto to trap the client create
     #
     #   NB: the import is cached, so need to remove module after each test
+    #   NB: clients are built on first use, not at import
     #
     @patch('boto3.client')
-    def test_static_client(self, client):
-        from index import handler
-        self.assertTrue(client.called and (client.call_args.args[0] == 'chime'))
+    def test_lazy_client(self, client):
+        import aws_clients
+        aws_clients.reset()
+
+        import index
+        self.assertFalse(client.called)
+
+        index.chime_client.create_sip_media_application_call
+        index.chime_client.create_sip_media_application_call
+        self.assertTrue(client.call_count == 1 and (client.call_args.args[0] == 'chime'))
+        aws_clients.reset()
 
     def test_empty(self): 
         event = {}
@@ -253,7 +263,31 @@ class Test_Lambda_Function(unittest.TestCase):
     def test_action_failed(self):
         event = self.test_event.copy()
         event['InvocationEventType'] = "ACTION_FAILED"
-        self.call_and_test(event, [self.check_schema_10])
+        event['CallDetails']['TransactionAttributes'] = { "state": "recording" }
+        self.call_and_test(event,
+            [ self.check_schema_10,
+              self.check_speak,
+              self.check_hangup,
+              lambda d: self.check_transaction_state(d, "finishing")
+            ])
+
+    def test_action_failed_finishing(self):
+        event = self.test_event.copy()
+        event['InvocationEventType'] = "ACTION_FAILED"
+        event['CallDetails']['TransactionAttributes'] = { "state": "finishing" }
+        self.call_and_test(event,
+            [ self.check_schema_10,
+              lambda d: self.assertEqual(d['Actions'], [])
+            ])
+
+    def test_recording_without_recording(self):
+        event = self.test_event.copy()
+        event['InvocationEventType'] = "ACTION_SUCCESSFUL"
+        event['CallDetails']['TransactionAttributes'] = { "state": "recording" }
+        self.call_and_test(event,
+            [ self.check_schema_10,
+              lambda d: self.assertEqual(d['Actions'], [])
+            ])
 
     def test_bad_action(self):
         event = self.test_event.copy()
@@ -0,0 +1,113 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+#
+# Latency of the session store per invocation, for each backend, on a warm
+# container (the LRU holds the call's session) and a cold one (it is read
+# from the backend), with and without the LRU.  Each invocation loads the
+# session and finishes; the 'save' rows also save it, so their backend
+# write is paid on every invocation, warm or not.
+# The dynamodb row is the memory backend behind a fixed round trip per
+# request, set with --rtt-ms.
+#
+# Run from the src directory:
+#   python3 test/session-bench.py [--rtt-ms 5] [-n 200]
+#
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import timeit
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+sys.path.insert(0, os.getcwd())
+
+import session_store
+import sma_event
+from session_store import MemoryBackend, SessionStore, SQLiteBackend
+
+TXN = "c5a25427-88f4-4bf6-b4b2-f44659300bdc"
+DATA = {'recordings': [f"{TXN}-2022-02-20-01-45-53.wav"], 'digits': "14155551212", 'attempts': 1}
+
+
+class RemoteBackend:
+    def __init__(self, backend, rtt_ms):
+        self.backend = backend
+        self.rtt = rtt_ms / 1000
+
+    def get(self, txn):
+        time.sleep(self.rtt)
+        return self.backend.get(txn)
+
+    def put(self, txn, version, data):
+        time.sleep(self.rtt)
+        self.backend.put(txn, version, data)
+
+    def delete(self, txn):
+        time.sleep(self.rtt)
+        self.backend.delete(txn)
+
+
+def invocation(attributes, save):
+    ev = sma_event.of({'CallDetails': {'TransactionId': TXN, 'TransactionAttributes': attributes}})
+    data = session_store.load(ev)
+    data['attempts'] = data.get('attempts', 0) + 1
+    r = {'TransactionAttributes': {'state': "playing"}}
+    if save:
+        r['TransactionAttributes'] = session_store.save(ev, data, r['TransactionAttributes'])
+    return session_store.finish(ev, r)['TransactionAttributes']
+
+
+def bench(store, save, warm, number):
+    session_store.set_store(store)
+    attributes = invocation({'state': "new"}, True)
+
+    def run():
+        nonlocal attributes
+        if not warm:
+            store.lru.clear()
+        attributes = invocation(attributes, save)
+
+    return min(timeit.repeat(run, number=number, repeat=3)) / number * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rtt-ms', type=float, default=5)
+    parser.add_argument('-n', '--number', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = [
+            ('memory', lambda: MemoryBackend()),
+            ('sqlite', lambda: SQLiteBackend(os.path.join(tmp, "sessions.sqlite3"))),
+            ('dynamodb', lambda: RemoteBackend(MemoryBackend(), args.rtt_ms)),
+        ]
+
+        print(f"{'backend':<9} {'lru':>5} {'':<5} {'warm ms':>9} {'cold ms':>9}")
+        for name, backend in backends:
+            for cache_size in (1024, 0):
+                for save in (False, True):
+                    warm = bench(SessionStore(backend(), cache_size), save, True, args.number)
+                    cold = bench(SessionStore(backend(), cache_size), save, False, args.number)
+                    print(f"{name:<9} {cache_size:>5} {'save' if save else 'load':<5} {warm:>9.3f} {cold:>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
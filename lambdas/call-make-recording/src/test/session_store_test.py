@@ -0,0 +1,229 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+import io
+import unittest
+from unittest.mock import MagicMock, patch
+
+import session_store
+import sma_event
+from session_store import DynamoDBBackend, MemoryBackend, SessionStore, SQLiteBackend
+
+TXN = "c5a25427-88f4-4bf6-b4b2-f44659300bdc"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class ConditionFailed(Exception):
+    response = {'Error': {'Code': 'ConditionalCheckFailedException'}}
+
+
+def event(attributes):
+    return sma_event.of({'InvocationEventType': "ACTION_SUCCESSFUL",
+                         'CallDetails': {'TransactionId': TXN, 'TransactionAttributes': attributes}})
+
+
+class Test_Session_Store(unittest.TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+
+        self.backend = MagicMock(wraps=MemoryBackend())
+        self.store = SessionStore(self.backend, cache_size=2)
+        self.saved = session_store.store
+        session_store.set_store(self.store)
+
+    def tearDown(self) -> None:
+        session_store.set_store(self.saved)
+        super().tearDown()
+
+    def test_write_behind(self):
+        self.assertEqual(self.store.put(TXN, {'a': 1}), 1)
+        self.assertEqual(self.store.put(TXN, {'a': 2}, 1), 2)
+        self.assertFalse(self.backend.put.called)
+
+        # the LRU answers before anything is written
+        self.assertEqual(self.store.get(TXN, 2), (2, {'a': 2}))
+
+        self.store.flush()
+        self.backend.put.assert_called_once_with(TXN, 2, {'a': 2})
+        self.assertEqual(self.store.stats, {'hits': 1, 'reads': 0, 'writes': 1, 'errors': 0})
+
+    def test_read_through(self):
+        self.backend.put(TXN, 3, {'a': 3})
+
+        self.assertEqual(self.store.get(TXN, 3), (3, {'a': 3}))
+        self.assertEqual(self.store.get(TXN, 3), (3, {'a': 3}))
+        self.assertEqual(self.backend.get.call_count, 1)
+
+        # a newer version, written by another container
+        self.backend.put(TXN, 4, {'a': 4})
+        self.assertEqual(self.store.get(TXN, 4), (4, {'a': 4}))
+        self.assertEqual(self.backend.get.call_count, 2)
+
+        self.assertEqual(self.store.get("other"), (0, {}))
+
+    def test_copies(self):
+        data = {'a': 1}
+        self.store.put(TXN, data)
+        data['a'] = 2
+        self.store.get(TXN)[1]['a'] = 3
+        self.assertEqual(self.store.get(TXN), (1, {'a': 1}))
+
+    def test_retried_event(self):
+        self.store.put(TXN, {'a': 1}, 1)
+        self.assertEqual(self.store.put(TXN, {'a': 2}, 1), 2)
+        self.store.flush()
+        self.assertEqual(self.backend.get(TXN), (2, {'a': 2}))
+
+    def test_evicted(self):
+        for txn in ["t1", "t2", "t3"]:
+            self.store.put(txn, {'txn': txn})
+        self.store.flush()
+
+        self.assertEqual(list(self.store.lru), ["t2", "t3"])
+        self.assertEqual(self.store.get("t1"), (1, {'txn': "t1"}))
+        self.assertEqual(self.backend.get.call_count, 1)
+
+    def test_backend_errors(self):
+        self.backend.get.side_effect = Exception('Boom!')
+        self.backend.put.side_effect = Exception('Boom!')
+
+        self.assertEqual(self.store.get(TXN), (0, {}))
+        self.store.put(TXN, {'a': 1})
+        self.store.flush()
+        self.assertEqual(self.store.stats['errors'], 2)
+        self.assertEqual(self.store.pending, {})
+
+    def test_load_save_finish(self):
+        ev = event({'state': "new"})
+        self.assertEqual(session_store.load(ev), {})
+        self.assertFalse(self.backend.get.called)
+
+        attrs = session_store.save(ev, {'recordings': ["key"]}, {'state': "beeping"})
+        self.assertEqual(attrs, {'state': "beeping", 'session': "1"})
+        session_store.finish(ev, {'TransactionAttributes': attrs})
+        self.assertEqual(self.backend.get(TXN), (1, {'recordings': ["key"]}))
+
+        # a cold container reads it back once
+        session_store.set_store(SessionStore(self.backend))
+        ev = event(attrs)
+        self.assertEqual(session_store.load(ev), {'recordings': ["key"]})
+        self.assertEqual(session_store.load(ev), {'recordings': ["key"]})
+        self.assertEqual(self.backend.get.call_count, 2)
+
+        # and a response that doesn't save keeps the version
+        r = session_store.finish(ev, {'TransactionAttributes': {'state': "playing"}})
+        self.assertEqual(r['TransactionAttributes'], {'state': "playing", 'session': "1"})
+        self.assertEqual(session_store.finish(ev, {}), {})
+
+    def test_finish_attributes_budget(self):
+        ev = event({'state': "new", 'session': "1"})
+        attrs = {'state': "beeping", 'note': "x" * 30}
+        with patch.object(session_store, 'max_attributes_bytes', 64), patch('sys.stdout', io.StringIO()):
+            r = session_store.finish(ev, {'SchemaVersion': "1.0", 'Actions': [{}], 'TransactionAttributes': attrs})
+
+        # under the budget on its own, over it once the session version is added
+        self.assertLessEqual(session_store.size({'state': "beeping", 'note': "x" * 30}), 64)
+        self.assertEqual(r, {'SchemaVersion': "1.0", 'Actions': []})
+
+    def test_memory_ttl(self):
+        clock = FakeClock()
+        backend = MemoryBackend(ttl_seconds=10, clock=clock)
+        backend.put(TXN, 1, {'a': 1})
+        clock.now += 10
+        self.assertIsNone(backend.get(TXN))
+
+    def test_memory_evicts(self):
+        clock = FakeClock()
+        backend = MemoryBackend(ttl_seconds=10, clock=clock, max_sessions=2)
+        backend.put("t1", 1, {})
+        clock.now += 5
+        backend.put("t2", 1, {})
+        backend.put("t3", 1, {})
+        self.assertEqual(list(backend.sessions), ["t2", "t3"])
+
+        # expired sessions go when they are read, or when another is written
+        clock.now += 5
+        backend.put("t2", 2, {})
+        self.assertEqual(list(backend.sessions), ["t3", "t2"])
+        clock.now += 5
+        self.assertIsNone(backend.get("t3"))
+        self.assertEqual(list(backend.sessions), ["t2"])
+
+    def test_hangup_deletes(self):
+        ev = event({'state': "new"})
+        attrs = session_store.save(ev, {'a': 1}, {'state': "beeping"})
+        session_store.finish(ev, {'TransactionAttributes': attrs})
+
+        hangup = sma_event.of({'InvocationEventType': "HANGUP",
+                               'CallDetails': {'TransactionId': TXN, 'TransactionAttributes': attrs}})
+        session_store.finish(hangup, {})
+        self.backend.delete.assert_called_once_with(TXN)
+        self.assertIsNone(self.backend.get(TXN))
+        self.assertNotIn(TXN, self.store.lru)
+
+    def test_sqlite(self):
+        clock = FakeClock()
+        backend = SQLiteBackend(":memory:", ttl_seconds=10, clock=clock)
+        self.assertIsNone(backend.get(TXN))
+
+        backend.put(TXN, 1, {'a': 1})
+        backend.put(TXN, 2, {'a': [2]})
+        self.assertEqual(backend.get(TXN), (2, {'a': [2]}))
+
+        backend.delete(TXN)
+        self.assertIsNone(backend.get(TXN))
+
+        backend.put(TXN, 1, {'a': 1})
+        clock.now += 10
+        self.assertIsNone(backend.get(TXN))
+
+    def test_dynamodb(self):
+        client = MagicMock()
+        with patch.object(session_store.aws_clients, 'client', return_value=client):
+            backend = DynamoDBBackend("sessions")
+
+        backend.put(TXN, 2, {'a': 1})
+        kwargs = client.put_item.call_args.kwargs
+        item = kwargs['Item']
+        self.assertEqual(item['TransactionId'], {'S': TXN})
+        self.assertEqual(item['Version'], {'N': "2"})
+        self.assertEqual(kwargs['ExpressionAttributeValues'], {':v': {'N': "2"}})
+
+        client.get_item.return_value = {'Item': item}
+        self.assertEqual(backend.get(TXN), (2, {'a': 1}))
+        client.get_item.return_value = {}
+        self.assertIsNone(backend.get(TXN))
+
+        # an older write loses to a newer one, other errors are raised
+        client.put_item.side_effect = ConditionFailed()
+        with patch('sys.stdout', io.StringIO()):
+            backend.put(TXN, 1, {'a': 0})
+        client.put_item.side_effect = Exception('Boom!')
+        with self.assertRaises(Exception):
+            backend.put(TXN, 3, {'a': 3})
+
+
+if __name__ == '__main__':
+    unittest.main()
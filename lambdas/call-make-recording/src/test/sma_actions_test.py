@@ -0,0 +1,88 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+from copy import deepcopy
+import json
+import unittest
+
+from sma_actions import fragment, with_params, response
+
+
+class Test_Sma_Actions(unittest.TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+
+        self.record = fragment({
+            'Type': "RecordAudio",
+            'Parameters': {
+                'CallId': "call-id-1",
+                'RecordingTerminators': ["#"],
+                'RecordingDestination': {
+                    'Type': "S3",
+                    'BucketName': "fake-bucket",
+                    'Prefix': ""
+                }
+            }
+        })
+
+    def test_fragment_is_immutable(self):
+        with self.assertRaises(TypeError):
+            self.record['Type'] = "Pause"
+        with self.assertRaises(TypeError):
+            self.record['Parameters']['RecordingDestination'].pop('Prefix')
+        with self.assertRaises(TypeError):
+            self.record['Parameters'].update({'CallId': "other"})
+
+        self.assertIsInstance(self.record['Parameters']['RecordingTerminators'], tuple)
+
+    def test_with_params_copies_only_changed_path(self):
+        r = with_params(self.record, CallId="abc",
+                        RecordingDestination={'Prefix': "abc-"})
+
+        self.assertEqual(r['Parameters']['CallId'], "abc")
+        self.assertEqual(r['Parameters']['RecordingDestination']['Prefix'], "abc-")
+        self.assertEqual(r['Parameters']['RecordingDestination']['BucketName'], "fake-bucket")
+
+        # untouched branches are shared, the fragment is unchanged
+        self.assertIs(r['Parameters']['RecordingTerminators'],
+                      self.record['Parameters']['RecordingTerminators'])
+        self.assertEqual(self.record['Parameters']['CallId'], "call-id-1")
+        self.assertEqual(self.record['Parameters']['RecordingDestination']['Prefix'], "")
+
+        # the copied path belongs to the caller
+        r['Parameters']['CallId'] = "xyz"
+        self.assertEqual(self.record['Parameters']['CallId'], "call-id-1")
+
+    def test_response_is_fresh(self):
+        a = response(self.record, attributes={'state': "new"})
+        b = response(self.record)
+
+        self.assertIsNot(a['Actions'], b['Actions'])
+        self.assertEqual(a['TransactionAttributes'], {'state': "new"})
+        self.assertNotIn('TransactionAttributes', b)
+
+        a['Actions'].append(self.record)
+        self.assertEqual(len(b['Actions']), 1)
+
+    def test_serializes_as_plain_json(self):
+        r = response(self.record)
+        self.assertEqual(json.loads(json.dumps(r)), json.loads(json.dumps(deepcopy(r))))
+
+        copied = deepcopy(self.record)
+        copied['Parameters']['CallId'] = "abc"
+        self.assertEqual(self.record['Parameters']['CallId'], "call-id-1")
@@ -0,0 +1,159 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+import io
+import json
+import unittest
+from unittest.mock import patch
+
+import sma_fsm
+import sma_metrics
+
+TXN = "c5a25427-88f4-4bf6-b4b2-f44659300bdc"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def event(event_type, state=None, entered=None, **data):
+    attrs = {} if state is None else {'state': state}
+    if entered is not None:
+        attrs['entered'] = entered
+    return {'InvocationEventType': event_type, 'ActionData': data,
+            'CallDetails': {'TransactionId': TXN, 'TransactionAttributes': attrs}}
+
+
+def to(state):
+    def handler(e):
+        return {'Actions': [state], 'TransactionAttributes': {'state': state}}
+    handler.__name__ = f"to_{state}"
+    return handler
+
+
+def stay(e):
+    return {'Actions': ['stay']}
+
+
+def poll(e):
+    return {'Actions': ['poll'], 'TransactionAttributes': {'state': e['CallDetails']['TransactionAttributes']['state']}}
+
+
+def is_recorded(e):
+    return e['ActionData'].get('recorded', False)
+
+
+class Test_Sma_Fsm(unittest.TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+
+        self.clock = FakeClock()
+        self.flow = sma_fsm.Flow({
+            'new': {'ACTION_SUCCESSFUL': to('recording')},
+            'recording': {'ACTION_SUCCESSFUL': [(is_recorded, to('playing')), (None, stay)], 'RINGING': poll},
+            'playing': {'ACTION_SUCCESSFUL': [(is_recorded, to('finishing'))]},
+            'finishing': {'ACTION_FAILED': None},
+            sma_fsm.ANY: {'NEW_INBOUND_CALL': to('new'), 'ACTION_FAILED': to('finishing'), 'HANGUP': stay},
+        }, timeouts={'recording': (5000, to('timed_out'))}, clock=self.clock)
+
+    def test_routes_table(self):
+        self.assertEqual(set(self.flow.routes), {
+            ('ACTION_SUCCESSFUL', sma_fsm.ANY, 'new'), ('ACTION_SUCCESSFUL', sma_fsm.ANY, 'recording'),
+            ('RINGING', sma_fsm.ANY, 'recording'),
+            ('ACTION_SUCCESSFUL', sma_fsm.ANY, 'playing'), ('ACTION_FAILED', sma_fsm.ANY, 'finishing'),
+            ('NEW_INBOUND_CALL', sma_fsm.ANY, sma_fsm.ANY), ('ACTION_FAILED', sma_fsm.ANY, sma_fsm.ANY),
+            ('HANGUP', sma_fsm.ANY, sma_fsm.ANY)})
+        self.assertEqual(self.flow.routes[('ACTION_FAILED', sma_fsm.ANY, 'finishing')].handlers, ())
+
+    def test_routes(self):
+        self.assertEqual(self.flow.dispatch(event('NEW_INBOUND_CALL'))['Actions'], ['new'])
+        self.assertEqual(self.flow.dispatch(event('ACTION_SUCCESSFUL', 'new'))['Actions'], ['recording'])
+        self.assertEqual(self.flow.dispatch(event('ACTION_FAILED', 'playing'))['Actions'], ['finishing'])
+        # an unknown state only has the ANY entries
+        self.assertEqual(self.flow.dispatch(event('ACTION_FAILED', 'bogus'))['Actions'], ['finishing'])
+
+        # no handler is a NoOp from the default route
+        for e in [event('ACTION_SUCCESSFUL', 'bogus'), event('ACTION_FAILED', 'finishing'), event('RINGING', 'new')]:
+            with self.subTest(e=e):
+                self.assertEqual(self.flow.dispatch(e), {'SchemaVersion': '1.0', 'Actions': []})
+        self.assertEqual(self.flow.default.hits, 3)
+
+    def test_guards(self):
+        self.assertEqual(self.flow.dispatch(event('ACTION_SUCCESSFUL', 'recording', recorded=True))['Actions'],
+                         ['playing'])
+        self.assertEqual(self.flow.dispatch(event('ACTION_SUCCESSFUL', 'recording'))['Actions'], ['stay'])
+        self.assertEqual(self.flow.dispatch(event('ACTION_SUCCESSFUL', 'playing'))['Actions'], [])
+
+    def test_entered_and_dwell(self):
+        enabled = sma_metrics.enabled
+        sma_metrics.enabled = True
+        out = io.StringIO()
+        try:
+            # drop anything buffered by the handler tests
+            with patch('sys.stdout', io.StringIO()):
+                sma_metrics.flush()
+            with patch('sys.stdout', out), patch.object(sma_metrics, 'batch_size', 1):
+                r = self.flow.dispatch(event('NEW_INBOUND_CALL'))
+                self.assertEqual(r['TransactionAttributes'], {'state': 'new', 'entered': "1000000"})
+
+                self.clock.now += 1.5
+                r = self.flow.dispatch(event('ACTION_SUCCESSFUL', **r['TransactionAttributes']))
+                self.assertEqual(r['TransactionAttributes'], {'state': 'recording', 'entered': "1001500"})
+
+                # new attributes for the same state keep the time it was entered
+                self.clock.now += 1
+                r = self.flow.dispatch(event('RINGING', **r['TransactionAttributes']))
+                self.assertEqual(r['TransactionAttributes'], {'state': 'recording', 'entered': "1001500"})
+
+                self.clock.now += 1
+                r = self.flow.dispatch(event('HANGUP', **r['TransactionAttributes']))
+                self.assertNotIn('TransactionAttributes', r)
+        finally:
+            sma_metrics.enabled = enabled
+
+        docs = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([(d['State'], d['Handler'], d.get('StateDwell')) for d in docs],
+                         [('none', 'to_new', None), ('new', 'to_recording', 1500), ('recording', 'poll', None),
+                          ('recording', 'stay', 2000)])
+
+    def test_timeout(self):
+        r = self.flow.dispatch(event('ACTION_SUCCESSFUL', 'new'))
+        attrs = r['TransactionAttributes']
+
+        self.clock.now += 4.9
+        self.assertEqual(self.flow.dispatch(event('ACTION_SUCCESSFUL', **attrs))['Actions'], ['stay'])
+
+        # only the attributes are needed, whichever container gets the event
+        self.clock.now += 0.1
+        self.assertEqual(sma_fsm.Flow(self.flow.states, timeouts={'recording': (5000, to('timed_out'))},
+                                      clock=self.clock).dispatch(event('ACTION_SUCCESSFUL', **attrs))['Actions'],
+                         ['timed_out'])
+        # ANY entries are not affected
+        self.assertEqual(self.flow.dispatch(event('ACTION_FAILED', **attrs))['Actions'], ['finishing'])
+
+    def test_no_entered_no_timeout(self):
+        self.clock.now += 3600
+        self.assertEqual(self.flow.dispatch(event('ACTION_SUCCESSFUL', 'recording'))['Actions'], ['stay'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -15,26 +15,36 @@
 # SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 # 
 
-import boto3
 import os
 
+import aws_clients
+import sma_event
+import sma_log
+import sma_metrics
+import sma_profile
+import sma_router
+import sma_schema
+from sma_actions import fragment, with_params, response
+
+# Set LogLevel using environment variable, fallback to INFO if not present
+logger = sma_log.logger
+log_level = os.getenv('LogLevel', 'INFO')
+if log_level not in ['INFO', 'DEBUG']:
+    log_level = 'INFO'
+logger.setLevel(log_level)
+
 # 
 # statics
 #
-response_template = {
-    'SchemaVersion': '1.0',
-    'Actions': []
-}
-
-pause_action = {
+pause_action = fragment({
     'Type': "Pause",
     'Parameters': {
         'DurationInMilliseconds': "1000"
     }
-}
+})
 
 
-speak_action = {
+speak_action = fragment({
   'Type': "Speak",
   'Parameters': {
     'Engine': "neural",     #Required. Either standard or neural
@@ -43,84 +53,85 @@ speak_action = {
     'TextType': "ssml",     # Optional. Defaults to text
     'VoiceId': "Matthew"    # Required
   }
-}
+})
 
-hangup_action = {
+hangup_action = fragment({
     'Type': "Hangup",
     'Parameters': {
         'SipResponseCode': "0",
         'ParticipantTag': ""
     }
-}
+})
+
+# actions that never change between calls are built once, here
+will_call_back_speak = fragment(with_params(speak_action,
+    Text="<speak>Hello!  I will call you back!  Goodbye!</speak>"))
+calling_back_speak = fragment(with_params(speak_action,
+    Text="<speak>Hello!  I am just calling you back!  Goodbye!</speak>"))
+
+transaction_attributes = fragment({
+    "key1": "val1*",
+    "key2": "val2*",
+    "key3": "val3*"
+})
 
 
 #
 # handlers
 #
 
-chime_client = boto3.client('chime')
+chime_client = aws_clients.client('chime')
 
 def new_call_actions(e):
-    print("new call action")
-    response = response_template.copy()
-
-    response['Actions'].append(pause_action.copy())
-
-    speak = speak_action.copy()
-    speak['Parameters']['Text'] = "<speak>Hello!  I will call you back!  Goodbye!</speak>"
-    response['Actions'].append(speak)    
-
-    response['Actions'].append(hangup_action.copy())
-
-    response['TransactionAttributes'] = {
-        "key1": "val1*",
-        "key2": "val2*",
-        "key3": "val3*"
-      }
+    logger.debug("new call action")
 
-    return response
+    return response(
+        pause_action,
+        will_call_back_speak,
+        hangup_action,
+        attributes=transaction_attributes)
 
 def hangup_and_new_call(e):
+    ev = sma_event.of(e)
+    caller = ev.call.leg_a
     params = {
-        'FromPhoneNumber': e['CallDetails']['Participants'][0]['To'],
-        'SipMediaApplicationId': e['CallDetails']['SipMediaApplicationId'],
-        'ToPhoneNumber': e['CallDetails']['Participants'][0]['From'],
+        'FromPhoneNumber': caller['To'],
+        'SipMediaApplicationId': ev.sip_media_application_id,
+        'ToPhoneNumber': caller['From'],
         'SipHeaders': {},
     }
-    response = chime_client.create_sip_media_application_call(**params)
-    print(response)
+    r = chime_client.create_sip_media_application_call(**params)
+    logger.info("create_sip_media_application_call", extra={'data': r})
 
-    return response_template.copy()
+    return response()
 
 
 def call_answered(e):
-    response = response_template.copy()
-
-    response['Actions'].append(pause_action.copy())
-
-    speak = speak_action.copy()
-    speak['Parameters']['Text'] = "<speak>Hello!  I am just calling you back!  Goodbye!</speak>"
-    response['Actions'].append(speak)
-
-    response['Actions'].append(pause_action.copy())
-    response['Actions'].append(hangup_action.copy())
-
-    return response
+    return response(
+        pause_action,
+        calling_back_speak,
+        pause_action,
+        hangup_action)
     
-# message - handler mapping table
-action_handlers = {
-    'NEW_INBOUND_CALL': new_call_actions,
-    'HANGUP': hangup_and_new_call,
-    'CALL_ANSWERED': call_answered
-}
-
+# message - handler routing table, a NoOp for anything else
+router = sma_router.Router({
+    ('NEW_INBOUND_CALL', sma_router.ANY, sma_router.ANY): new_call_actions,
+    ('HANGUP', sma_router.ANY, sma_router.ANY): hangup_and_new_call,
+    ('CALL_ANSWERED', sma_router.ANY, sma_router.ANY): call_answered,
+})
+
+@sma_profile.profiled
 def handler(event, context):
-    print(f"called with {event}")
-    response = response_template.copy()
-
-    try:
-        response = action_handlers[event['InvocationEventType']](event)
-    except Exception as e:
-        print(e)
-    
-    return response
\ No newline at end of file
+    with sma_log.invocation(event):
+        logger.info("called with event", extra={'data': event})
+        r = response()
+
+        try:
+            if sma_schema.check_event(event):
+                r = router.dispatch(event)
+        except Exception as e:
+            logger.error("exception in Event Handler:", exc_info=e)
+
+        r = sma_schema.check_response(r)
+        logger.info("returning response", extra={'data': r})
+        return r
@@ -0,0 +1,205 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+#
+# On-demand profiling of handler() for a sampled fraction of invocations.
+#
+#   @sma_profile.profiled
+#   def handler(event, context): ...
+#
+# With ProfileMode unset the decorator returns handler() untouched.
+# Otherwise each sampled invocation is run under cProfile and/or tracemalloc
+# and the result written, named after the call's TransactionId, either
+#   - as files in a directory: <txn>-<seq>-<pid>-<n>.prof (pstats) and
+#     .tracemalloc (snapshot), or
+#   - to stdout, one JSON line per profile {"profile": ..., "txn": ...} with
+#     the top ProfileTop entries (and the peak traced memory), for CloudWatch.
+# `python3 -m tools.profile_report` merges either kind into a hot-spot report.
+#
+# Environment:
+#   ProfileMode        cprofile, tracemalloc or cprofile,tracemalloc (default off)
+#   ProfileSampleRate  fraction (0.0 - 1.0) of invocations to profile, default 1.0
+#   ProfileOutput      a directory, or stdout, default /tmp
+#   ProfileTop         entries per profile written to stdout, default 50
+#   ProfileKeep        files each container keeps in ProfileOutput, default 100;
+#                      the oldest it wrote are removed beyond that
+#
+# Profiling never changes what handler() returns or raises: the directory is
+# created when the handler is wrapped, and a profile that can not be written
+# is logged and dropped.  The profile is written after sma_log.invocation()
+# has flushed the invocation's lines, so these errors are flushed straight
+# away rather than left for the next invocation.  Bad numbers in the
+# environment are logged the same way, and the default used.
+#
+# This file is shared by the python lambdas - keep the copies identical.
+#
+
+from collections import deque
+import functools
+import itertools
+import json
+import logging
+import os
+import sys
+
+import sma_log
+
+
+# Log a line now, outside (or after) an invocation's buffered lines
+def _log(level, msg, *args, **kwargs):
+    sma_log.logger.log(level, msg, *args, **kwargs)
+    sma_log.logger.flush()
+
+
+def _env_number(name, default, cast):
+    try:
+        return cast(os.getenv(name, default))
+    except ValueError:
+        _log(logging.WARNING, "bad %s %r, using %s", name, os.getenv(name), default)
+        return cast(default)
+
+
+modes = {m.strip().lower() for m in os.getenv('ProfileMode', '').split(',')} & {'cprofile', 'tracemalloc'}
+
+sample_rate = min(max(_env_number('ProfileSampleRate', '1.0', float), 0.0), 1.0)
+output = os.getenv('ProfileOutput', '/tmp')
+top = _env_number('ProfileTop', '50', int)
+keep = _env_number('ProfileKeep', '100', int)
+
+_count = itertools.count()
+_written = deque()
+
+
+def _name(event):
+    try:
+        details = event['CallDetails']
+        txn = details['TransactionId']
+    except (KeyError, TypeError):
+        txn = None
+
+    seq = event.get('Sequence', 0) if isinstance(event, dict) else 0
+    return txn, f"{txn or 'none'}-{seq}-{os.getpid()}-{next(_count)}"
+
+
+def _emit(entry):
+    sys.stdout.write(json.dumps(entry, separators=(',', ':')) + '\n')
+
+
+# Remember a file written to ProfileOutput, and remove the oldest ones once
+# there are more than ProfileKeep
+def _kept(path):
+    _written.append(path)
+    while len(_written) > max(keep, 0):
+        try:
+            os.remove(_written.popleft())
+        except OSError:
+            pass
+
+
+def _write_cprofile(profiler, txn, name):
+    if output != 'stdout':
+        path = os.path.join(output, name + '.prof')
+        profiler.dump_stats(path)
+        _kept(path)
+        return
+
+    import pstats
+    stats = pstats.Stats(profiler).stats
+    ranked = sorted(stats.items(), key=lambda kv: kv[1][2], reverse=True)[:top]
+    _emit({'profile': 'cprofile', 'txn': txn, 'name': name,
+           'total': sum(v[2] for v in stats.values()),
+           'stats': [[f"{f}:{line}({func})", nc, round(tt, 6), round(ct, 6)]
+                     for (f, line, func), (cc, nc, tt, ct, callers) in ranked]})
+
+
+def _write_tracemalloc(snapshot, peak, txn, name):
+    if output != 'stdout':
+        path = os.path.join(output, name + '.tracemalloc')
+        snapshot.dump(path)
+        _kept(path)
+        return
+
+    _emit({'profile': 'tracemalloc', 'txn': txn, 'name': name, 'peak': peak,
+           'stats': [[f"{s.traceback[0].filename}:{s.traceback[0].lineno}", s.size, s.count]
+                     for s in snapshot.statistics('lineno')[:top]]})
+
+
+def _profile(handler, event, context):
+    txn, name = _name(event)
+
+    profiler = None
+    if 'cprofile' in modes:
+        import cProfile
+        profiler = cProfile.Profile()
+
+    tracing = False
+    if 'tracemalloc' in modes:
+        import tracemalloc
+        tracing = not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+
+    if profiler:
+        profiler.enable()
+    try:
+        return handler(event, context)
+    finally:
+        if profiler:
+            profiler.disable()
+            try:
+                _write_cprofile(profiler, txn, name)
+            except Exception as err:
+                _log(logging.ERROR, "exception writing cprofile %s:", name, exc_info=err)
+        if tracing:
+            try:
+                try:
+                    # leave out what the profilers allocated for themselves
+                    snapshot = tracemalloc.take_snapshot().filter_traces(
+                        [tracemalloc.Filter(False, m.__file__) for m in (sys.modules.get('cProfile'), tracemalloc) if m] +
+                        [tracemalloc.Filter(False, __file__)])
+                    peak = tracemalloc.get_traced_memory()[1]
+                finally:
+                    tracemalloc.stop()
+                _write_tracemalloc(snapshot, peak, txn, name)
+            except Exception as err:
+                _log(logging.ERROR, "exception writing tracemalloc %s:", name, exc_info=err)
+
+
+def profiled(handler):
+    if not modes:
+        return handler
+
+    # import the profilers now, so the first profile does not include it
+    # (and none of this is imported when profiling is off)
+    import cProfile
+    import pstats
+    from random import random
+    import tracemalloc
+
+    if output != 'stdout':
+        try:
+            os.makedirs(output, exist_ok=True)
+        except OSError as err:
+            _log(logging.ERROR, "can not create ProfileOutput %s:", output, exc_info=err)
+
+    @functools.wraps(handler)
+    def wrapper(event, context):
+        if random() >= sample_rate:
+            return handler(event, context)
+        return _profile(handler, event, context)
+
+    return wrapper
@@ -17,19 +17,167 @@
 # SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 # 
 
+#
+# Run the handler locally.
+#
+#   lambda-runner.py event.json out.json
+#       one event in, its response out (pretty printed)
+#
+#   lambda-runner.py --jsonl [events.jsonl|-] [out.jsonl|-] [-w 4] [--timing timing.jsonl] [-q]
+#       one event per line in, one response per line out, in the same order;
+#       stdin and stdout by default.  Each worker imports the handler once and
+#       stays warm for every event it is given; -w 0 runs them all in this
+#       process.  A line that is not JSON, or an event the handler raises on,
+#       gets a Lambda style {"errorType", "errorMessage"} line.  What the
+#       handler logs goes to stderr (-q drops it), then a timing summary.
+#       --timing writes {"n", "type", "ms"} per event.
+#
+
+import argparse
+from collections import defaultdict
+from contextlib import redirect_stdout
 import json
+import os
 import sys
+import time
+import uuid
 
 from index import handler
 
-event_file = sys.argv[1]
-out_file = sys.argv[2]
 
-with open(event_file) as f:
-    event = json.load(f)
+# Stand-in for the Lambda context object, so handlers see a real deadline.
+# LAMBDA_TIMEOUT_SECONDS sets the function timeout (default 3, as in Lambda).
+class FakeContext:
+    function_name = "lambda-runner"
+    function_version = "$LATEST"
+    invoked_function_arn = "arn:aws:lambda:us-east-1:123456789012:function:lambda-runner"
+    memory_limit_in_mb = 128
+
+    def __init__(self, timeout_seconds=3):
+        self.aws_request_id = str(uuid.uuid4())
+        self._deadline = time.monotonic() + timeout_seconds
+
+    def get_remaining_time_in_millis(self):
+        return max(0, int((self._deadline - time.monotonic()) * 1000))
+
+
+timeout_seconds = float(os.getenv('LAMBDA_TIMEOUT_SECONDS', '3'))
+
+# where the handler's own output goes in --jsonl mode, set per worker
+_log = sys.stderr
+
+
+def _error(e):
+    return {'errorType': type(e).__name__, 'errorMessage': str(e)}
+
+
+# One JSONL line in, (response line, handler ms, InvocationEventType) out.
+# A line that isn't an event has no handler time.
+def invoke_line(line):
+    try:
+        event = json.loads(line)
+    except ValueError as e:
+        return json.dumps(_error(e), separators=(',', ':')), None, None
+
+    with redirect_stdout(_log):
+        start = time.perf_counter()
+        try:
+            r = handler(event, FakeContext(timeout_seconds))
+        except Exception as e:
+            r = _error(e)
+        ms = (time.perf_counter() - start) * 1000
+
+    event_type = event.get('InvocationEventType') if isinstance(event, dict) else None
+    return json.dumps(r, separators=(',', ':')), ms, event_type
+
+
+def _worker_init(quiet):
+    global _log
+    _log = open(os.devnull, 'w') if quiet else sys.stderr
+
+
+# nearest-rank percentile of a sorted list
+def percentile(ordered, p):
+    return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered) + 0.5)) - 1))]
+
+
+def summarize(timings, elapsed, out):
+    by_type = defaultdict(list)
+    for event_type, ms in timings:
+        by_type[event_type or '-'].append(ms)
+    by_type['all'] = [ms for _, ms in timings]
+
+    print(f"{len(timings)} events in {elapsed:.2f} s, {len(timings) / elapsed if elapsed else 0:.0f} events/s",
+          file=out)
+    print(f"  {'event type':<26} {'count':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}", file=out)
+    for event_type, values in sorted(by_type.items(), key=lambda kv: kv[0] == 'all'):
+        values.sort()
+        print(f"  {event_type:<26} {len(values):>7} {percentile(values, 50):>8.3f} {percentile(values, 95):>8.3f} "
+              f"{percentile(values, 99):>8.3f} {values[-1]:>8.3f}", file=out)
+
+
+def run_jsonl(args):
+    source = sys.stdin if args.events == '-' else open(args.events)
+    out = sys.stdout if args.output == '-' else open(args.output, 'w')
+    timing = open(args.timing, 'w') if args.timing else None
+    # reading a pipe, responses are written as they are ready
+    streaming = source is sys.stdin
+
+    lines = (line for line in source if line.strip())
+    timings = []
+    start = time.perf_counter()
+
+    pool = None
+    if args.workers > 0:
+        import multiprocessing
+        pool = multiprocessing.Pool(args.workers, initializer=_worker_init, initargs=(args.quiet,))
+        results = pool.imap(invoke_line, lines, chunksize=1 if streaming else args.chunk)
+    else:
+        _worker_init(args.quiet)
+        results = map(invoke_line, lines)
+
+    try:
+        for n, (response, ms, event_type) in enumerate(results):
+            out.write(response + '\n')
+            if streaming:
+                out.flush()
+            if ms is not None:
+                timings.append((event_type, ms))
+            if timing:
+                timing.write(json.dumps({'n': n, 'type': event_type, 'ms': ms and round(ms, 3)}) + '\n')
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+        out.flush()
+
+    summarize(timings, time.perf_counter() - start, sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('events', nargs='?', default='-')
+    parser.add_argument('output', nargs='?', default='-')
+    parser.add_argument('--jsonl', action='store_true', help="a JSONL stream of events in, JSONL responses out")
+    parser.add_argument('-w', '--workers', type=int, default=0, help="worker processes, 0 runs in this process")
+    parser.add_argument('--chunk', type=int, default=64, help="events handed to a worker at a time")
+    parser.add_argument('--timing', help="write the handler time of each event here, as JSONL")
+    parser.add_argument('-q', '--quiet', action='store_true', help="drop what the handler logs")
+    args = parser.parse_args()
+
+    if args.jsonl:
+        run_jsonl(args)
+        return
+
+    with open(args.events) as f:
+        event = json.load(f)
+
+    r = handler(event, FakeContext(timeout_seconds))
+
+    with open(args.output, mode='w') as f:
+        s = json.dumps(r, indent=2)
+        f.write(s)
 
-r = handler(event, None)
 
-with open(out_file, mode='w') as f:
-    s = json.dumps(r, indent=2)
-    f.write(s)
+if __name__ == '__main__':
+    main()
@@ -18,13 +18,14 @@
 from array import array
 from ast import expr_context
 import json
-from jsonschema import validate
 import unittest
 from unittest.mock import MagicMock, patch
 import sys
 
 import boto3 
 
+import sma_schema
+
 
 class Test_Lambda_Function(unittest.TestCase):
     
@@ -35,10 +36,10 @@ class Test_Lambda_Function(unittest.TestCase):
             self.test_event = json.load(f)
 
         with open("./test/cases/basic/basic-schema.json") as f:
-            self.basic_schema = json.load(f)
+            self.basic_schema = sma_schema.compile(json.load(f))
 
         with open("./test/cases/new-call/new-call-schema.json") as f:
-            self.new_call_schema = json.load(f)
+            self.new_call_schema = sma_schema.compile(json.load(f))
 
     def tearDown(self):
         # force an import the target function each and every time
@@ -48,7 +49,7 @@ class Test_Lambda_Function(unittest.TestCase):
 
     def check_validate(self, d, s):
         try:
-            validate(instance=d, schema=s)
+            s(d)
             self.assertTrue(True)
         except Exception as e:
             self.assertTrue(False, e.message)
@@ -113,11 +114,20 @@ class Test_Lambda_Function(unittest.TestCase):
     # patch (spy on) boto to trap the client create
     #
     #   NB: the import is cached, so need to remove module after each test
+    #   NB: clients are built on first use, not at import
     #
     @patch('boto3.client')
-    def test_static_client(self, client):
-        from index import handler
-        self.assertTrue(client.called and (client.call_args.args[0] == 'chime'))
+    def test_lazy_client(self, client):
+        import aws_clients
+        aws_clients.reset()
+
+        import index
+        self.assertFalse(client.called)
+
+        index.chime_client.create_sip_media_application_call
+        index.chime_client.create_sip_media_application_call
+        self.assertTrue(client.call_count == 1 and (client.call_args.args[0] == 'chime'))
+        aws_clients.reset()
 
     def test_empty(self): 
         event = {}
@@ -133,6 +143,20 @@ class Test_Lambda_Function(unittest.TestCase):
               self.check_hangup
         ])
 
+    def test_warm_invocations(self):
+        # a warm container must not carry actions over from earlier calls
+        from index import handler
+
+        for event_type, count in [("NEW_INBOUND_CALL", 3), ("CALL_ANSWERED", 4)]:
+            event = self.test_event.copy()
+            event['InvocationEventType'] = event_type
+
+            first = handler(event, None)
+            for _ in range(3):
+                r = handler(event, None)
+            self.assertEqual(r, first)
+            self.assertEqual(len(r['Actions']), count)
+
     def test_success_action(self):
         event = self.test_event.copy()
         event['InvocationEventType'] = "ACTION_SUCCESSFUL"
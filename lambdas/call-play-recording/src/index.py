@@ -17,24 +17,34 @@
 
 import os
 
+import sma_event
+import sma_log
+import sma_metrics
+import sma_profile
+import sma_router
+import sma_schema
+from sma_actions import fragment, with_params, response
+
+# Set LogLevel using environment variable, fallback to INFO if not present
+logger = sma_log.logger
+log_level = os.getenv('LogLevel', 'INFO')
+if log_level not in ['INFO', 'DEBUG']:
+    log_level = 'INFO'
+logger.setLevel(log_level)
+
 # 
 # statics
 #
-response_template = {
-    'SchemaVersion': '1.0',
-    'Actions': []
-}
-
 wav_file_bucket = os.environ.get('WAVFILE_BUCKET')
 
-pause_action = {
+pause_action = fragment({
     'Type': "Pause",
     'Parameters': {
         'DurationInMilliseconds': "1000"
     }
-}
+})
 
-play_audio_action = {
+play_audio_action = fragment({
     'Type': "PlayAudio",
     'Parameters': {
         'Repeat': "1",
@@ -44,15 +54,25 @@ play_audio_action = {
             'Key': "",
         }
     }
-}
+})
 
-hangup_action = {
+hangup_action = fragment({
     'Type': "Hangup",
     'Parameters': {
         'SipResponseCode': "0",
         'ParticipantTag': ""
     }
-}
+})
+
+# actions that never change between calls are built once, here
+hello_goodbye_play = fragment(with_params(play_audio_action,
+    AudioSource={'Key': "hello-goodbye.wav"}))
+
+transaction_attributes = fragment({
+    "key1": "val1*",
+    "key2": "val2*",
+    "key3": "val3*"
+})
 
 
 #
@@ -60,35 +80,29 @@ hangup_action = {
 #
 
 def new_call_actions(e):
-    response = response_template.copy()
-
-    response['Actions'].append(pause_action.copy())
-
-    play_action = play_audio_action.copy()
-    play_action['Parameters']['AudioSource']['Key'] = "hello-goodbye.wav"
-    response['Actions'].append(play_action)
-
-    response['Actions'].append(hangup_action.copy())
-
-    response['TransactionAttributes'] = {
-        "key1": "val1*",
-        "key2": "val2*",
-        "key3": "val3*"
-      }
-
-    return response
+    return response(
+        pause_action,
+        hello_goodbye_play,
+        hangup_action,
+        attributes=transaction_attributes)
     
-# message - handler mapping table
-action_handlers = {
-    'NEW_INBOUND_CALL': new_call_actions
-}
+# message - handler routing table, a NoOp for anything else
+router = sma_router.Router({
+    ('NEW_INBOUND_CALL', sma_router.ANY, sma_router.ANY): new_call_actions,
+})
 
+@sma_profile.profiled
 def handler(event, context):
-    response = response_template.copy()
-
-    try:
-        response = action_handlers[event['InvocationEventType']](event)
-    except Exception as e:
-        print(e)
-    
-    return response
\ No newline at end of file
+    with sma_log.invocation(event):
+        logger.info("called with event", extra={'data': event})
+        r = response()
+
+        try:
+            if sma_schema.check_event(event):
+                r = router.dispatch(event)
+        except Exception as e:
+            logger.error("exception in Event Handler:", exc_info=e)
+
+        r = sma_schema.check_response(r)
+        logger.info("returning response", extra={'data': r})
+        return r
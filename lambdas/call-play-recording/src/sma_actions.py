@@ -0,0 +1,95 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+#
+# Response builder for SIP Media Application actions.
+#
+# Action templates are compiled once, at import, into immutable fragments.
+# Responses reference fragments directly, so an action that never changes is
+# never copied.  When a handler needs a per-call value (CallId, Text, Key...)
+# with_params() copies only the dicts on the path down to that value and
+# shares everything else with the fragment.
+#
+# This file is shared by the python lambdas - keep the copies identical.
+#
+
+
+class Fragment(dict):
+    __slots__ = ()
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError('action fragments are immutable, use with_params()')
+
+    __setitem__ = __delitem__ = __ior__ = _immutable
+    clear = pop = popitem = setdefault = update = _immutable
+
+    # copies of a fragment are ordinary, mutable dicts
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        from copy import deepcopy
+        return {k: deepcopy(v, memo) for k, v in self.items()}
+
+    def __reduce__(self):
+        return (dict, (dict(self),))
+
+
+# Freeze an action template.  Dicts become Fragments and lists become tuples,
+# both of which still serialize to plain JSON objects and arrays.
+def fragment(template):
+    if isinstance(template, dict):
+        return Fragment((k, fragment(v)) for k, v in template.items())
+    if isinstance(template, (list, tuple)):
+        return tuple(fragment(v) for v in template)
+
+    return template
+
+
+def _merge(base, changes):
+    merged = dict(base)
+    for k, v in changes.items():
+        current = base.get(k)
+        if isinstance(v, dict) and isinstance(current, dict):
+            v = _merge(current, v)
+        merged[k] = v
+
+    return merged
+
+
+# Return a new action that shares every untouched branch with the fragment.
+# Dict values are merged into the matching nested dict, e.g.
+#   with_params(record_audio_action, CallId=c, RecordingDestination={'Prefix': p})
+# only copies the action, its Parameters and its RecordingDestination.
+def with_params(action, **params):
+    return {
+        'Type': action['Type'],
+        'Parameters': _merge(action['Parameters'], params)
+    }
+
+
+# A wrapper for all responses back to the service.  The Actions list (and the
+# TransactionAttributes, when given) are always fresh for every invocation.
+def response(*actions, attributes=None):
+    r = {
+        'SchemaVersion': '1.0',
+        'Actions': list(actions)
+    }
+    if attributes is not None:
+        r['TransactionAttributes'] = dict(attributes)
+
+    return r
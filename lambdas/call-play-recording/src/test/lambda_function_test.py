@@ -18,9 +18,9 @@
 from array import array
 from ast import expr_context
 import json
-from jsonschema import validate
 import unittest
 
+import sma_schema
 from index import handler
 
 
@@ -33,14 +33,14 @@ class Test_Lambda_Function(unittest.TestCase):
             self.test_event = json.load(f)
 
         with open("./test/cases/basic/basic-schema.json") as f:
-            self.basic_schema = json.load(f)
+            self.basic_schema = sma_schema.compile(json.load(f))
 
         with open("./test/cases/new-call/new-call-schema.json") as f:
-            self.new_call_schema = json.load(f)
+            self.new_call_schema = sma_schema.compile(json.load(f))
 
     def check_validate(self, d, s):
         try:
-            validate(instance=d, schema=s)
+            s(d)
             self.assert_(True)
         except Exception as e:
             self.assert_(False, e.message)
@@ -97,6 +97,14 @@ class Test_Lambda_Function(unittest.TestCase):
               self.check_hangup
         ])
 
+    def test_warm_invocations(self):
+        # a warm container must not carry actions over from earlier calls
+        first = handler(self.test_event.copy(), None)
+        for _ in range(3):
+            r = handler(self.test_event.copy(), None)
+        self.assertEqual(r, first)
+        self.assertEqual(len(r['Actions']), 3)
+
     def test_success_action(self):
         event = self.test_event.copy()
         event['InvocationEventType'] = "ACTION_SUCCESSFUL"
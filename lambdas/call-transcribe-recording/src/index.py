@@ -15,15 +15,27 @@
 # SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 #
 
-import boto3
 from copy import deepcopy
-import json
-import logging
 import os
+import random
+import time
+
+import aws_clients
+import json_stream
+import session_store
+import sma_event
+import sma_fsm
+import sma_log
+import sma_metrics
+import sma_profile
+import sma_schema
+import state_token
+import transcript_cache
+import transcription_store
 
 
 # Set LogLevel using environment variable, fallback to INFO if not present
-logger = logging.getLogger()
+logger = sma_log.logger
 log_level = os.getenv('LogLevel', 'INFO')
 if log_level not in ['INFO', 'DEBUG']:
     log_level = 'INFO'
@@ -36,18 +48,53 @@ log_prefix = ''
 #
 wav_file_bucket = os.getenv('WAVFILE_BUCKET', None)
 
-transcribe_client = boto3.client('transcribe')
-s3_client = boto3.client('s3')
+# While a transcription job runs the call waits in the 'transcribing' state:
+# each ACTION_SUCCESSFUL re-entry checks the job once and, if it is still
+# running, returns a short Pause to be called back again.  After
+# TRANSCRIBE_MAX_POLLS checks the caller is told the transcription failed.
+transcribe_poll_ms = os.getenv('TRANSCRIBE_POLL_MS', '2000')
+transcribe_max_polls = int(os.getenv('TRANSCRIBE_MAX_POLLS', '10'))
+
+# However the checks go, a call that has been in the 'transcribing' state
+# for TRANSCRIBE_TIMEOUT_MS is told the transcription failed.
+transcribe_timeout_ms = int(os.getenv('TRANSCRIBE_TIMEOUT_MS', '60000'))
+
+# Optionally wait synchronously for up to TRANSCRIBE_WAIT_MS on each re-entry,
+# checking the job with exponential backoff (TRANSCRIBE_BACKOFF_MS doubling up
+# to TRANSCRIBE_BACKOFF_MAX_MS, with jitter).  The wait never runs closer than
+# TRANSCRIBE_DEADLINE_MARGIN_MS to the invocation deadline from the Lambda
+# context; if the job is still running then, the caller hears that it is
+# still processing and the call re-enters as above.  0 (the default) checks
+# the job exactly once.
+transcribe_wait_ms = int(os.getenv('TRANSCRIBE_WAIT_MS', '0'))
+transcribe_backoff_ms = int(os.getenv('TRANSCRIBE_BACKOFF_MS', '250'))
+transcribe_backoff_max_ms = int(os.getenv('TRANSCRIBE_BACKOFF_MAX_MS', '2000'))
+transcribe_deadline_margin_ms = int(os.getenv('TRANSCRIBE_DEADLINE_MARGIN_MS', '1000'))
+
+# Finished jobs are looked up in transcription_store first, which
+# transcription_events.handler() fills from Transcribe or S3 events.  With
+# TRANSCRIBE_STATUS_FROM_EVENTS=true a job missing from the store is taken to
+# be still running, and get_transcription_job is only called on the last check
+# before giving up.  S3 events only ever record COMPLETED, so a FAILED job is
+# only seen early when the Transcribe job state change events are subscribed.
+transcribe_status_from_events = os.getenv('TRANSCRIBE_STATUS_FROM_EVENTS', 'false').lower() == 'true'
+
+# time.monotonic() by which the current invocation has to return, set by
+# handler() from the Lambda context (None when there is no context)
+deadline = None
+
+transcribe_client = aws_clients.client('transcribe')
+s3_client = aws_clients.client('s3')
 
 
 
 # To read more on customizing the Pause action, see https://docs.aws.amazon.com/chime/latest/dg/pause.html
-def pause_action(call_id=None):
+def pause_action(call_id=None, duration='3000'):
     a = {
         'Type': 'Pause',
         'Parameters': {
                 # 'CallId': call_id,
-                'DurationInMilliseconds': '3000'
+                'DurationInMilliseconds': duration
         }
     }
     if call_id is not None:
@@ -225,9 +272,14 @@ def new_call_handler(e):
 
 
 def place_call(e):
-    call_id = e['CallDetails']['Participants'][0]['CallId']
-    from_number = e['CallDetails']['Participants'][0]['From']
-    received_digits = f"+{e['ActionData']['ReceivedDigits']}"
+    ev = sma_event.of(e)
+    if ev.action.digits is None:
+        return []
+
+    caller = ev.call.leg_a
+    call_id = caller['CallId']
+    from_number = caller['From']
+    received_digits = f"+{ev.action.digits}"
 
     return [
         pause_action(call_id),
@@ -236,10 +288,9 @@ def place_call(e):
 
 
 def connect_call(e):
-    caller = list(filter(lambda p: p['Direction'] ==
-                  "Inbound", e['CallDetails']['Participants']))[0]
-    recipient = list(filter(
-        lambda p: p['Direction'] == "Outbound", e['CallDetails']['Participants']))[0]
+    call = sma_event.of(e).call
+    caller = call.inbound
+    recipient = call.outbound
 
     return [voicefocus_action(caller['CallId'], False),
             voicefocus_action(recipient['CallId'], False),
@@ -260,7 +311,7 @@ def beep_call(e):
 
 
 def record_call(e):
-    call_id = e['CallDetails']['Participants'][0]['CallId']
+    call_id = sma_event.of(e).call.leg_a['CallId']
     resp = response(
         record_audio_action(call_id, call_id)
     )
@@ -269,31 +320,155 @@ def record_call(e):
     return resp
 
 
+# The recording's ETag identifies its content, and keys the transcript cache
+def recording_etag(bucket, key):
+    try:
+        return s3_client.head_object(Bucket=bucket, Key=key)['ETag'].strip('"')
+
+    except Exception as err:
+        logger.error('Exception reading recording ETag. Error: ', exc_info=err)
+        return None
+
+
+def play_transcript(transcript):
+    resp = response(
+        speak_action(f"<speak>Your message says, {transcript}</speak>")
+    )
+    resp['TransactionAttributes'] = {'state': 'playing'}
+
+    return resp
+
+
+def has_recording(e):
+    recording = sma_event.of(e).action
+    return isinstance(recording, sma_event.RecordAudio) and recording.key is not None
+
+
 def transcribe_recording(e):
-    s3_uri = f"s3://{e['ActionData']['RecordingDestination']['BucketName']}/{e['ActionData']['RecordingDestination']['Key']}"
-    call_id = e['CallDetails']['Participants'][0]['CallId']
+    ev = sma_event.of(e)
+    recording = ev.action
+    s3_uri = f"s3://{recording.bucket}/{recording.key}"
+    call_id = ev.call.leg_a['CallId']
     params = transcribe_params(call_id, s3_uri)
 
-    try:
-        r = transcribe_client.start_transcription_job(**params)
+    etag = None
+    cached = None
+    if transcript_cache.cache.enabled:
+        etag = recording_etag(recording.bucket, recording.key)
+        cached = transcript_cache.cache.get(etag) if etag else None
+        logger.info("transcript cache", extra={'data': transcript_cache.cache.stats})
 
-    except Exception as err:
-        logger.error('Exception with Action Handler. Error: ', exc_info=err)
+    if cached is not None and 'transcript' in cached:
+        return play_transcript(cached['transcript'])
+
+    if cached is not None:
+        # already being transcribed, wait on that job instead of starting another
+        params = cached['params']
+    else:
+        try:
+            transcribe_client.start_transcription_job(**params)
+            if etag:
+                transcript_cache.cache.put(etag, {'params': params})
+
+        except Exception as err:
+            logger.error('Exception with Action Handler. Error: ', exc_info=err)
 
     resp = response(
         speak_action("<speak>Transcribing recording, please wait.  This may take up to fifteen seconds.</speak>")
     )
-    resp['TransactionAttributes'] = {'state': 'transcribing',
-                                     "params": params }
+    resp['TransactionAttributes'] = state_token.attributes(
+        state_token.CallState('transcribing', params['TranscriptionJobName'], etag=etag or None))
 
     return resp
 
 
-def get_read_and_parse_json_object(bucket, key):
+transcript_path = ('results', 'transcripts', 0, 'transcript')
+
+
+# Only the transcript text is needed, so stream the result and stop reading
+# before the (much larger) per-word items.
+def get_transcript(bucket, key):
     result = s3_client.get_object(Bucket=bucket, Key=key)
-    data = json.loads(result['Body'].read())
+    try:
+        return json_stream.extract(result['Body'], [transcript_path])[transcript_path]
+    finally:
+        result['Body'].close()
+
+
+# Status of a job, and the get_transcription_job result when it was needed.
+# last is True on the final check, when Transcribe is asked even if the
+# status normally comes from events.
+def job_status(job_name, last=False):
+    try:
+        status = transcription_store.store.get(job_name)
+        if status is not None:
+            return status, {}
+    except Exception as err:
+        logger.error('Exception reading transcription store. Error: ', exc_info=err)
+
+    if transcribe_status_from_events and not last:
+        return 'IN_PROGRESS', {}
+
+    result = transcribe_client.get_transcription_job(TranscriptionJobName=job_name)
+    return result['TranscriptionJob']['TranscriptionJobStatus'], result
+
+
+# Check the job once, then keep checking with backoff and jitter until it is
+# finished or the wait (bounded by the invocation deadline) runs out.
+# Returns (status, last get_transcription_job result, number of checks).
+def check_transcription(job_name, wait_ms=0, last=False):
+    stop = time.monotonic() + wait_ms / 1000
+    if deadline is not None:
+        stop = min(stop, deadline - transcribe_deadline_margin_ms / 1000)
+
+    result = {}
+    checks = 0
+    delay = transcribe_backoff_ms / 1000
+    while True:
+        try:
+            checks += 1
+            status, result = job_status(job_name, last)
+
+        except Exception as err:
+            logger.error('Exception with Action Handler. Error: ', exc_info=err)
+            return 'FAILED', result, checks
+
+        remaining = stop - time.monotonic()
+        if (status in ("FAILED", "COMPLETED") or remaining <= 0):
+            return status, result, checks
+
+        # equal jitter: at least half the backoff, so the checks still spread out
+        time.sleep(min(remaining, delay / 2 + random.uniform(0, delay / 2)))
+        delay = min(delay * 2, transcribe_backoff_max_ms / 1000)
 
-    return data
+
+# Pause and come back in the 'transcribing' state, or give up once the job
+# has been checked transcribe_max_polls times.
+def wait_for_transcription(e, cs, status, result):
+    polls = cs.polls + 1
+    if (polls >= transcribe_max_polls):
+        logger.error("transcribe still %s after %d checks", status, polls, extra={'data': result})
+        resp = response(
+            speak_action("<speak>Sorry, we encountered an error transcribing your message</speak>")
+        )
+        resp['TransactionAttributes'] = {'state': 'playing'}
+
+        return resp
+
+    logger.info("transcribe %s, check %d", status, polls)
+    if transcribe_wait_ms > 0:
+        # already waited this invocation, so let the caller know
+        resp = response(
+            speak_action("<speak>Still processing your message, please wait.</speak>")
+        )
+    else:
+        call_id = sma_event.of(e).call.leg_a['CallId']
+        resp = response(
+            pause_action(call_id, transcribe_poll_ms)
+        )
+    resp['TransactionAttributes'] = state_token.attributes(cs._replace(polls=polls))
+
+    return resp
 
 
 def playback_recording(e):
@@ -303,35 +478,33 @@ def playback_recording(e):
     )
     resp['TransactionAttributes'] = {'state': 'playing'}
 
-    job_name = e['CallDetails']['TransactionAttributes']['params']['TranscriptionJobName']
-
-    result = {}
-    status = "QUEUED"
-    while (status not in ("FAILED","COMPLETED")):
-        try:
-            result = transcribe_client.get_transcription_job(TranscriptionJobName=job_name)
-            status = result['TranscriptionJob']['TranscriptionJobStatus']
+    cs = state_token.from_attributes(sma_event.of(e).attributes)
+    if cs is None:
+        return response()
 
-        except Exception as err:
-            logger.error('Exception with Action Handler. Error: ', exc_info=err)
-            status = 'FAILED'
-            break
+    last = cs.polls + 1 >= transcribe_max_polls
+    status, result, checks = check_transcription(cs.job, transcribe_wait_ms, last)
+    logger.debug("transcribe %s after %d checks", status, checks)
+    if (status not in ("FAILED", "COMPLETED")):
+        return wait_for_transcription(e, cs, status, result)
 
     if (status == 'FAILED'):
-        logger.error(f"transcribe FAILED: {result}")
+        logger.error("transcribe FAILED", extra={'data': result})
+        # let the next attempt at this recording start a new job
+        if cs.etag:
+            transcript_cache.cache.delete(cs.etag)
         return resp
 
-    logger.info(f"transcribe complete: {result}")
+    logger.info("transcribe complete", extra={'data': result})
 
     try:
-        bucket = e['CallDetails']['TransactionAttributes']['params']['OutputBucketName']
-        key = e['CallDetails']['TransactionAttributes']['params']['OutputKey']
-        data = get_read_and_parse_json_object(bucket, key)
+        # the output location follows from the job name
+        params = transcribe_params(cs.job, None)
+        transcript = get_transcript(params['OutputBucketName'], params['OutputKey'])
+        if cs.etag:
+            transcript_cache.cache.put(cs.etag, {'transcript': transcript})
 
-        resp = response(
-            speak_action(f"<speak>Your message says, {data['results']['transcripts'][0]['transcript']}</speak>")
-        )
-        resp['TransactionAttributes'] = {'state': 'playing'}
+        resp = play_transcript(transcript)
 
     except Exception as err:
         logger.error('Exception getting transcription. Error: ', exc_info=err)
@@ -350,45 +523,42 @@ def end_call(e):
     return resp
 
 
-# If we receive an ACTION_SUCCESSFUL event we can take further actions,
-# or default to responding with a NoOp (empty set of actions)
-action_handlers = {
-    'new': beep_call,
-    'beeping': record_call,
-    'recording': transcribe_recording,
-    'transcribing': playback_recording,
-    'playing': end_call
-}
+def transcription_timed_out(e):
+    resp = response(
+        speak_action("<speak>Sorry, we encountered an error transcribing your message</speak>")
+    )
+    resp['TransactionAttributes'] = {'state': 'playing'}
 
+    return resp
 
-def action_succesful_handler(e):
-    resp = response()
 
-    try:
-        resp = action_handlers[e['CallDetails']
-                               ['TransactionAttributes']['state']](e)
-    except KeyError:
-        pass
-    except Exception as err:
-        logger.error('Exception with Action Handler. Error: ', exc_info=err)
+def action_failed(e):
+    resp = response(
+        speak_action("<speak>Sorry, there was an error.</speak>"),
+        hangup_action()
+    )
+    resp['TransactionAttributes'] = {'state': 'finishing'}
 
     return resp
 
 
+def call_ended(e):
+    return response()
+
+
 def digits_recevied_handler(e):
     actions = []
 
     try:
-        if (e['ActionData']['Type'] != 'ReceivedDigits'):
+        ev = sma_event.of(e)
+        if (ev.action_type != 'ReceivedDigits'):
             raise Exception('Action Type is not ReceivedDigits')
 
-        caller = list(filter(
-            lambda p: p['Direction'] == "Inbound", e['CallDetails']['Participants']))[0]
-        recipient = list(filter(
-            lambda p: p['Direction'] == "Outbound", e['CallDetails']['Participants']))[0]
+        caller = ev.call.inbound['CallId']
+        recipient = ev.call.outbound['CallId']
 
-        disable = e['ActionData']['ReceivedDigits'] == "0"
-        enable = e['ActionData']['ReceivedDigits'] == "1"
+        disable = ev.action.digits == "0"
+        enable = ev.action.digits == "1"
 
         if not(disable ^ enable):
             raise Exception('digit not [0|1]')
@@ -405,24 +575,47 @@ def digits_recevied_handler(e):
     return response(*actions)
 
 
-# message - handler mapping table
-event_handlers = {
-    'NEW_INBOUND_CALL': new_call_handler,
-    'ACTION_SUCCESSFUL': action_succesful_handler,
-    # 'HANGUP': response()
-}
+# the call flow - the handler for each state and event type, falling back to
+# the ANY entries, or a NoOp (empty set of actions) when there is none
+flow = sma_fsm.Flow({
+    'new': {'ACTION_SUCCESSFUL': beep_call},
+    'beeping': {'ACTION_SUCCESSFUL': record_call},
+    'recording': {'ACTION_SUCCESSFUL': [(has_recording, transcribe_recording)]},
+    'transcribing': {'ACTION_SUCCESSFUL': playback_recording},
+    'playing': {'ACTION_SUCCESSFUL': end_call},
+    'finishing': {'ACTION_FAILED': None},
+    sma_fsm.ANY: {
+        'NEW_INBOUND_CALL': new_call_handler,
+        'ACTION_FAILED': action_failed,
+        'HANGUP': call_ended,
+    },
+}, timeouts={'transcribing': (transcribe_timeout_ms, transcription_timed_out)})
+
+
+# Deadline for this invocation, in time.monotonic() seconds
+def invocation_deadline(context):
+    try:
+        return time.monotonic() + context.get_remaining_time_in_millis() / 1000
+    except AttributeError:
+        return None
 
 
+@sma_profile.profiled
 def handler(event, context):
-    logger.info(f"called with {json.dumps(event, indent=2)}")
+    global deadline
+    deadline = invocation_deadline(context)
 
-    resp = response()
-    try:
-        resp = event_handlers[event['InvocationEventType']](event)
-    except KeyError:
-        pass
-    except Exception as e:
-        logger.error(f"exception in Event Handler:", exc_info=e)
+    with sma_log.invocation(event):
+        logger.info("called with event", extra={'data': event})
 
-    logger.info(f"returning {json.dumps(resp, indent=2)}")
-    return resp
+        resp = response()
+        try:
+            if sma_schema.check_event(event):
+                resp = flow.dispatch(event)
+        except Exception as e:
+            logger.error(f"exception in Event Handler:", exc_info=e)
+
+        resp = session_store.finish(sma_event.of(event), resp)
+        resp = sma_schema.check_response(resp)
+        logger.info("returning response", extra={'data': resp})
+        return resp
@@ -0,0 +1,167 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+#
+# Pull a few values out of a JSON document without parsing all of it.
+#
+#   extract(body, [('results', 'transcripts', 0, 'transcript')])
+#
+# reads the stream a chunk at a time, walks only the objects and arrays on
+# the way to the requested paths and stops reading as soon as every path has
+# been found.  A Transcribe result lists the transcript before the per-word
+# items, so for a long recording only the first chunk or so is read.
+#
+# Values that are found, or that have to be stepped over, are decoded with
+# json's own (C) decoder.
+#
+
+import codecs
+import json
+
+
+_decoder = json.JSONDecoder()
+_whitespace = ' \t\n\r'
+_delimiters = _whitespace + ',:]}'
+
+
+class _Done(Exception):
+    pass
+
+
+class _Reader:
+    def __init__(self, stream, chunk_size):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.utf8 = codecs.getincrementaldecoder('utf-8')()
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+        self.bytes_read = 0
+
+    def more(self, size=None):
+        if self.eof:
+            raise ValueError('unexpected end of JSON document')
+
+        chunk = self.stream.read(size or self.chunk_size)
+        self.bytes_read += len(chunk)
+        self.eof = not chunk
+
+        # drop what has been consumed before growing the buffer
+        self.buf = self.buf[self.pos:] + self.utf8.decode(chunk, final=self.eof)
+        self.pos = 0
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _whitespace:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            self.more()
+
+    def expect(self, c):
+        if self.peek() != c:
+            raise ValueError(f'expected {c!r} at {self.buf[self.pos:self.pos + 20]!r}')
+        self.pos += 1
+
+    # Decode the value at the current position, reading more until it is
+    # whole.  Each retry reads twice as much, so a large value that has to
+    # be stepped over is re-scanned only a few times.
+    def decode(self):
+        self.peek()
+        size = self.chunk_size
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+                # a number cut off by the end of the buffer ("6." or "12")
+                # may decode early, so only a delimiter ends a value
+                if self.eof or (end < len(self.buf) and self.buf[end] in _delimiters):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                pass
+            self.more(size)
+            size *= 2
+
+
+# Look up the rest of a path in an already decoded value
+def _lookup(value, rest):
+    for key in rest:
+        if isinstance(value, dict) and isinstance(key, str) and key in value:
+            value = value[key]
+        elif isinstance(value, list) and isinstance(key, int) and 0 <= key < len(value):
+            value = value[key]
+        else:
+            return False, None
+    return True, value
+
+
+def _value(r, path, wanted, prefixes, found):
+    if path in wanted:
+        value = found[path] = r.decode()
+        if path in prefixes:
+            # other requested paths are inside this one
+            for p in wanted:
+                if len(p) > len(path) and p[:len(path)] == path:
+                    ok, inner = _lookup(value, p[len(path):])
+                    if ok:
+                        found[p] = inner
+        if len(found) == len(wanted):
+            raise _Done()
+        return
+
+    c = r.peek()
+    if path not in prefixes or c not in '{[':
+        r.decode()
+        return
+
+    r.pos += 1
+    if r.peek() == ('}' if c == '{' else ']'):
+        r.pos += 1
+        return
+
+    i = 0
+    while True:
+        if c == '{':
+            key = r.decode()
+            r.expect(':')
+        else:
+            key = i
+            i += 1
+
+        _value(r, path + (key,), wanted, prefixes, found)
+
+        sep = r.peek()
+        r.pos += 1
+        if sep != ',':
+            return
+
+
+# Returns {path: value} for each path found.  Paths are tuples of object keys
+# and array indices; missing paths are left out.  A path may lie inside
+# another requested path, in which case it is taken from the outer value.
+def extract(stream, paths, chunk_size=16384):
+    wanted = set(tuple(p) for p in paths)
+    prefixes = set(p[:n] for p in wanted for n in range(len(p)))
+    found = {}
+
+    r = _Reader(stream, chunk_size)
+    try:
+        _value(r, (), wanted, prefixes, found)
+    except _Done:
+        pass
+
+    return found
@@ -0,0 +1,150 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+#
+# Compact call state for TransactionAttributes.
+#
+# The SMA hands the TransactionAttributes back on every invocation of a call,
+# so whatever a handler keeps there is carried and decoded each time.  While
+# a job runs, the 'transcribing' state keeps a short token instead of the
+# whole set of transcribe_params:
+#
+#   1:t:<job>:<polls>:<etag>
+#
+# the token version, the state code, the TranscriptionJobName, the number of
+# times the job has been checked and the ETag of the recording (empty when
+# there is none).  Job names are CallIds and ETags are MD5s, so both are packed
+# from hex into 22 base64url characters; any other value is kept
+# percent-encoded behind a '='.  Everything else - OutputBucketName,
+# OutputKey - is rebuilt from the job name by index.transcribe_params().
+#
+# Tokens longer than STATE_TOKEN_MAX_BYTES (default 128) are refused.  The
+# attributes they go out in are checked against SMA_ATTRIBUTES_MAX_BYTES by
+# session_store.finish(), once the session version has been added.
+#
+# Attributes written before the token (a 'params' dict with separate 'polls'
+# and 'etag') are still read, for calls in flight during a deploy.
+#
+
+import base64
+from collections import namedtuple
+import os
+import re
+
+import session_store
+
+version = '1'
+max_token_bytes = int(os.getenv('STATE_TOKEN_MAX_BYTES', '128'))
+
+state_codes = {
+    'new': 'n',
+    'beeping': 'b',
+    'recording': 'r',
+    'transcribing': 't',
+    'playing': 'p',
+    'finishing': 'f',
+}
+states = {code: state for state, code in state_codes.items()}
+
+CallState = namedtuple('CallState', ['state', 'job', 'polls', 'etag'], defaults=[0, None])
+
+
+class TokenError(ValueError):
+    pass
+
+
+_uuid = re.compile(r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}')
+_md5 = re.compile(r'[0-9a-f]{32}')
+
+
+def _pack(value, pattern):
+    if pattern.fullmatch(value):
+        return base64.urlsafe_b64encode(bytes.fromhex(value.replace('-', ''))).decode()[:22]
+    # urllib.parse is slow to import, and only needed for unusual values
+    from urllib.parse import quote
+    return '=' + quote(value, safe='')
+
+
+def _unpack(field, dashes):
+    if field.startswith('='):
+        from urllib.parse import unquote
+        return unquote(field[1:])
+    if len(field) != 22:
+        raise TokenError(f"bad token field {field!r}")
+
+    h = base64.urlsafe_b64decode(field + '==').hex()
+    if dashes:
+        h = f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+    return h
+
+
+def encode(cs):
+    try:
+        code = state_codes[cs.state]
+    except KeyError:
+        raise TokenError(f"no code for state {cs.state!r}") from None
+
+    etag = '' if cs.etag is None else _pack(cs.etag, _md5)
+    token = f"{version}:{code}:{_pack(cs.job, _uuid)}:{cs.polls:d}:{etag}"
+    if len(token) > max_token_bytes:
+        raise TokenError(f"token is {len(token)} bytes, more than {max_token_bytes}")
+
+    return token
+
+
+def decode(token):
+    if len(token) > max_token_bytes:
+        raise TokenError(f"token is {len(token)} bytes, more than {max_token_bytes}")
+
+    fields = token.split(':')
+    if fields[0] != version:
+        raise TokenError(f"unknown token version {fields[0]!r}")
+    if len(fields) != 5:
+        raise TokenError(f"token has {len(fields)} fields, expected 5")
+
+    _, code, job, polls, etag = fields
+    try:
+        return CallState(states[code], _unpack(job, True), int(polls),
+                         _unpack(etag, False) if etag else None)
+    except (KeyError, ValueError) as err:
+        raise TokenError(f"bad token {token!r}") from err
+
+
+# Bytes the attributes take in the event, as compact JSON
+size = session_store.size
+
+
+# TransactionAttributes for a call state
+def attributes(cs):
+    return {'state': cs.state, 'token': encode(cs)}
+
+
+# The call state kept in the attributes, or None when there is none
+def from_attributes(attrs):
+    token = attrs.get('token')
+    if token is not None:
+        cs = decode(token)
+        if cs.state != attrs.get('state'):
+            raise TokenError(f"token is for state {cs.state!r}, not {attrs.get('state')!r}")
+        return cs
+
+    params = attrs.get('params')
+    if params and 'TranscriptionJobName' in params:
+        return CallState(attrs.get('state'), params['TranscriptionJobName'],
+                         int(attrs.get('polls', '0')), attrs.get('etag'))
+
+    return None
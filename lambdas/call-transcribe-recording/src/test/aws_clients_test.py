@@ -0,0 +1,99 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+import unittest
+from unittest.mock import MagicMock, patch
+
+import aws_clients
+import sma_metrics
+
+
+class Test_Aws_Clients(unittest.TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        aws_clients.reset()
+
+    def tearDown(self) -> None:
+        aws_clients.reset()
+        return super().tearDown()
+
+    @patch('boto3.client')
+    def test_built_on_first_use(self, client):
+        s3 = aws_clients.client('s3')
+        self.assertFalse(client.called)
+
+        s3.get_object
+        s3.head_object
+        self.assertEqual(client.call_count, 1)
+        self.assertEqual(client.call_args.args[0], 's3')
+
+    @patch('boto3.client')
+    def test_shared_between_stand_ins(self, client):
+        a = aws_clients.client('transcribe')
+        b = aws_clients.client('transcribe')
+        a.start_transcription_job
+        b.start_transcription_job
+        self.assertEqual(client.call_count, 1)
+
+    @patch('boto3.client')
+    def test_register_and_reset(self, client):
+        fake = MagicMock()
+        aws_clients.register('chime', fake)
+        aws_clients.client('chime').update_sip_media_application_call(CallId='c')
+        fake.update_sip_media_application_call.assert_called_once_with(CallId='c')
+        self.assertFalse(client.called)
+
+        aws_clients.reset()
+        aws_clients.client('chime').update_sip_media_application_call
+        self.assertEqual(client.call_count, 1)
+
+    @patch('boto3.client')
+    def test_prewarm(self, client):
+        aws_clients.prewarm('s3', 'transcribe')
+        self.assertEqual([c.args[0] for c in client.call_args_list], ['s3', 'transcribe'])
+
+        aws_clients.client('s3').get_object
+        self.assertEqual(client.call_count, 2)
+
+    @patch('sma_metrics.record_call')
+    def test_calls_are_timed(self, record_call):
+        fake = MagicMock()
+        fake.head_object.side_effect = ValueError('no such key')
+        aws_clients.register('s3', fake)
+        s3 = aws_clients.client('s3')
+
+        s3.get_object(Bucket='b', Key='k')
+        with self.assertRaises(ValueError):
+            s3.head_object(Bucket='b', Key='k')
+        fake.meta = 'meta'
+        self.assertEqual(s3.meta, 'meta')
+
+        self.assertEqual([c.args[0] for c in record_call.call_args_list], ['s3.get_object', 's3.head_object'])
+        self.assertEqual([c.args[2] for c in record_call.call_args_list], [False, True])
+
+    @patch('boto3.client')
+    def test_patch_object(self, client):
+        s3 = aws_clients.client('s3')
+        with patch.object(s3, 'get_object', return_value={'Body': None}) as get_object:
+            self.assertEqual(s3.get_object(Bucket='b', Key='k'), {'Body': None})
+            get_object.assert_called_once()
+        self.assertFalse(client.return_value.get_object.called)
+
+
+if __name__ == '__main__':
+    unittest.main()
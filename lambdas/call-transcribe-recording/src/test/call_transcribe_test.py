@@ -21,7 +21,6 @@ from cmath import exp
 from copy import deepcopy
 from itertools import cycle
 import json
-from jsonschema import validate
 import os
 import unittest
 from unittest.mock import MagicMock, patch
@@ -29,6 +28,8 @@ import sys
 
 import boto3
 
+import sma_schema
+
 
 class Test_Transcribe(unittest.TestCase):
     bucket_env_var = "WAVFILE_BUCKET"
@@ -41,10 +42,10 @@ class Test_Transcribe(unittest.TestCase):
             self.test_event = json.load(f)
 
         with open("./test/cases/basic/basic-schema.json") as f:
-            self.basic_schema = json.load(f)
+            self.basic_schema = sma_schema.compile(json.load(f))
 
         with open("./test/cases/new-call/new-call-schema.json") as f:
-            self.new_call_schema = json.load(f)
+            self.new_call_schema = sma_schema.compile(json.load(f))
 
         # this is what would come back from a get_object / read()
         self.canned_transcribe_result = b'{"jobName":"4623f486-0feb-476f-97e6-f60b56c4accf","accountId":"123","results":{"transcripts":[{"transcript":"This is a message to transcribe."}],"items":[{"start_time":"1.29","end_time":"1.56","alternatives":[{"confidence":"1.0","content":"This"}],"type":"pronunciation"},{"start_time":"1.56","end_time":"1.71","alternatives":[{"confidence":"1.0","content":"is"}],"type":"pronunciation"},{"start_time":"1.71","end_time":"1.83","alternatives":[{"confidence":"1.0","content":"a"}],"type":"pronunciation"},{"start_time":"1.83","end_time":"2.73","alternatives":[{"confidence":"1.0","content":"message"}],"type":"pronunciation"},{"start_time":"2.76","end_time":"2.82","alternatives":[{"confidence":"0.9094","content":"to"}],"type":"pronunciation"},{"start_time":"2.83","end_time":"3.96","alternatives":[{"confidence":"0.9975","content":"transcribe"}],"type":"pronunciation"},{"alternatives":[{"confidence":"0.0","content":"."}],"type":"punctuation"}]},"status":"COMPLETED"}'
@@ -68,7 +69,7 @@ class Test_Transcribe(unittest.TestCase):
 
     def check_validate(self, d, s):
         try:
-            validate(instance=d, schema=s)
+            s(d)
             self.assertTrue(True)
         except Exception as e:
             self.assertTrue(False, e)
@@ -115,6 +116,11 @@ class Test_Transcribe(unittest.TestCase):
         except Exception as e:
             self.assertTrue(False, e)
 
+    def check_call_state(self, d, **fields):
+        import state_token
+        cs = state_token.from_attributes(d['TransactionAttributes'])
+        self.assertEqual({k: getattr(cs, k) for k in fields}, fields)
+
     def check_record_audio(self, d):
         rp = list(filter(lambda a: a['Type'] == 'RecordAudio', d['Actions']))
         self.assertEqual(len(rp), 1)
@@ -370,6 +376,31 @@ class Test_Transcribe(unittest.TestCase):
             self.check_speak(r)
             self.check_transaction_attrs(r, {"state": "playing"})
 
+    def test_action_successful_transcribing_playback(self):
+        event = deepcopy(self.test_event)
+        event['InvocationEventType'] = "ACTION_SUCCESSFUL"
+        event['CallDetails']['TransactionAttributes'] = {
+            "state": "transcribing",
+            "params": {'TranscriptionJobName': 'job-name',
+            "OutputBucketName": "fake-bucket",
+            "OutputKey": "4623f486-0feb-476f-97e6-f60b56c4accf/4623f486-0feb-476f-97e6-f60b56c4accf"
+        }}
+
+        import io
+        import index as lam
+        with patch.object(lam.transcribe_client, 'get_transcription_job') as job_status, \
+                patch.object(lam.s3_client, 'get_object') as get_object:
+            job_status.return_value = {'TranscriptionJob': {'TranscriptionJobStatus': 'COMPLETED'}}
+            get_object.return_value = {'Body': io.BytesIO(self.canned_transcribe_result)}
+
+            r = lam.handler(event, None)
+
+            self.check_speak(r)
+            self.assertEqual(r['Actions'][0]['Parameters']['Text'],
+                             "<speak>Your message says, This is a message to transcribe.</speak>")
+            self.check_transaction_attrs(r, {"state": "playing"})
+            self.assertTrue(get_object.return_value['Body'].closed)
+
     def test_action_successful_transcribing_err(self):
         event = deepcopy(self.test_event)
         event['InvocationEventType'] = "ACTION_SUCCESSFUL"
@@ -393,6 +424,139 @@ class Test_Transcribe(unittest.TestCase):
         finally:
             lam.transcribe_client.get_transcription_job = orig
 
+    def test_action_successful_transcribing_in_progress(self):
+        event = deepcopy(self.test_event)
+        event['InvocationEventType'] = "ACTION_SUCCESSFUL"
+        event['CallDetails']['TransactionAttributes'] = {
+            "state": "transcribing",
+            "params": {'TranscriptionJobName': 'job-name'}}
+
+        import index as lam
+        with patch.object(lam.transcribe_client, 'get_transcription_job') as job_status:
+            job_status.return_value = {
+                'TranscriptionJob': {
+                    'TranscriptionJobStatus': 'IN_PROGRESS'
+                }}
+
+            r = lam.handler(event, None)
+            self.assertEqual(job_status.call_count, 1)
+
+            self.check_schema_10(r)
+            self.check_pause(r)
+            self.check_transaction_attrs(r, {"state": "transcribing"})
+            self.check_call_state(r, job='job-name', polls=1)
+
+            # re-enter with the returned attributes
+            event['CallDetails']['TransactionAttributes'] = r['TransactionAttributes']
+            r = lam.handler(event, None)
+            self.assertEqual(job_status.call_count, 2)
+            self.check_transaction_attrs(r, {"state": "transcribing"})
+            self.check_call_state(r, job='job-name', polls=2)
+
+    def test_action_successful_transcribing_max_polls(self):
+        event = deepcopy(self.test_event)
+        event['InvocationEventType'] = "ACTION_SUCCESSFUL"
+
+        import index as lam
+        event['CallDetails']['TransactionAttributes'] = {
+            "state": "transcribing",
+            "params": {'TranscriptionJobName': 'job-name'},
+            "polls": str(lam.transcribe_max_polls - 1)}
+
+        with patch.object(lam.transcribe_client, 'get_transcription_job') as job_status:
+            job_status.return_value = {
+                'TranscriptionJob': {
+                    'TranscriptionJobStatus': 'QUEUED'
+                }}
+
+            r = lam.handler(event, None)
+
+            self.check_schema_10(r)
+            self.check_speak(r)
+            self.check_pause(r, count=0)
+            self.check_transaction_attrs(r, {"state": "playing"})
+
+    class FakeContext:
+        def __init__(self, remaining_ms):
+            self.remaining_ms = remaining_ms
+
+        def get_remaining_time_in_millis(self):
+            return self.remaining_ms
+
+    def transcribing_event(self):
+        event = deepcopy(self.test_event)
+        event['InvocationEventType'] = "ACTION_SUCCESSFUL"
+        event['CallDetails']['TransactionAttributes'] = {
+            "state": "transcribing",
+            "params": {'TranscriptionJobName': 'job-name'}}
+        return event
+
+    def test_transcribing_wait_backoff(self):
+        import index as lam
+        lam.transcribe_wait_ms = 5000
+        lam.transcribe_backoff_ms = 1
+
+        with patch.object(lam.transcribe_client, 'get_transcription_job') as job_status, \
+                patch.object(lam.time, 'sleep') as sleep:
+            job_status.side_effect = [{'TranscriptionJob': {'TranscriptionJobStatus': s}}
+                                      for s in ('QUEUED', 'IN_PROGRESS', 'IN_PROGRESS', 'FAILED')]
+
+            r = lam.handler(self.transcribing_event(), Test_Transcribe.FakeContext(60000))
+
+            self.assertEqual(job_status.call_count, 4)
+            delays = [c.args[0] for c in sleep.call_args_list]
+            self.assertEqual(len(delays), 3)
+            # equal jitter: each delay is between half and all of a doubling backoff
+            for n, d in enumerate(delays):
+                self.assertTrue(0.0005 * 2**n <= d <= 0.001 * 2**n, delays)
+
+            self.check_speak(r)
+            self.check_transaction_attrs(r, {"state": "playing"})
+
+    def test_transcribing_wait_deadline(self):
+        import index as lam
+        lam.transcribe_wait_ms = 60000
+        lam.transcribe_backoff_ms = 10
+        lam.transcribe_deadline_margin_ms = 1000
+
+        with patch.object(lam.transcribe_client, 'get_transcription_job') as job_status:
+            job_status.return_value = {'TranscriptionJob': {'TranscriptionJobStatus': 'IN_PROGRESS'}}
+
+            start = lam.time.monotonic()
+            r = lam.handler(self.transcribing_event(), Test_Transcribe.FakeContext(1100))
+
+            # stopped at the margin before the deadline, not at the wait
+            self.assertLess(lam.time.monotonic() - start, 0.5)
+            self.assertGreater(job_status.call_count, 1)
+
+            self.check_schema_10(r)
+            self.check_speak(r)
+            self.check_pause(r, count=0)
+            self.check_transaction_attrs(r, {"state": "transcribing"})
+            self.check_call_state(r, polls=1)
+
+    def test_transcribing_no_context(self):
+        import index as lam
+        with patch.object(lam.transcribe_client, 'get_transcription_job') as job_status:
+            job_status.return_value = {'TranscriptionJob': {'TranscriptionJobStatus': 'IN_PROGRESS'}}
+
+            r = lam.handler(self.transcribing_event(), None)
+
+            self.assertIsNone(lam.deadline)
+            self.assertEqual(job_status.call_count, 1)
+            self.check_pause(r)
+
+    def test_max_polls_env_var(self):
+        os.environ['TRANSCRIBE_MAX_POLLS'] = '3'
+        os.environ['TRANSCRIBE_POLL_MS'] = '500'
+        try:
+            import index
+            self.assertEqual(index.transcribe_max_polls, 3)
+            self.assertEqual(index.transcribe_poll_ms, '500')
+        finally:
+            os.environ.pop('TRANSCRIBE_MAX_POLLS', None)
+            os.environ.pop('TRANSCRIBE_POLL_MS', None)
+
     def test_action_successful_playing(self):
         event = deepcopy(self.test_event)
         event['InvocationEventType'] = "ACTION_SUCCESSFUL"
@@ -431,7 +595,32 @@ class Test_Transcribe(unittest.TestCase):
         event = deepcopy(self.test_event)
         event['InvocationEventType'] = "ACTION_FAILED"
 
-        self.call_and_test(event, [self.check_schema_10])
+        self.call_and_test(event, [self.check_schema_10,
+                                   self.check_speak,
+                                   lambda r: self.check_transaction_attrs(r, {"state": "finishing"})])
+
+    def test_action_failed_finishing(self):
+        event = deepcopy(self.test_event)
+        event['InvocationEventType'] = "ACTION_FAILED"
+        event['CallDetails']['TransactionAttributes'] = {"state": "finishing"}
+
+        self.call_and_test(event, [self.check_schema_10,
+                                   lambda r: self.assertEqual(r['Actions'], [])])
+
+    def test_transcribing_timeout(self):
+        import index as lam
+
+        event = self.transcribing_event()
+        entered = int(lam.time.time() * 1000) - lam.transcribe_timeout_ms
+        event['CallDetails']['TransactionAttributes']['entered'] = str(entered)
+
+        with patch.object(lam.transcribe_client, 'get_transcription_job') as job_status:
+            r = lam.handler(event, None)
+
+            self.assertFalse(job_status.called)
+            self.check_speak(r)
+            self.assertIn("error transcribing", r['Actions'][0]['Parameters']['Text'])
+            self.check_transaction_attrs(r, {"state": "playing"})
 
     def test_hangup(self):
         event = deepcopy(self.test_event)
@@ -0,0 +1,90 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+import io
+import json
+import unittest
+
+import json_stream
+
+
+TRANSCRIPT = ('results', 'transcripts', 0, 'transcript')
+
+
+class CountingStream(io.BytesIO):
+    def __init__(self, data):
+        super().__init__(data)
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        b = super().read(size)
+        self.bytes_read += len(b)
+        return b
+
+
+class Test_Json_Stream(unittest.TestCase):
+
+    def doc(self, words):
+        return json.dumps({
+            "jobName": "job", "accountId": "123",
+            "results": {
+                "transcripts": [{"transcript": "Ünïcode \"quoted\" \\ text"}],
+                "items": [{"start_time": "1.29", "end_time": "1.56",
+                           "alternatives": [{"confidence": "1.0", "content": "word"}],
+                           "type": "pronunciation"}] * words},
+            "status": "COMPLETED"}).encode()
+
+    def test_matches_json_loads(self):
+        data = self.doc(10)
+        expected = json.loads(data)
+        for chunk_size in (1, 2, 5, 64, 1 << 16):
+            found = json_stream.extract(io.BytesIO(data), [TRANSCRIPT, ('status',), ('results', 'items', 9, 'end_time')],
+                                        chunk_size=chunk_size)
+            self.assertEqual(found, {TRANSCRIPT: expected['results']['transcripts'][0]['transcript'],
+                                     ('status',): "COMPLETED",
+                                     ('results', 'items', 9, 'end_time'): "1.56"}, chunk_size)
+
+    def test_stops_reading(self):
+        data = self.doc(10000)
+        stream = CountingStream(data)
+        json_stream.extract(stream, [TRANSCRIPT], chunk_size=4096)
+        self.assertLessEqual(stream.bytes_read, 4096)
+        self.assertGreater(len(data), 100 * 4096)
+
+    def test_missing_path(self):
+        self.assertEqual(json_stream.extract(io.BytesIO(self.doc(3)), [('results', 'transcripts', 1, 'transcript')]), {})
+        self.assertEqual(json_stream.extract(io.BytesIO(b'[]'), [TRANSCRIPT]), {})
+
+    def test_numbers_across_chunks(self):
+        found = json_stream.extract(io.BytesIO(b'{"a": [12345, 6.75e2], "b": true}'),
+                                    [('a', 0), ('a', 1), ('b',)], chunk_size=1)
+        self.assertEqual(found, {('a', 0): 12345, ('a', 1): 675.0, ('b',): True})
+
+    def test_nested_paths(self):
+        data = b'{"root": {"k0": [1, 2], "k1": "v"}, "after": 3}'
+        found = json_stream.extract(io.BytesIO(data), [('root',), ('root', 'k0', 1), ('root', 'k2'), ('after',)])
+        self.assertEqual(found, {('root',): {'k0': [1, 2], 'k1': "v"},
+                                 ('root', 'k0', 1): 2,
+                                 ('after',): 3})
+
+    def test_truncated(self):
+        with self.assertRaises(ValueError):
+            json_stream.extract(io.BytesIO(b'{"results": {"transcripts": [{"transcript": "abc'), [TRANSCRIPT])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+#
+# Benchmark of the 'transcribing' TransactionAttributes: the transcribe_params
+# dict the state used to carry against the state_token token.  For each, one
+# invocation's worth of work on the attributes - decoding them from the event
+# JSON, reading the job out of them and writing the next poll's attributes
+# into the response JSON - along with their size against the SMA budget.
+#
+# Run from the src directory:
+#   python3 test/state-bench.py
+#
+
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.getcwd())
+os.environ.setdefault('WAVFILE_BUCKET', "calltranscriberecordingstack-wavfiles98e3397d-1xm2sgmjz2hjl")
+
+import index
+import session_store
+import state_token
+
+CALL_ID = "4623f486-0feb-476f-97e6-f60b56c4accf"
+ETAG = "d41d8cd98f00b204e9800998ecf8427e"
+URI = f"s3://{index.wav_file_bucket}/{CALL_ID}/2022-02-20-01-45-53.wav"
+
+
+def params_invocation(data):
+    attrs = json.loads(data)
+    params = attrs['params']
+    job, polls = params['TranscriptionJobName'], int(attrs.get('polls', '0')) + 1
+    return json.dumps({'state': 'transcribing', 'params': params, 'polls': str(polls), 'etag': attrs['etag']})
+
+
+def token_invocation(data):
+    cs = state_token.from_attributes(json.loads(data))
+    job, polls = cs.job, cs.polls + 1
+    return json.dumps(state_token.attributes(cs._replace(polls=polls)))
+
+
+def main():
+    legacy = {'state': 'transcribing', 'params': index.transcribe_params(CALL_ID, URI), 'polls': "3", 'etag': ETAG}
+    token = state_token.attributes(state_token.CallState('transcribing', CALL_ID, 3, ETAG))
+
+    number = 20000
+    print(f"budget {session_store.max_attributes_bytes} bytes")
+    print(f"{'attributes':<10} {'bytes':>6} {'budget %':>9} {'us/invocation':>14}")
+    for name, attrs, f in [('params', legacy, params_invocation), ('token', token, token_invocation)]:
+        data = json.dumps(attrs)
+        us = min(timeit.repeat(lambda: f(data), number=number, repeat=5)) / number * 1e6
+        n = state_token.size(attrs)
+        print(f"{name:<10} {n:>6} {n / session_store.max_attributes_bytes * 100:>9.1f} {us:>14.2f}")
+
+    cs = state_token.CallState('transcribing', CALL_ID, 3, ETAG)
+    t = state_token.encode(cs)
+    for name, f in [('encode', lambda: state_token.encode(cs)), ('decode', lambda: state_token.decode(t))]:
+        us = min(timeit.repeat(f, number=number, repeat=5)) / number * 1e6
+        print(f"{name} {us:.2f} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+import unittest
+
+import state_token
+from state_token import CallState, TokenError
+
+CALL_ID = "4623f486-0feb-476f-97e6-f60b56c4accf"
+ETAG = "d41d8cd98f00b204e9800998ecf8427e"
+
+
+class Test_State_Token(unittest.TestCase):
+
+    def test_round_trip(self):
+        cs = CallState('transcribing', CALL_ID, 3, ETAG)
+        token = state_token.encode(cs)
+        self.assertEqual(token, "1:t:RiP0hg_rR2-X5vYLVsSszw:3:1B2M2Y8AsgTpgAmY7PhCfg")
+        self.assertEqual(state_token.decode(token), cs)
+
+    def test_other_values_kept_as_is(self):
+        for job, etag in [('job-name', None), ('job:name=1', "abc-2"), (CALL_ID.upper(), ETAG + "-2")]:
+            cs = CallState('transcribing', job, 0, etag)
+            self.assertEqual(state_token.decode(state_token.encode(cs)), cs)
+
+    def test_bad_tokens(self):
+        for token in ["2:t:RiP0hg_rR2-X5vYLVsSszw:0:", "1:t:RiP0hg_rR2-X5vYLVsSszw:0",
+                      "1:x:RiP0hg_rR2-X5vYLVsSszw:0:", "1:t:short:0:", "1:t:=job:many:",
+                      "1:t:=" + "j" * 200 + ":0:"]:
+            with self.subTest(token=token), self.assertRaises(TokenError):
+                state_token.decode(token)
+
+    def test_size_bounds(self):
+        with self.assertRaises(TokenError):
+            state_token.encode(CallState('transcribing', "j" * 200))
+        with self.assertRaises(TokenError):
+            state_token.encode(CallState('ringing', CALL_ID))
+
+        attrs = state_token.attributes(CallState('transcribing', CALL_ID, 9, ETAG))
+        self.assertLess(state_token.size(attrs), 100)
+
+    def test_from_attributes(self):
+        cs = CallState('transcribing', CALL_ID, 2, ETAG)
+        self.assertEqual(state_token.from_attributes(state_token.attributes(cs)), cs)
+        self.assertIsNone(state_token.from_attributes({'state': 'playing'}))
+
+        with self.assertRaises(TokenError):
+            state_token.from_attributes({'state': 'playing', 'token': state_token.encode(cs)})
+
+    def test_legacy_params(self):
+        attrs = {'state': 'transcribing', 'params': {'TranscriptionJobName': CALL_ID, 'OutputKey': "k"},
+                 'polls': "2", 'etag': ETAG}
+        self.assertEqual(state_token.from_attributes(attrs), CallState('transcribing', CALL_ID, 2, ETAG))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+#
+# Benchmark of the streaming transcript read against json.loads of the whole
+# S3 body, on synthetic Transcribe results for 1, 10 and 60 minute messages
+# laid out like the canned result in call_transcribe_test.py.
+#
+# Run from the src directory:
+#   python3 test/transcript-bench.py [minutes ...]
+#
+
+import io
+import json
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.getcwd())
+
+import json_stream
+
+WORDS_PER_MINUTE = 150
+TRANSCRIPT = ('results', 'transcripts', 0, 'transcript')
+words = ["This", "is", "a", "message", "to", "transcribe"]
+
+
+def transcribe_result(minutes):
+    items = []
+    t = 1.29
+    for n in range(minutes * WORDS_PER_MINUTE):
+        items.append({"start_time": f"{t:.2f}", "end_time": f"{t + 0.27:.2f}",
+                      "alternatives": [{"confidence": "0.9975", "content": words[n % len(words)]}],
+                      "type": "pronunciation"})
+        t += 0.4
+        if n % len(words) == len(words) - 1:
+            items.append({"alternatives": [{"confidence": "0.0", "content": "."}], "type": "punctuation"})
+
+    transcript = " ".join(words[n % len(words)] for n in range(minutes * WORDS_PER_MINUTE))
+    return json.dumps({"jobName": "4623f486-0feb-476f-97e6-f60b56c4accf", "accountId": "123",
+                       "results": {"transcripts": [{"transcript": transcript}], "items": items},
+                       "status": "COMPLETED"}, separators=(',', ':')).encode()
+
+
+class CountingStream(io.BytesIO):
+    bytes_read = 0
+
+    def read(self, size=-1):
+        b = super().read(size)
+        self.bytes_read += len(b)
+        return b
+
+
+def full(data):
+    return json.loads(CountingStream(data).read())['results']['transcripts'][0]['transcript']
+
+
+def streamed(data):
+    return json_stream.extract(CountingStream(data), [TRANSCRIPT])[TRANSCRIPT]
+
+
+def peak_kb(f, data):
+    tracemalloc.start()
+    f(data)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def main():
+    minutes = [int(m) for m in sys.argv[1:]] or [1, 10, 60]
+
+    print(f"{'minutes':>7} {'doc KB':>8} {'parser':<9} {'ms':>8} {'read KB':>8} {'peak KB':>8}")
+    for m in minutes:
+        data = transcribe_result(m)
+        assert full(data) == streamed(data)
+
+        for name, f in [('json', full), ('streamed', streamed)]:
+            number = max(1, 200 // m)
+            ms = min(timeit.repeat(lambda: f(data), number=number, repeat=5)) / number * 1e3
+
+            stream = CountingStream(data)
+            if f is full:
+                json.loads(stream.read())
+            else:
+                json_stream.extract(stream, [TRANSCRIPT])
+
+            print(f"{m:>7} {len(data) / 1024:>8.0f} {name:<9} {ms:>8.3f} "
+                  f"{stream.bytes_read / 1024:>8.0f} {peak_kb(f, data):>8.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+from copy import deepcopy
+import io
+import json
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+import state_token
+import transcript_cache
+import transcription_store
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class NoSuchKey(Exception):
+    response = {'Error': {'Code': 'NoSuchKey'}}
+
+
+class FakeS3:
+    def __init__(self):
+        self.objects = {}
+
+    def get_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise NoSuchKey()
+        return {'Body': io.BytesIO(self.objects[Key])}
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.objects[Key] = Body.encode()
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop(Key, None)
+
+
+class Test_Transcript_Cache(unittest.TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        transcript_cache.set_cache(transcript_cache.TranscriptCache(transcript_cache.LRUCache(8, 3600)))
+        transcription_store.set_store(transcription_store.MemoryStore())
+
+        with open("../../../events/inbound.json") as f:
+            self.test_event = json.load(f)
+
+    def tearDown(self) -> None:
+        if 'index' in sys.modules:
+            del sys.modules["index"]
+        transcript_cache.set_cache(transcript_cache.from_env())
+        super().tearDown()
+
+    def test_lru_evicts_least_recent(self):
+        lru = transcript_cache.LRUCache(2, 3600)
+        lru.put('a', 1)
+        lru.put('b', 2)
+        lru.get('a')
+        lru.put('c', 3)
+
+        self.assertEqual(lru.get('a'), 1)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual(lru.get('c'), 3)
+
+    def test_lru_ttl(self):
+        clock = FakeClock()
+        lru = transcript_cache.LRUCache(2, 10, clock=clock)
+        lru.put('a', 1)
+        clock.now += 9
+        self.assertEqual(lru.get('a'), 1)
+        clock.now += 1
+        self.assertIsNone(lru.get('a'))
+        self.assertEqual(len(lru.entries), 0)
+
+    def test_lru_disabled(self):
+        lru = transcript_cache.LRUCache(0, 10)
+        lru.put('a', 1)
+        self.assertIsNone(lru.get('a'))
+        self.assertFalse(transcript_cache.TranscriptCache(lru).enabled)
+
+    def test_off_by_default(self):
+        with patch.dict(os.environ, {}, clear=True):
+            self.assertFalse(transcript_cache.from_env().enabled)
+        with patch.dict(os.environ, {'TRANSCRIPT_CACHE_SIZE': '16'}):
+            self.assertTrue(transcript_cache.from_env().enabled)
+        with patch.dict(os.environ, {'TRANSCRIPT_CACHE_STORE': 's3', 'WAVFILE_BUCKET': 'wav-files'}), \
+                patch('aws_clients.client'):
+            cache = transcript_cache.from_env()
+        self.assertEqual(cache.lru.max_size, 256)
+
+    def test_tiers_and_counters(self):
+        clock = FakeClock()
+        s3 = FakeS3()
+        with patch('aws_clients.client', return_value=s3):
+            store = transcript_cache.S3Store('bucket', 'cache/', 60, clock=clock)
+        cache = transcript_cache.TranscriptCache(transcript_cache.LRUCache(8, 60, clock=clock), store)
+
+        self.assertIsNone(cache.get('etag'))
+        cache.put('etag', {'transcript': 'hello'})
+        self.assertIn('cache/etag.json', s3.objects)
+        self.assertEqual(cache.get('etag'), {'transcript': 'hello'})
+
+        # another container: empty LRU, same durable store
+        other = transcript_cache.TranscriptCache(transcript_cache.LRUCache(8, 60, clock=clock), store)
+        self.assertEqual(other.get('etag'), {'transcript': 'hello'})
+        self.assertEqual(other.get('etag'), {'transcript': 'hello'})
+
+        self.assertEqual(cache.stats, {'hits': 1, 'store_hits': 0, 'misses': 1, 'errors': 0})
+        self.assertEqual(other.stats, {'hits': 1, 'store_hits': 1, 'misses': 0, 'errors': 0})
+
+        clock.now += 60
+        self.assertIsNone(other.get('etag'))
+
+    def test_store_errors_are_misses(self):
+        store = MagicMock()
+        store.get.side_effect = Exception('Boom!')
+        cache = transcript_cache.TranscriptCache(transcript_cache.LRUCache(8, 60), store)
+
+        self.assertIsNone(cache.get('etag'))
+        self.assertEqual(cache.stats['errors'], 1)
+        self.assertEqual(cache.stats['misses'], 1)
+
+    def recording_event(self):
+        event = deepcopy(self.test_event)
+        event['InvocationEventType'] = "ACTION_SUCCESSFUL"
+        event['CallDetails']['TransactionAttributes'] = {"state": "recording"}
+        event['ActionData'] = {"RecordingDestination": {
+            "BucketName": "recording-bucket",
+            "Key": "recording-key"
+        }}
+        return event
+
+    def test_recording_transcribed_once(self):
+        import index as lam
+        with patch.object(lam.s3_client, 'head_object') as head_object, \
+                patch.object(lam.s3_client, 'get_object') as get_object, \
+                patch.object(lam.transcribe_client, 'start_transcription_job') as job_starter, \
+                patch.object(lam.transcribe_client, 'get_transcription_job') as job_status:
+            head_object.return_value = {'ETag': '"d41d8cd98f00b204e9800998ecf8427e"'}
+            get_object.return_value = {'Body': io.BytesIO(b'{"results":{"transcripts":[{"transcript":"hello"}]}}')}
+            job_status.return_value = {'TranscriptionJob': {'TranscriptionJobStatus': 'COMPLETED'}}
+
+            r = lam.handler(self.recording_event(), None)
+            self.assertEqual(job_starter.call_count, 1)
+            self.assertEqual(r['TransactionAttributes']['state'], "transcribing")
+            self.assertEqual(state_token.from_attributes(r['TransactionAttributes']).etag,
+                             "d41d8cd98f00b204e9800998ecf8427e")
+
+            # a retried ACTION_SUCCESSFUL waits on the same job
+            retry = lam.handler(self.recording_event(), None)
+            self.assertEqual(job_starter.call_count, 1)
+            self.assertEqual(retry['TransactionAttributes']['token'], r['TransactionAttributes']['token'])
+
+            event = self.recording_event()
+            event['CallDetails']['TransactionAttributes'] = r['TransactionAttributes']
+            r = lam.handler(event, None)
+            self.assertEqual(r['TransactionAttributes']['state'], 'playing')
+
+            # and once transcribed, the transcript comes straight from the cache
+            r = lam.handler(self.recording_event(), None)
+            self.assertEqual(job_starter.call_count, 1)
+            self.assertEqual(r['TransactionAttributes']['state'], 'playing')
+            self.assertEqual(r['Actions'][0]['Parameters']['Text'], "<speak>Your message says, hello</speak>")
+
+            self.assertEqual(transcript_cache.cache.stats, {'hits': 2, 'store_hits': 0, 'misses': 1, 'errors': 0})
+
+    def test_failed_job_not_cached(self):
+        import index as lam
+        with patch.object(lam.s3_client, 'head_object') as head_object, \
+                patch.object(lam.transcribe_client, 'start_transcription_job') as job_starter, \
+                patch.object(lam.transcribe_client, 'get_transcription_job') as job_status:
+            head_object.return_value = {'ETag': '"etag"'}
+            job_status.return_value = {'TranscriptionJob': {'TranscriptionJobStatus': 'FAILED'}}
+
+            r = lam.handler(self.recording_event(), None)
+            event = self.recording_event()
+            event['CallDetails']['TransactionAttributes'] = r['TransactionAttributes']
+            lam.handler(event, None)
+
+            lam.handler(self.recording_event(), None)
+            self.assertEqual(job_starter.call_count, 2)
+
+    def test_no_etag(self):
+        import index as lam
+        with patch.object(lam.s3_client, 'head_object') as head_object, \
+                patch.object(lam.transcribe_client, 'start_transcription_job') as job_starter:
+            head_object.side_effect = Exception('Boom!')
+
+            r = lam.handler(self.recording_event(), None)
+            self.assertEqual(job_starter.call_count, 1)
+            self.assertEqual(r['TransactionAttributes']['state'], "transcribing")
+            self.assertIsNone(state_token.from_attributes(r['TransactionAttributes']).etag)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,185 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+from copy import deepcopy
+import io
+import json
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+import transcription_events
+import transcription_store
+
+
+CALL_ID = "4623f486-0feb-476f-97e6-f60b56c4accf"
+
+
+def transcribe_event(job_name, status):
+    return {
+        "version": "0",
+        "detail-type": "Transcribe Job State Change",
+        "source": "aws.transcribe",
+        "region": "us-east-1",
+        "detail": {
+            "TranscriptionJobName": job_name,
+            "TranscriptionJobStatus": status
+        }
+    }
+
+
+def s3_event(*keys):
+    return {"Records": [{
+        "eventSource": "aws:s3",
+        "eventName": "ObjectCreated:Put",
+        "s3": {"bucket": {"name": "wav-files"}, "object": {"key": k}}
+    } for k in keys]}
+
+
+class Test_Transcription_Events(unittest.TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        transcription_store.set_store(transcription_store.MemoryStore())
+
+        with open("../../../events/inbound.json") as f:
+            self.test_event = json.load(f)
+
+    def tearDown(self) -> None:
+        if 'index' in sys.modules:
+            del sys.modules["index"]
+        transcription_store.set_store(transcription_store.MemoryStore())
+        super().tearDown()
+
+    def test_transcribe_state_change(self):
+        r = transcription_events.handler(transcribe_event(CALL_ID, "COMPLETED"), None)
+
+        self.assertEqual(r['recorded'], 1)
+        self.assertEqual(transcription_store.store.get(CALL_ID), "COMPLETED")
+
+    def test_transcribe_failed(self):
+        transcription_events.handler(transcribe_event(CALL_ID, "FAILED"), None)
+        self.assertEqual(transcription_store.store.get(CALL_ID), "FAILED")
+
+    def test_transcribe_in_progress_ignored(self):
+        r = transcription_events.handler(transcribe_event(CALL_ID, "IN_PROGRESS"), None)
+
+        self.assertEqual(r['recorded'], 0)
+        self.assertIsNone(transcription_store.store.get(CALL_ID))
+
+    def test_s3_object_created(self):
+        r = transcription_events.handler(s3_event(f"{CALL_ID}/{CALL_ID}",
+                                                  "other/other.json",
+                                                  ".write_access_check_file.temp",
+                                                  f"{CALL_ID}/{CALL_ID}-0.wav"), None)
+
+        self.assertEqual(r['recorded'], 2)
+        self.assertEqual(transcription_store.store.get(CALL_ID), "COMPLETED")
+        self.assertEqual(transcription_store.store.get("other"), "COMPLETED")
+
+    def test_unknown_event(self):
+        r = transcription_events.handler({}, None)
+        self.assertEqual(r['recorded'], 0)
+
+    def test_dynamodb_store(self):
+        client = MagicMock()
+        with patch('aws_clients.client', return_value=client):
+            store = transcription_store.DynamoDBStore("jobs", ttl_seconds=60)
+
+        client.get_item.return_value = {}
+        self.assertIsNone(store.get(CALL_ID))
+
+        store.put(CALL_ID, "COMPLETED")
+        item = client.put_item.call_args.kwargs['Item']
+        self.assertEqual(item['JobName'], {'S': CALL_ID})
+        self.assertEqual(item['Status'], {'S': "COMPLETED"})
+
+        client.get_item.return_value = {'Item': item}
+        self.assertEqual(store.get(CALL_ID), "COMPLETED")
+
+    def test_memory_store_bounded(self):
+        store = transcription_store.MemoryStore(max_jobs=2)
+        for job in ("a", "b", "c"):
+            store.put(job, "COMPLETED")
+
+        self.assertIsNone(store.get("a"))
+        self.assertEqual(store.get("c"), "COMPLETED")
+        self.assertEqual(len(store.jobs), 2)
+
+    def transcribing_event(self):
+        event = deepcopy(self.test_event)
+        event['InvocationEventType'] = "ACTION_SUCCESSFUL"
+        event['CallDetails']['TransactionAttributes'] = {
+            "state": "transcribing",
+            "params": {'TranscriptionJobName': CALL_ID,
+                       'OutputBucketName': "wav-files",
+                       'OutputKey': f"{CALL_ID}/{CALL_ID}"}}
+        return event
+
+    def test_playback_uses_store(self):
+        import index as lam
+        transcription_events.handler(transcribe_event(CALL_ID, "COMPLETED"), None)
+
+        with patch.object(lam.transcribe_client, 'get_transcription_job') as job_status, \
+                patch.object(lam.s3_client, 'get_object') as get_object:
+            get_object.return_value = {'Body': io.BytesIO(b'{"results":{"transcripts":[{"transcript":"hi"}]}}')}
+
+            r = lam.handler(self.transcribing_event(), None)
+
+            self.assertFalse(job_status.called)
+            self.assertEqual(r['TransactionAttributes']['state'], "playing")
+            self.assertIn("hi", r['Actions'][0]['Parameters']['Text'])
+
+    def test_playback_store_miss_falls_back(self):
+        import index as lam
+        with patch.object(lam.transcribe_client, 'get_transcription_job') as job_status:
+            job_status.return_value = {'TranscriptionJob': {'TranscriptionJobStatus': 'IN_PROGRESS'}}
+
+            r = lam.handler(self.transcribing_event(), None)
+
+            self.assertEqual(job_status.call_count, 1)
+            self.assertEqual(r['TransactionAttributes']['state'], "transcribing")
+
+    def test_playback_status_from_events_only(self):
+        import index as lam
+        lam.transcribe_status_from_events = True
+
+        with patch.object(lam.transcribe_client, 'get_transcription_job') as job_status:
+            r = lam.handler(self.transcribing_event(), None)
+
+            self.assertFalse(job_status.called)
+            self.assertEqual(r['TransactionAttributes']['state'], "transcribing")
+            self.assertEqual(r['Actions'][0]['Type'], "Pause")
+
+    def test_playback_status_from_events_asks_on_last_check(self):
+        import index as lam
+        lam.transcribe_status_from_events = True
+        event = self.transcribing_event()
+        event['CallDetails']['TransactionAttributes']['polls'] = lam.transcribe_max_polls - 1
+
+        with patch.object(lam.transcribe_client, 'get_transcription_job') as job_status:
+            job_status.return_value = {'TranscriptionJob': {'TranscriptionJobStatus': 'FAILED'}}
+
+            r = lam.handler(event, None)
+
+            self.assertEqual(job_status.call_count, 1)
+            self.assertEqual(r['TransactionAttributes']['state'], "playing")
+            self.assertIn("error transcribing", r['Actions'][0]['Parameters']['Text'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+#
+# Latency and API-call benchmark for the transcription wait, against a fake
+# Transcribe whose job completes a fixed delay after it is started.
+#
+#   busy loop   the original get_transcription_job loop with no sleep
+#   re-entry    one check per invocation, Pause and re-enter (the default)
+#   backoff     synchronous wait with backoff + jitter, bounded by the context
+#
+# "detect ms" is how long after the job completed the caller got a response,
+# "billed ms" the total handler time across invocations.
+#
+# Run from the src directory:
+#   python3 test/wait-bench.py [delay ms ...]
+#
+
+from contextlib import redirect_stdout
+from copy import deepcopy
+import io
+import json
+import os
+import sys
+import time
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.setdefault('WAVFILE_BUCKET', 'fake-bucket')
+sys.path.insert(0, os.getcwd())
+
+import aws_clients
+import index
+import state_token
+
+
+class FakeTranscribe:
+    def __init__(self, delay_ms):
+        self.completes_at = time.monotonic() + delay_ms / 1000
+        self.calls = 0
+
+    def get_transcription_job(self, TranscriptionJobName):
+        self.calls += 1
+        status = 'COMPLETED' if time.monotonic() >= self.completes_at else 'IN_PROGRESS'
+        return {'TranscriptionJob': {'TranscriptionJobName': TranscriptionJobName,
+                                     'TranscriptionJobStatus': status}}
+
+
+class FakeS3:
+    def get_object(self, Bucket, Key):
+        return {'Body': io.BytesIO(b'{"results":{"transcripts":[{"transcript":"hello"}]}}')}
+
+
+class FakeContext:
+    def __init__(self, timeout_seconds):
+        self._deadline = time.monotonic() + timeout_seconds
+
+    def get_remaining_time_in_millis(self):
+        return max(0, int((self._deadline - time.monotonic()) * 1000))
+
+
+# the original loop, for comparison
+def busy_loop(transcribe, job_name):
+    status = "QUEUED"
+    while (status not in ("FAILED", "COMPLETED")):
+        result = transcribe.get_transcription_job(TranscriptionJobName=job_name)
+        status = result['TranscriptionJob']['TranscriptionJobStatus']
+
+
+# Drive the call as the SMA would: invoke, wait out any Pause / Speak the
+# handler returned, and re-invoke until the state moves on to 'playing'.
+def run_call(event, wait_ms, timeout_seconds, speak_ms=2000):
+    index.transcribe_wait_ms = wait_ms
+    event = deepcopy(event)
+    billed = 0
+    while True:
+        start = time.monotonic()
+        r = index.handler(event, FakeContext(timeout_seconds))
+        billed += time.monotonic() - start
+
+        if r['TransactionAttributes']['state'] != 'transcribing':
+            return billed
+
+        action = r['Actions'][0]
+        if action['Type'] == 'Pause':
+            time.sleep(int(action['Parameters']['DurationInMilliseconds']) / 1000)
+        else:
+            time.sleep(speak_ms / 1000)
+        event['CallDetails']['TransactionAttributes'] = r['TransactionAttributes']
+
+
+def main():
+    delays = [int(d) for d in sys.argv[1:]] or [500, 2000, 5000]
+
+    with open("../events/inbound.json") as f:
+        event = json.load(f)
+    event['InvocationEventType'] = "ACTION_SUCCESSFUL"
+    event['CallDetails']['TransactionAttributes'] = state_token.attributes(
+        state_token.CallState('transcribing', event['CallDetails']['Participants'][0]['CallId']))
+
+    aws_clients.register('s3', FakeS3())
+    index.transcribe_max_polls = 1000
+
+    print(f"{'delay ms':>8} {'strategy':<10} {'detect ms':>10} {'billed ms':>10} {'api calls':>10}")
+    for delay in delays:
+        transcribe = FakeTranscribe(delay)
+        start = time.monotonic()
+        busy_loop(transcribe, 'job')
+        billed = time.monotonic() - start
+        print(f"{delay:>8} {'busy loop':<10} {(time.monotonic() - transcribe.completes_at) * 1000:>10.1f} "
+              f"{billed * 1000:>10.1f} {transcribe.calls:>10}")
+
+        for name, wait_ms in [('re-entry', 0), ('backoff', 10000)]:
+            transcribe = FakeTranscribe(delay)
+            aws_clients.register('transcribe', transcribe)
+            with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+                billed = run_call(event, wait_ms, timeout_seconds=60)
+            print(f"{delay:>8} {name:<10} {(time.monotonic() - transcribe.completes_at) * 1000:>10.1f} "
+                  f"{billed * 1000:>10.1f} {transcribe.calls:>10}")
+
+    # a deadline tighter than the job: the backoff wait gives up in time
+    transcribe = FakeTranscribe(5000)
+    aws_clients.register('transcribe', transcribe)
+    index.transcribe_wait_ms = 10000
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        start = time.monotonic()
+        r = index.handler(event, FakeContext(3))
+        took = time.monotonic() - start
+    print(f"\n3s timeout, 5s job: returned after {took * 1000:.0f} ms, {transcribe.calls} calls, "
+          f"state {r['TransactionAttributes']['state']!r}, {r['Actions'][0]['Type']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+#
+# Transcripts keyed by the content of the recording (its S3 ETag), so a
+# recording that has already been transcribed - or a retried ACTION_SUCCESSFUL
+# for one that is being transcribed - never starts another Transcribe job.
+#
+# A per-container LRU sits in front of an optional durable store that is
+# shared by every container.  Values are small dicts: {'params': ...} while
+# the job runs, {'transcript': ...} once it is done.
+#
+# Looking a recording up costs an S3 head_object call for its ETag, so the
+# cache is off unless a store or an LRU size is configured.
+#
+# Environment:
+#   TRANSCRIPT_CACHE_SIZE         LRU entries per container, default 256 with a
+#                                 store, otherwise 0 (the cache is off)
+#   TRANSCRIPT_CACHE_TTL_SECONDS  lifetime of an entry in both tiers, default 86400
+#   TRANSCRIPT_CACHE_STORE        none (default) or s3
+#   TRANSCRIPT_CACHE_BUCKET       bucket for the s3 store, default WAVFILE_BUCKET
+#   TRANSCRIPT_CACHE_PREFIX       key prefix for the s3 store, default transcript-cache/
+#
+
+from collections import OrderedDict
+import json
+import os
+import time
+
+import aws_clients
+import sma_log
+
+
+logger = sma_log.logger
+
+
+class LRUCache:
+    def __init__(self, max_size, ttl_seconds, clock=time.time):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+
+        expires, value = entry
+        if expires <= self.clock():
+            del self.entries[key]
+            return None
+
+        self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        if self.max_size <= 0:
+            return
+
+        self.entries[key] = (self.clock() + self.ttl_seconds, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def delete(self, key):
+        self.entries.pop(key, None)
+
+
+# One JSON object per key.  Expired objects read as missing; a lifecycle rule
+# on the prefix can clean them up.
+class S3Store:
+    def __init__(self, bucket, prefix, ttl_seconds, clock=time.time):
+        self.bucket = bucket
+        self.prefix = prefix
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.client = aws_clients.client('s3')
+
+    def _key(self, key):
+        return f"{self.prefix}{key}.json"
+
+    def get(self, key):
+        try:
+            result = self.client.get_object(Bucket=self.bucket, Key=self._key(key))
+        except Exception as err:
+            if getattr(err, 'response', {}).get('Error', {}).get('Code') in ('NoSuchKey', '404'):
+                return None
+            raise
+
+        entry = json.loads(result['Body'].read())
+        if entry['expires'] <= self.clock():
+            return None
+
+        return entry['value']
+
+    def put(self, key, value):
+        self.client.put_object(Bucket=self.bucket, Key=self._key(key), ContentType="application/json",
+                               Body=json.dumps({'expires': self.clock() + self.ttl_seconds, 'value': value}))
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+
+class TranscriptCache:
+    def __init__(self, lru, store=None):
+        self.lru = lru
+        self.store = store
+        self.stats = {'hits': 0, 'store_hits': 0, 'misses': 0, 'errors': 0}
+
+    @property
+    def enabled(self):
+        return self.lru.max_size > 0 or self.store is not None
+
+    def get(self, key):
+        value = self.lru.get(key)
+        if value is not None:
+            self.stats['hits'] += 1
+            return value
+
+        if self.store is not None:
+            try:
+                value = self.store.get(key)
+            except Exception as err:
+                self.stats['errors'] += 1
+                logger.error("exception reading transcript cache:", exc_info=err)
+
+            if value is not None:
+                self.stats['store_hits'] += 1
+                self.lru.put(key, value)
+                return value
+
+        self.stats['misses'] += 1
+        return None
+
+    def put(self, key, value):
+        self.lru.put(key, value)
+        if self.store is not None:
+            try:
+                self.store.put(key, value)
+            except Exception as err:
+                self.stats['errors'] += 1
+                logger.error("exception writing transcript cache:", exc_info=err)
+
+    def delete(self, key):
+        self.lru.delete(key)
+        if self.store is not None:
+            try:
+                self.store.delete(key)
+            except Exception as err:
+                self.stats['errors'] += 1
+                logger.error("exception deleting from transcript cache:", exc_info=err)
+
+
+def from_env():
+    ttl_seconds = int(os.getenv('TRANSCRIPT_CACHE_TTL_SECONDS', '86400'))
+    kind = os.getenv('TRANSCRIPT_CACHE_STORE', 'none')
+    lru = LRUCache(int(os.getenv('TRANSCRIPT_CACHE_SIZE', '0' if kind == 'none' else '256')), ttl_seconds)
+
+    if kind == 'none':
+        return TranscriptCache(lru)
+    if kind == 's3':
+        bucket = os.getenv('TRANSCRIPT_CACHE_BUCKET', os.getenv('WAVFILE_BUCKET'))
+        return TranscriptCache(lru, S3Store(bucket, os.getenv('TRANSCRIPT_CACHE_PREFIX', 'transcript-cache/'), ttl_seconds))
+
+    raise ValueError(f"unknown TRANSCRIPT_CACHE_STORE {kind!r}")
+
+
+cache = from_env()
+
+
+# Swap the cache, e.g. for a fresh one in tests
+def set_cache(c):
+    global cache
+    cache = c
@@ -0,0 +1,74 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+#
+# Companion handler for transcription completion.
+#
+# Subscribe it to either (or both) of
+#   - the EventBridge "Transcribe Job State Change" events, or
+#   - S3 ObjectCreated events on the transcript bucket, where the transcript
+#     for a job lands at OutputKey "{call_id}/{call_id}" (job name == call_id)
+# and it records finished jobs in transcription_store, so the call flow can
+# find out a job is done without calling get_transcription_job.
+#
+
+from urllib.parse import unquote_plus
+
+import sma_log
+import transcription_store
+
+
+logger = sma_log.logger
+
+finished = ("COMPLETED", "FAILED")
+
+
+# (job name, status) for every job update in an event
+def job_updates(event):
+    if event.get('source') == "aws.transcribe":
+        detail = event['detail']
+        yield detail['TranscriptionJobName'], detail['TranscriptionJobStatus']
+
+    for record in event.get('Records', []):
+        if record.get('eventSource') != "aws:s3" or not record.get('eventName', '').startswith("ObjectCreated"):
+            continue
+
+        key = unquote_plus(record['s3']['object']['key'])
+        if key.endswith('.json'):
+            key = key[:-len('.json')]
+
+        # skip anything else in the bucket, e.g. Transcribe's write access check
+        prefix, _, name = key.partition('/')
+        if prefix and prefix == name:
+            yield name, "COMPLETED"
+
+
+def handler(event, context):
+    with sma_log.invocation(event):
+        logger.info("called with event", extra={'data': event})
+
+        recorded = 0
+        try:
+            for job_name, status in job_updates(event):
+                if status in finished:
+                    transcription_store.store.put(job_name, status)
+                    recorded += 1
+        except Exception as e:
+            logger.error("exception recording transcription status:", exc_info=e)
+
+        logger.info("recorded %d jobs", recorded)
+        return {'recorded': recorded}
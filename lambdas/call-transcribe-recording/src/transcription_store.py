@@ -0,0 +1,95 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+#
+# Where transcription jobs that have finished are recorded, keyed by
+# TranscriptionJobName.  transcription_events.handler() writes to it as
+# Transcribe / S3 events arrive, and playback_recording() reads it before
+# asking Transcribe for the job status.
+#
+# A store only needs get(job_name) -> status or None, and put(job_name, status).
+#
+# Environment:
+#   TRANSCRIPTION_STORE       memory (default) or dynamodb
+#   TRANSCRIPTION_TABLE       DynamoDB table, partition key JobName (S)
+#   TRANSCRIPTION_TTL_SECONDS how long a DynamoDB entry lives (ExpiresAt), default 3600
+#   TRANSCRIPTION_STORE_MAX   jobs kept by the memory store, default 1024
+#
+
+import os
+import time
+from collections import OrderedDict
+
+import aws_clients
+
+
+# Per-container dict of the most recent max_jobs jobs.  Fine for tests and
+# local tools, and when the events are handled in the same process as the calls.
+class MemoryStore:
+    def __init__(self, max_jobs=1024):
+        self.max_jobs = max_jobs
+        self.jobs = OrderedDict()
+
+    def get(self, job_name):
+        return self.jobs.get(job_name)
+
+    def put(self, job_name, status):
+        self.jobs[job_name] = status
+        self.jobs.move_to_end(job_name)
+        while len(self.jobs) > self.max_jobs:
+            self.jobs.popitem(last=False)
+
+
+class DynamoDBStore:
+    def __init__(self, table, ttl_seconds=3600):
+        self.table = table
+        self.ttl_seconds = ttl_seconds
+        self.client = aws_clients.client('dynamodb')
+
+    def get(self, job_name):
+        r = self.client.get_item(TableName=self.table,
+                                 Key={'JobName': {'S': job_name}},
+                                 ConsistentRead=True)
+        item = r.get('Item')
+        return item['Status']['S'] if item else None
+
+    def put(self, job_name, status):
+        self.client.put_item(TableName=self.table, Item={
+            'JobName': {'S': job_name},
+            'Status': {'S': status},
+            'ExpiresAt': {'N': str(int(time.time()) + self.ttl_seconds)}
+        })
+
+
+def from_env():
+    kind = os.getenv('TRANSCRIPTION_STORE', 'memory')
+    if kind == 'memory':
+        return MemoryStore(int(os.getenv('TRANSCRIPTION_STORE_MAX', '1024')))
+    if kind == 'dynamodb':
+        return DynamoDBStore(os.environ['TRANSCRIPTION_TABLE'],
+                             int(os.getenv('TRANSCRIPTION_TTL_SECONDS', '3600')))
+
+    raise ValueError(f"unknown TRANSCRIPTION_STORE {kind!r}")
+
+
+store = from_env()
+
+
+# Swap the store, e.g. for a fake in tests
+def set_store(s):
+    global store
+    store = s
@@ -0,0 +1,201 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+#
+# Benchmark every route of every lambda's routing table - its sma_router
+# router, or its sma_fsm flow - and compare against the baseline checked in
+# next to this file.
+#
+#   python3 -m tools.bench [--threshold 0.25] [-n 2000] [lambda ...]
+#   python3 -m tools.bench --update          # record a new baseline
+#   python3 -m tools.bench --update call-and-bridge   # re-record one lambda's entries
+#
+# Exits 1 if any entry is slower than baseline * (1 + threshold) (and by more
+# than --floor-us, so sub-microsecond jitter does not fail the run).
+#
+# The routes are dispatched with an event built to reach them, in a warm
+# container: AWS calls go to the fakes in tools.fakes, and caches are
+# as the previous call left them.  Timings are scaled by a fixed calibration
+# loop measured with the baseline, so a baseline recorded on a faster or
+# slower machine still compares.
+#
+
+import argparse
+from contextlib import redirect_stdout
+import json
+import os
+import sys
+import timeit
+
+from tools.fakes import FakeChime, FakeS3, FakeTranscribe, install
+from tools.lambda_loader import LAMBDAS, load_event, load_lambda
+
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench-baseline.json')
+ROUTERS = ('router', 'flow')
+ANY = '*'
+BUCKET = "bench-wav-files"
+JOB_NAME = "bench-transcription-job"
+RECORDING_KEY = "9ff01357-23c5-4611-9dd3-f05f9d654faa-/9ff01357-23c5-4611-9dd3-f05f9d654faa-0.wav"
+
+
+# A fixed, pure python workload, to compare machines
+def calibration_us():
+    def work():
+        d = {}
+        for i in range(200):
+            d[f"k{i}"] = [i, str(i), {'v': i}]
+        return json.dumps(d)
+
+    return min(timeit.repeat(work, number=200, repeat=10)) / 200 * 1e6
+
+
+# An event for a route key (event type, action type, state); ANY parts get
+# an ACTION_SUCCESSFUL for RecordAudio in state new
+def entry_event(name, key):
+    event_type, action_type, state = key
+    e = load_event(name)
+
+    if event_type == ANY:
+        event_type = "ACTION_SUCCESSFUL"
+    if action_type == ANY:
+        action_type = "ReceivedDigits" if event_type == 'DIGITS_RECEIVED' else "RecordAudio"
+    if state == ANY:
+        state = "new"
+    e['InvocationEventType'] = event_type
+
+    e['ActionData'] = {
+        'Type': action_type,
+        # a number the dial plan allows, or a Voice Focus toggle
+        'ReceivedDigits': "12125551212" if action_type == 'SpeakAndGetDigits' else "1",
+        'RecordingDestination': {'Type': "S3", 'BucketName': BUCKET, 'Key': RECORDING_KEY},
+        'IntentResult': {'SessionState': {'Intent': {'Name': "OrderFlowers"}}},
+    }
+    e['CallDetails']['TransactionAttributes'] = {
+        'state': state,
+        'params': {'TranscriptionJobName': JOB_NAME,
+                   'OutputBucketName': BUCKET,
+                   'OutputKey': f"{JOB_NAME}/{JOB_NAME}"},
+    }
+
+    # the B leg, as after CallAndBridge
+    leg = dict(e['CallDetails']['Participants'][0])
+    leg.update({'Direction': "Outbound", 'CallId': "6b2a6b3a-cd67-4bd3-9d3d-2ab8f1b5a2b7", 'ParticipantTag': "LEG-B"})
+    e['CallDetails']['Participants'].append(leg)
+
+    return e
+
+
+# A finished job for the 'transcribing' entries.  Its name is not the call's
+# CallId, so the 'recording' entries can start their own job.
+def fakes_for(name):
+    s3 = FakeS3()
+    s3.objects[(BUCKET, RECORDING_KEY)] = b'RIFF' + RECORDING_KEY.encode()
+    transcribe = FakeTranscribe(s3, clock=lambda: 0, duration_ms=0)
+    transcribe.start_transcription_job(TranscriptionJobName=JOB_NAME, OutputBucketName=BUCKET,
+                                       OutputKey=f"{JOB_NAME}/{JOB_NAME}")
+    return s3, transcribe, FakeChime()
+
+
+def bench_lambda(name, number):
+    os.environ.setdefault('WAVFILE_BUCKET', BUCKET)
+    lam = load_lambda(name)
+    s3, transcribe, chime = fakes_for(name)
+    install(lam, s3, transcribe, chime)
+
+    # drop the job a 'recording' entry started, so every call starts it afresh
+    # rather than timing the ConflictException for a job that already exists
+    jobs = dict(transcribe.jobs)
+
+    def dispatch(router, event):
+        r = router.dispatch(event)
+        if len(transcribe.jobs) != len(jobs):
+            transcribe.jobs = dict(jobs)
+        return r
+
+    results = {}
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        for attr in ROUTERS:
+            router = getattr(lam, attr, None)
+            for key, route in getattr(router, 'routes', {}).items():
+                if route.handlers:
+                    event = entry_event(name, key)
+                    best = min(timeit.repeat(lambda: dispatch(router, event), number=number, repeat=5))
+                    results[f"{name}/{route.name}"] = best / number * 1e6
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--number', type=int, default=2000, help="calls per timing")
+    parser.add_argument('--threshold', type=float, default=0.25, help="allowed slowdown, as a fraction")
+    parser.add_argument('--floor-us', type=float, default=2.0, help="ignore slowdowns smaller than this")
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--update', action='store_true', help="write the results as the new baseline")
+    parser.add_argument('lambdas', nargs='*', default=LAMBDAS)
+    args = parser.parse_args()
+
+    # calibrate either side of the run, in case the machine was busy for one
+    calibration = calibration_us()
+    results = {}
+    for name in args.lambdas:
+        results.update(bench_lambda(name, args.number))
+    calibration = min(calibration, calibration_us())
+
+    if args.update:
+        baseline = {'calibration_us': calibration, 'us': {}}
+        if os.path.exists(args.baseline) and set(args.lambdas) != set(LAMBDAS):
+            # replace only the lambdas that were run, scaled to the calibration
+            # the other entries were recorded with
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+            scale = baseline['calibration_us'] / calibration
+            results = {k: v * scale for k, v in results.items()}
+            baseline['us'] = {k: v for k, v in baseline['us'].items()
+                              if k.split('/', 1)[0] not in args.lambdas}
+        baseline['us'].update({k: round(v, 3) for k, v in results.items()})
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"wrote {len(results)} entries to {args.baseline}")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    scale = calibration / baseline['calibration_us']
+
+    regressions = 0
+    print(f"{'entry':<64} {'base us':>8} {'now us':>8} {'change':>8}")
+    for key, now in results.items():
+        if key not in baseline['us']:
+            print(f"{key:<64} {'-':>8} {now:>8.2f} {'new':>8}")
+            continue
+
+        base = baseline['us'][key] * scale
+        change = now / base - 1
+        regressed = change > args.threshold and now - base > args.floor_us
+        regressions += regressed
+        print(f"{key:<64} {base:>8.2f} {now:>8.2f} {change:>+7.0%}{'  REGRESSION' if regressed else ''}")
+
+    print(f"\ncalibration {calibration:.1f} us (baseline {baseline['calibration_us']:.1f} us, scale {scale:.2f}), "
+          f"threshold {args.threshold:.0%}: {regressions} regressions")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,176 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+#
+# In-process driver for the test/cases/* directories.
+#
+#   python3 -m tools.cases [-v] [lambda ...]
+#
+# The bash case scripts (cases/basic/basic.bash, cases/new-call/new-call.bash)
+# start python3 lambda-runner.py, jq and ajv for every check.  This builds the
+# same events in memory, calls each lambda's handler() in this process and
+# validates the responses against the case's <case>-schema.json, compiled
+# once with the lambda's sma_schema.  Every cases/<case> directory is
+# discovered; each case name maps to its variants below.
+#
+#   basic     {} (blank), ACTION_SUCCESSFUL, HANGUP, HANGUP with every AWS call
+#             failing (forced error), a second HANGUP with an unknown
+#             Direction, NEW_OUTBOUND_CALL, RINGING, CALL_ANSWERED and an
+#             unknown event type
+#   new-call  inbound.json as is, and any Pause has DurationInMilliseconds,
+#             PlayAudio an AudioSource and Hangup SipResponseCode "0"
+#
+# The S3, Transcribe and Chime clients are the fakes in tools.fakes.  The unit
+# tests the bash scripts also run (static client, hangup spies) are covered
+# by tools.run_tests.
+#
+# Prints a line per failed check (every check with -v) and a total, and exits
+# non-zero if any failed.
+#
+
+import argparse
+from contextlib import redirect_stdout
+from copy import deepcopy
+import json
+import os
+import sys
+import time
+
+from tools.fakes import FailingClient, FakeChime, FakeS3, FakeTranscribe, install
+from tools.lambda_loader import LAMBDAS, load_event, load_lambda, src_dir
+
+
+def _with(event, event_type):
+    e = deepcopy(event)
+    e['InvocationEventType'] = event_type
+    return e
+
+
+def _has_parameter(action_type, name, value=None):
+    def check(r):
+        for action in r.get('Actions', ()):
+            if action.get('Type') == action_type:
+                v = action.get('Parameters', {}).get(name)
+                if v is None or (value is not None and v != value):
+                    return f"{action_type} without {name}" + (f" == {value!r}" if value is not None else '')
+        return None
+
+    return check
+
+
+# (label, event, failing, extra checks) for a case, from the lambda's inbound.json
+def basic_variants(inbound):
+    second_hangup = _with(inbound, 'HANGUP')
+    second_hangup['CallDetails']['Participants'][0]['Direction'] = "foobar"
+
+    return [
+        ('blank', {}, False, ()),
+        ('ACTION_SUCCESSFUL', _with(inbound, 'ACTION_SUCCESSFUL'), False, ()),
+        ('HANGUP', _with(inbound, 'HANGUP'), False, ()),
+        ('forced error', _with(inbound, 'HANGUP'), True, ()),
+        ('second HANGUP', second_hangup, False, ()),
+        ('NEW_OUTBOUND_CALL', _with(inbound, 'NEW_OUTBOUND_CALL'), False, ()),
+        ('RINGING', _with(inbound, 'RINGING'), False, ()),
+        ('CALL_ANSWERED', _with(inbound, 'CALL_ANSWERED'), False, ()),
+        ('IMBAAD', _with(inbound, 'IMBAAD'), False, ()),
+    ]
+
+
+def new_call_variants(inbound):
+    return [
+        ('NEW_INBOUND_CALL', deepcopy(inbound), False,
+         (_has_parameter('Pause', 'DurationInMilliseconds'),
+          _has_parameter('PlayAudio', 'AudioSource'),
+          _has_parameter('Hangup', 'SipResponseCode', "0"))),
+    ]
+
+
+CASES = {
+    'basic': basic_variants,
+    'new-call': new_call_variants,
+}
+
+
+def discover(name):
+    root = os.path.join(src_dir(name), 'test', 'cases')
+    if not os.path.isdir(root):
+        return []
+    return sorted(d for d in os.listdir(root) if os.path.isdir(os.path.join(root, d)))
+
+
+def run_lambda(name):
+    os.environ.setdefault('WAVFILE_BUCKET', "fake-bucket")
+    lam = load_lambda(name)
+    inbound = load_event(name)
+
+    results = []
+    with open(os.devnull, 'w') as devnull:
+        for case in discover(name):
+            variants = CASES.get(case)
+            if variants is None:
+                results.append((case, '-', f"no variants for cases/{case}"))
+                continue
+
+            with open(os.path.join(src_dir(name), 'test', 'cases', case, f"{case}-schema.json")) as f:
+                schema = lam.sma_schema.compile(json.load(f))
+
+            for label, event, failing, checks in variants(inbound):
+                s3 = FakeS3()
+                if failing:
+                    install(lam, FailingClient(), FailingClient(), FailingClient())
+                else:
+                    install(lam, s3, FakeTranscribe(s3), FakeChime())
+
+                with redirect_stdout(devnull):
+                    try:
+                        r = lam.handler(event, None)
+                    except Exception as e:
+                        results.append((case, label, f"handler raised {e!r}"))
+                        continue
+
+                error = None
+                try:
+                    schema(r)
+                except lam.sma_schema.ValidationError as e:
+                    error = f"{case}-schema.json: {e}"
+                for check in checks:
+                    error = error or check(r)
+                results.append((case, label, error))
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-v', '--verbose', action='store_true', help="print every check, not just failures")
+    parser.add_argument('lambdas', nargs='*', default=LAMBDAS)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    checks = failures = 0
+    for name in args.lambdas:
+        for case, label, error in run_lambda(name):
+            checks += 1
+            failures += error is not None
+            if error is not None or args.verbose:
+                print(f"{'FAIL' if error else 'ok':<4} {name:<26} {case:<9} {label:<18} {error or ''}")
+
+    print(f"{checks} checks, {failures} failed, in {time.perf_counter() - start:.2f} s")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
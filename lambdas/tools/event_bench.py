@@ -0,0 +1,118 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+#
+# Raw dict access vs. the typed sma_event.Event, over every lambda's sample
+# events: the fields the handlers read (event type, state, action type,
+# leg A's CallId and numbers, the ActionData variant's fields), each read the
+# way the handlers used to - a dict path in a try/except KeyError - and
+# through a new Event, as once per invocation, and a shared one.
+#
+#   python3 -m tools.event_bench [-n 20000] [lambda ...]
+#
+
+import argparse
+import timeit
+
+from tools.lambda_loader import LAMBDAS, load_lambda
+from tools.sample_events import sample_events
+
+
+def raw_reads(e):
+    try:
+        event_type = e['InvocationEventType']
+    except KeyError:
+        event_type = None
+    try:
+        state = e['CallDetails']['TransactionAttributes']['state']
+    except KeyError:
+        state = None
+    try:
+        action_type = e['ActionData']['Type']
+    except KeyError:
+        action_type = None
+    try:
+        leg = e['CallDetails']['Participants'][0]
+        leg = (leg['CallId'], leg['From'], leg['To'])
+    except (KeyError, IndexError):
+        leg = None
+    try:
+        digits = e['ActionData']['ReceivedDigits']
+    except KeyError:
+        digits = None
+    try:
+        key = e['ActionData']['RecordingDestination']['Key']
+    except KeyError:
+        key = None
+    try:
+        intent = e['ActionData']['IntentResult']['SessionState']['Intent']['Name']
+    except KeyError:
+        intent = None
+
+    return event_type, state, action_type, leg, digits, key, intent
+
+
+def typed_reads(ev, sma_event):
+    action = ev.action
+    leg = ev.call.leg_a
+    if leg is not None:
+        leg = (leg['CallId'], leg['From'], leg['To'])
+
+    return (ev.type, ev.state, action.type, leg,
+            action.digits if isinstance(action, sma_event.ReceivedDigits) else None,
+            action.key if isinstance(action, sma_event.RecordAudio) else None,
+            action.intent_name if isinstance(action, sma_event.IntentResult) else None)
+
+
+def bench(f, number):
+    return min(timeit.repeat(f, number=number, repeat=5)) / number * 1e6
+
+
+def bench_lambda(name, number):
+    sma_event = load_lambda(name).sma_event
+
+    rows = []
+    for label, e in sample_events(name):
+        new = lambda: typed_reads(sma_event.Event(e), sma_event)
+        shared = lambda: typed_reads(sma_event.of(e), sma_event)
+
+        # both ways must read the same values
+        assert raw_reads(e) == new() == shared(), (name, label)
+        rows.append((label, bench(lambda: raw_reads(e), number), bench(new, number), bench(shared, number)))
+
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--number', type=int, default=20000)
+    parser.add_argument('lambdas', nargs='*', default=LAMBDAS)
+    args = parser.parse_args()
+
+    total_raw = total_new = total_shared = 0
+    print(f"{'lambda':<26} {'event':<38} {'dict us':>8} {'Event us':>9} {'shared us':>10}")
+    for name in args.lambdas:
+        for label, raw, new, shared in bench_lambda(name, args.number):
+            total_raw += raw
+            total_new += new
+            total_shared += shared
+            print(f"{name:<26} {label:<38} {raw:>8.2f} {new:>9.2f} {shared:>10.2f}")
+    print(f"{'total':<65} {total_raw:>8.2f} {total_new:>9.2f} {total_shared:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+#
+# In-memory stand-ins for the AWS clients the lambdas use.  Register them
+# with a loaded lambda's aws_clients module, e.g.
+#
+#   lam = load_lambda('call-transcribe-recording')
+#   install(lam, FakeS3(), FakeTranscribe(s3, clock), FakeChime())
+#
+# Every fake counts its calls in `calls`, keyed by method name.
+#
+
+from collections import Counter
+import hashlib
+import io
+import json
+import time
+import uuid
+
+
+# botocore's ClientError carries the error code in .response
+class FakeClientError(Exception):
+    def __init__(self, code, message=''):
+        super().__init__(f"{code}: {message}")
+        self.response = {'Error': {'Code': code, 'Message': message}}
+
+
+class FakeS3:
+    def __init__(self):
+        self.objects = {}
+        self.calls = Counter()
+
+    def _object(self, bucket, key):
+        try:
+            return self.objects[(bucket, key)]
+        except KeyError:
+            raise FakeClientError('NoSuchKey', f"s3://{bucket}/{key}")
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.calls['put_object'] += 1
+        self.objects[(Bucket, Key)] = Body.encode() if isinstance(Body, str) else Body
+        return {'ETag': self._etag(self.objects[(Bucket, Key)])}
+
+    def head_object(self, Bucket, Key):
+        self.calls['head_object'] += 1
+        data = self._object(Bucket, Key)
+        return {'ETag': self._etag(data), 'ContentLength': len(data)}
+
+    def get_object(self, Bucket, Key):
+        self.calls['get_object'] += 1
+        data = self._object(Bucket, Key)
+        return {'Body': io.BytesIO(data), 'ETag': self._etag(data), 'ContentLength': len(data)}
+
+    def delete_object(self, Bucket, Key):
+        self.calls['delete_object'] += 1
+        self.objects.pop((Bucket, Key), None)
+        return {}
+
+    @staticmethod
+    def _etag(data):
+        return f'"{hashlib.md5(data).hexdigest()}"'
+
+
+# Jobs complete duration_ms after they start, by `clock` (seconds), and then
+# write their result to OutputBucketName/OutputKey like Transcribe does.
+class FakeTranscribe:
+    def __init__(self, s3, clock=time.monotonic, duration_ms=8000,
+                 transcript="This is a message to transcribe."):
+        self.s3 = s3
+        self.clock = clock
+        self.duration_ms = duration_ms
+        self.transcript = transcript
+        self.jobs = {}
+        self.calls = Counter()
+
+    def start_transcription_job(self, **params):
+        self.calls['start_transcription_job'] += 1
+        name = params['TranscriptionJobName']
+        if name in self.jobs:
+            raise FakeClientError('ConflictException', f"job {name} already exists")
+
+        self.jobs[name] = {'params': params, 'done_at': self.clock() + self.duration_ms / 1000, 'written': False}
+        return {'TranscriptionJob': self._job(name, 'IN_PROGRESS')}
+
+    def get_transcription_job(self, TranscriptionJobName):
+        self.calls['get_transcription_job'] += 1
+        job = self.jobs.get(TranscriptionJobName)
+        if job is None:
+            raise FakeClientError('BadRequestException', f"no job {TranscriptionJobName}")
+
+        if self.clock() < job['done_at']:
+            return {'TranscriptionJob': self._job(TranscriptionJobName, 'IN_PROGRESS')}
+
+        if not job['written']:
+            params = job['params']
+            self.s3.objects[(params['OutputBucketName'], params['OutputKey'])] = json.dumps({
+                'jobName': TranscriptionJobName, 'accountId': "123",
+                'results': {'transcripts': [{'transcript': self.transcript}], 'items': []},
+                'status': "COMPLETED"}).encode()
+            job['written'] = True
+
+        return {'TranscriptionJob': self._job(TranscriptionJobName, 'COMPLETED')}
+
+    @staticmethod
+    def _job(name, status):
+        return {'TranscriptionJobName': name, 'TranscriptionJobStatus': status}
+
+
+# Outbound calls are recorded in `created`, for a simulator to place
+class FakeChime:
+    def __init__(self):
+        self.created = []
+        self.calls = Counter()
+
+    def create_sip_media_application_call(self, **params):
+        self.calls['create_sip_media_application_call'] += 1
+        self.created.append(params)
+        return {'SipMediaApplicationCall': {'TransactionId': str(uuid.uuid4())}}
+
+    def update_sip_media_application_call(self, **params):
+        self.calls['update_sip_media_application_call'] += 1
+        return {'SipMediaApplicationCall': {'TransactionId': params.get('TransactionId', '')}}
+
+
+# Every call fails, as when the service is down or the role lacks a permission
+class FailingClient:
+    def __init__(self, code='InternalFailure'):
+        self.code = code
+        self.calls = Counter()
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        def call(**params):
+            self.calls[name] += 1
+            raise FakeClientError(self.code, f"{name} forced to fail")
+
+        return call
+
+
+# Point a loaded lambda's clients at the fakes.  Lambdas that never call AWS
+# have no aws_clients module and are left alone.
+def install(lam, s3=None, transcribe=None, chime=None):
+    clients = getattr(lam, 'aws_clients', None)
+    if clients is None:
+        return
+
+    clients.reset()
+    for service, fake in (('s3', s3), ('transcribe', transcribe), ('chime', chime)):
+        if fake is not None:
+            clients.register(service, fake)
+
+
+def api_calls(*fakes):
+    calls = Counter()
+    for fake in fakes:
+        calls.update(fake.calls)
+    return calls
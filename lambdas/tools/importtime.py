@@ -0,0 +1,102 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+#
+# Cold-start import cost of each lambda, measured with `python -X importtime`.
+#
+#   python3 -m tools.importtime [--budget-ms 50] [--repeat 3] [--top 5]
+#                               [--preload json,logging,traceback] [lambda ...]
+#
+# Each lambda's index is imported in a fresh interpreter, the way a new
+# Lambda container does it.  The modules in --preload are imported first
+# because the Lambda runtime's bootstrap has already loaded them by the time
+# it imports the handler, so they are not part of the lambda's own cost.  Reports the cumulative import time of `index`
+# (the best of --repeat runs) and its heaviest dependencies, and exits
+# non-zero if any lambda is over budget.
+#
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+from tools.lambda_loader import LAMBDAS, src_dir
+
+
+_line = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$')
+
+
+def measure(name, preload=()):
+    env = dict(os.environ, PYTHONPATH=src_dir(name))
+    env.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+    code = ''.join(f"import {m}; " for m in preload) + 'import index'
+    p = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                       cwd=src_dir(name), env=env, capture_output=True, text=True)
+    if p.returncode != 0:
+        raise RuntimeError(f"{name}: import index failed\n{p.stderr}")
+
+    # lines are written as each import completes, so the modules that index
+    # pulled in are the ones reported after anything imported before it
+    modules = []
+    for line in p.stderr.splitlines():
+        m = _line.match(line)
+        if m is None:
+            continue
+        cumulative, depth, module = int(m.group(2)), len(m.group(3)), m.group(4)
+        if depth == 1 and module == 'index':
+            return cumulative, modules
+        modules.append((cumulative, depth, module))
+        if depth == 1:
+            # a top level import that finished before index started
+            modules = []
+
+    raise RuntimeError(f"{name}: no import time reported for index")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--budget-ms', type=float, default=50.0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--top', type=int, default=5)
+    parser.add_argument('--preload', default='json,logging,traceback')
+    parser.add_argument('lambdas', nargs='*', default=LAMBDAS)
+    args = parser.parse_args()
+
+    preload = [m for m in args.preload.split(',') if m]
+
+    over = []
+    print(f"{'lambda':<26} {'import ms':>10}  heaviest imports")
+    for name in args.lambdas:
+        total, modules = min((measure(name, preload) for _ in range(args.repeat)), key=lambda r: r[0])
+
+        # only the direct imports of index, indent of 3 under the top level
+        direct = sorted((m for m in modules if m[1] == 3), reverse=True)[:args.top]
+        heaviest = ', '.join(f"{module} {us / 1000:.1f}" for us, _, module in direct)
+        print(f"{name:<26} {total / 1000:>10.1f}  {heaviest}")
+
+        if total / 1000 > args.budget_ms:
+            over.append(name)
+
+    if over:
+        print(f"\nover the {args.budget_ms:g} ms budget: {', '.join(over)}")
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
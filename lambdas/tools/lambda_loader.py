@@ -0,0 +1,82 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+#
+# Load a lambda's index.py in-process.
+#
+# Every lambda's handler module is called `index`, and the modules next to it
+# (sma_actions.py, ...) share names across lambdas too.  load_lambda() imports
+# a lambda with its own src directory first on the path and then forgets the
+# module names again, so several lambdas can live side by side in one process.
+#
+
+import importlib
+import json
+import os
+import sys
+
+
+LAMBDAS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# in workshop lesson order
+LAMBDAS = (
+    'call-play-recording',
+    'call-me-back',
+    'call-and-bridge',
+    'call-lex-bot',
+    'call-make-recording',
+    'call-transcribe-recording',
+)
+
+
+def src_dir(name):
+    return os.path.join(LAMBDAS_DIR, name, 'src')
+
+
+def load_event(name, file_name='inbound.json'):
+    with open(os.path.join(LAMBDAS_DIR, name, 'events', file_name)) as f:
+        return json.load(f)
+
+
+def _is_lambda_module(module):
+    path = getattr(module, '__file__', None) or ''
+    return (path.startswith(LAMBDAS_DIR)
+            and os.sep + 'src' + os.sep in path[len(LAMBDAS_DIR):])
+
+
+def _forget_lambda_modules():
+    for name, module in list(sys.modules.items()):
+        if _is_lambda_module(module):
+            del sys.modules[name]
+
+
+def load_lambda(name):
+    src = src_dir(name)
+    if not os.path.isdir(src):
+        raise ValueError(f"no such lambda: {name}")
+
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    # the tools print their own reports; MetricsEnabled=true brings the EMF lines back
+    os.environ.setdefault('MetricsEnabled', 'false')
+
+    _forget_lambda_modules()
+    sys.path.insert(0, src)
+    try:
+        return importlib.import_module('index')
+    finally:
+        sys.path.remove(src)
+        _forget_lambda_modules()
@@ -0,0 +1,115 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+#
+# Load generator: N synthetic calls per lambda, spread over a process pool.
+#
+#   python3 -m tools.load [-n 2000] [-w 4] [lambda ...]
+#
+# Each call starts from the lambda's events/inbound.json with its own CallId,
+# TransactionId and From number and is played through every state by
+# tools.simulator against the fake AWS clients.  Each worker process is one
+# warm container working through its share of the calls; the pool runs
+# them side by side.
+#
+# Reports p50/p95/p99 handler latency per InvocationEventType and per
+# TransactionAttributes.state (on the way in), and throughput: invocations
+# per second of handler time in one worker, and across the pool overall.
+#
+
+import argparse
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+import os
+import time
+
+from tools.lambda_loader import LAMBDAS
+from tools.simulator import Simulator
+
+
+def run_calls(name, calls, transcribe_ms):
+    sim = Simulator(name, transcribe_ms=transcribe_ms)
+    samples = []
+    handler_s = 0.0
+    for _ in range(calls):
+        stats = sim.run_call()
+        samples.extend(stats.samples)
+        handler_s += stats.wall_s
+
+    return samples, handler_s
+
+
+# nearest-rank percentile of a sorted list
+def percentile(ordered, p):
+    return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered) + 0.5)) - 1))]
+
+
+def summarize(samples):
+    groups = defaultdict(list)
+    for event_type, state, seconds in samples:
+        groups[('event', event_type)].append(seconds)
+        if state:
+            groups[('state', state)].append(seconds)
+
+    rows = []
+    for (kind, key), values in sorted(groups.items()):
+        values.sort()
+        rows.append((kind, key, len(values),
+                     *(percentile(values, p) * 1000 for p in (50, 95, 99))))
+    return rows
+
+
+def load_lambda_calls(pool, name, calls, workers, transcribe_ms):
+    shares = [calls // workers + (1 if i < calls % workers else 0) for i in range(workers)]
+
+    start = time.perf_counter()
+    futures = [pool.submit(run_calls, name, share, transcribe_ms) for share in shares if share]
+    results = [f.result() for f in futures]
+    elapsed = time.perf_counter() - start
+
+    samples = [s for worker_samples, _ in results for s in worker_samples]
+    handler_s = sum(h for _, h in results)
+    return samples, handler_s, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--calls', type=int, default=2000, help="calls per lambda")
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--transcribe-ms', type=int, default=8000, help="how long the fake Transcribe jobs take")
+    parser.add_argument('lambdas', nargs='*', default=LAMBDAS)
+    args = parser.parse_args()
+
+    summary = []
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for name in args.lambdas:
+            samples, handler_s, elapsed = load_lambda_calls(pool, name, args.calls, args.workers, args.transcribe_ms)
+
+            print(f"\n{name}: {args.calls} calls, {len(samples)} invocations")
+            print(f"  {'':<6} {'key':<24} {'count':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+            for kind, key, count, p50, p95, p99 in summarize(samples):
+                print(f"  {kind:<6} {key:<24} {count:>8} {p50:>8.3f} {p95:>8.3f} {p99:>8.3f}")
+
+            summary.append((name, len(samples), len(samples) / handler_s, len(samples) / elapsed))
+
+    print(f"\n{'lambda':<26} {'invocations':>11} {'inv/s/worker':>13} {'inv/s pool':>11}  ({args.workers} workers)")
+    for name, invocations, per_worker, pool_rate in summary:
+        print(f"{name:<26} {invocations:>11} {per_worker:>13.0f} {pool_rate:>11.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+#
+# Merge the profiles written by sma_profile into one ranked hot-spot report.
+#
+#   python3 -m tools.profile_report [--sort tottime|cumtime] [--top 25] path ...
+#
+# Each path is a .prof or .tracemalloc file, a directory of them, or a log
+# (e.g. exported from CloudWatch) holding the JSON lines written with
+# ProfileOutput=stdout.  Stdout profiles only carry their top entries, so
+# functions outside every invocation's top ProfileTop are missing from them.
+#
+
+import argparse
+from collections import defaultdict
+import json
+import os
+import pstats
+
+
+class Report:
+    def __init__(self):
+        self.cpu_profiles = 0
+        self.cpu_total = 0.0
+        # "file:line(function)" -> [ncalls, tottime, cumtime]
+        self.functions = defaultdict(lambda: [0, 0.0, 0.0])
+        self.memory_profiles = 0
+        self.peaks = []
+        # "file:line" -> [size, count]
+        self.lines = defaultdict(lambda: [0, 0])
+
+    def add_cpu(self, total, rows):
+        self.cpu_profiles += 1
+        self.cpu_total += total
+        for key, nc, tt, ct in rows:
+            f = self.functions[key]
+            f[0] += nc
+            f[1] += tt
+            f[2] += ct
+
+    def add_memory(self, peak, rows):
+        self.memory_profiles += 1
+        if peak is not None:
+            self.peaks.append(peak)
+        for key, size, count in rows:
+            line = self.lines[key]
+            line[0] += size
+            line[1] += count
+
+    def add_prof_file(self, path):
+        stats = pstats.Stats(path).stats
+        self.add_cpu(sum(v[2] for v in stats.values()),
+                     [(f"{f}:{line}({func})", nc, tt, ct)
+                      for (f, line, func), (cc, nc, tt, ct, callers) in stats.items()])
+
+    def add_tracemalloc_file(self, path):
+        import tracemalloc
+        snapshot = tracemalloc.Snapshot.load(path)
+        self.add_memory(None, [(f"{s.traceback[0].filename}:{s.traceback[0].lineno}", s.size, s.count)
+                               for s in snapshot.statistics('lineno')])
+
+    def add_log(self, path):
+        with open(path, errors='replace') as f:
+            for line in f:
+                start = line.find('{"profile"')
+                if start < 0:
+                    continue
+                try:
+                    entry = json.loads(line[start:])
+                except ValueError:
+                    continue
+
+                if entry['profile'] == 'cprofile':
+                    self.add_cpu(entry['total'], entry['stats'])
+                elif entry['profile'] == 'tracemalloc':
+                    self.add_memory(entry.get('peak'), entry['stats'])
+
+    def add(self, path):
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith(('.prof', '.tracemalloc')):
+                    self.add(os.path.join(path, name))
+        elif path.endswith('.prof'):
+            self.add_prof_file(path)
+        elif path.endswith('.tracemalloc'):
+            self.add_tracemalloc_file(path)
+        else:
+            self.add_log(path)
+
+    def print(self, sort, count):
+        if self.cpu_profiles:
+            n = self.cpu_profiles
+            column = {'tottime': 1, 'cumtime': 2}[sort]
+            ranked = sorted(self.functions.items(), key=lambda kv: kv[1][column], reverse=True)[:count]
+
+            print(f"cpu: {n} profiles, {self.cpu_total / n * 1e3:.3f} ms per invocation, ranked by {sort}")
+            print(f"  {'tottime %':>9} {'tot ms/inv':>10} {'cum ms/inv':>10} {'calls/inv':>9}  function")
+            for key, (nc, tt, ct) in ranked:
+                share = tt / self.cpu_total * 100 if self.cpu_total else 0
+                print(f"  {share:>8.1f}% {tt / n * 1e3:>10.4f} {ct / n * 1e3:>10.4f} {nc / n:>9.1f}  {key}")
+
+        if self.memory_profiles:
+            n = self.memory_profiles
+            ranked = sorted(self.lines.items(), key=lambda kv: kv[1][0], reverse=True)[:count]
+
+            peak = f", peak {max(self.peaks) / 1024:.1f} KB (mean {sum(self.peaks) / len(self.peaks) / 1024:.1f} KB)" \
+                if self.peaks else ""
+            print(f"\nmemory: {n} profiles{peak}, ranked by size still allocated at the end of the invocation")
+            print(f"  {'KB/inv':>9} {'blocks/inv':>10}  line")
+            for key, (size, blocks) in ranked:
+                print(f"  {size / n / 1024:>9.2f} {blocks / n:>10.1f}  {key}")
+
+        if not (self.cpu_profiles or self.memory_profiles):
+            print("no profiles found")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sort', choices=('tottime', 'cumtime'), default='tottime')
+    parser.add_argument('--top', type=int, default=25)
+    parser.add_argument('paths', nargs='+')
+    args = parser.parse_args()
+
+    report = Report()
+    for path in args.paths:
+        report.add(path)
+    report.print(args.sort, args.top)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+#
+# Run every python lambda's unit tests in one go.
+#
+#   python3 -m tools.run_tests [-w 6] [--reimport] [-v] [lambda ...]
+#
+# Every lambda's modules share names (index, sma_log, ...), so each suite runs
+# in a worker process of its own.  Workers are forked (where the platform
+# allows) after boto3 and the other heavy imports, so those are paid once
+# rather than once per suite.
+#
+# The tests delete sys.modules['index'] in tearDown to get a fresh import for
+# the next test.  Here that import is answered from a cache: index.py is
+# compiled and run once, a copy of its globals kept, and every later import
+# resets the same module object to that copy instead of running the file
+# again.  Functions keep the module's globals dict, so they see the reset.
+# index.py reads its environment at import, so a copy is kept per set of
+# environment variables: a test that sets LogLevel before importing still
+# gets a module that read it.  --reimport turns the cache off.
+#
+# Prints a line per lambda, the failures in full, and exits non-zero if any
+# test failed.
+#
+
+import argparse
+from copy import copy
+import importlib.abc
+import importlib.util
+import io
+import multiprocessing
+import os
+import sys
+import time
+import unittest
+
+from tools.lambda_loader import LAMBDAS, src_dir
+
+
+class IndexCache(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+
+    def __init__(self, path):
+        self.path = path
+        self.code = None
+        self.module = None
+        self.snapshots = {}
+        self.executions = 0
+        self.resets = 0
+
+    def find_spec(self, name, path=None, target=None):
+        if name != 'index':
+            return None
+        return importlib.util.spec_from_file_location(name, self.path, loader=self)
+
+    # the module object is reused, since the functions in it hold its globals
+    def create_module(self, spec):
+        return self.module
+
+    def exec_module(self, module):
+        self.module = module
+        key = tuple(sorted(os.environ.items()))
+
+        snapshot = self.snapshots.get(key)
+        if snapshot is not None:
+            module.__dict__.clear()
+            module.__dict__.update(_copied(snapshot))
+            self.resets += 1
+            return
+
+        if self.code is None:
+            with open(self.path, 'rb') as f:
+                self.code = compile(f.read(), self.path, 'exec')
+        exec(self.code, module.__dict__)
+        self.executions += 1
+        self.snapshots[key] = _copied(module.__dict__)
+
+
+# Top level containers (handler tables, caches) are copied, so a test that
+# changes one leaves the snapshot as it was
+def _copied(namespace):
+    return {k: copy(v) if type(v) in (dict, list, set) else v for k, v in namespace.items()}
+
+
+def run_suite(name, cache=True, verbosity=0):
+    start = time.perf_counter()
+
+    src = src_dir(name)
+    os.chdir(src)
+    sys.path.insert(0, src)
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+    index = IndexCache(os.path.join(src, 'index.py'))
+    if cache:
+        sys.meta_path.insert(0, index)
+
+    stream = io.StringIO()
+    suite = unittest.defaultTestLoader.discover('test', pattern='*_test.py', top_level_dir='test')
+    # buffer holds on to what the handlers log, and only reports it for tests that fail
+    result = unittest.TextTestRunner(stream=stream, verbosity=verbosity, buffer=True, warnings='ignore').run(suite)
+
+    return {
+        'name': name,
+        'run': result.testsRun,
+        'failures': len(result.failures) + len(result.errors) + len(result.unexpectedSuccesses),
+        'skipped': len(result.skipped),
+        'imports': index.executions,
+        'resets': index.resets,
+        'seconds': time.perf_counter() - start,
+        'report': stream.getvalue() if verbosity or not result.wasSuccessful() else '',
+    }
+
+
+def _run(args):
+    return run_suite(*args)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-w', '--workers', type=int, default=min(len(LAMBDAS), os.cpu_count() or 1))
+    parser.add_argument('--reimport', action='store_true', help="run index.py for every import, as the tests expect")
+    parser.add_argument('-v', '--verbose', action='store_true')
+    parser.add_argument('lambdas', nargs='*', default=LAMBDAS)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+
+    # imported once here and shared by every forked worker
+    import boto3
+    import unittest.mock
+
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+    # one process per suite: a worker that ran a suite still has its modules
+    with context.Pool(args.workers, maxtasksperchild=1) as pool:
+        jobs = [(name, not args.reimport, 2 if args.verbose else 0) for name in args.lambdas]
+        results = list(pool.imap_unordered(_run, jobs))
+
+    results.sort(key=lambda r: args.lambdas.index(r['name']))
+    print(f"{'lambda':<26} {'tests':>6} {'failed':>7} {'skipped':>8} {'imports':>8} {'resets':>7} {'seconds':>8}")
+    for r in results:
+        print(f"{r['name']:<26} {r['run']:>6} {r['failures']:>7} {r['skipped']:>8} "
+              f"{r['imports']:>8} {r['resets']:>7} {r['seconds']:>8.2f}")
+    print(f"{'total':<26} {sum(r['run'] for r in results):>6} {sum(r['failures'] for r in results):>7} "
+          f"{sum(r['skipped'] for r in results):>8} {'':>8} {'':>7} {time.perf_counter() - start:>8.2f}")
+
+    for r in results:
+        if r['report']:
+            print(f"\n===== {r['name']}\n{r['report']}")
+
+    sys.exit(1 if any(r['failures'] for r in results) else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+#
+# Representative events for each lambda, built from its events/inbound.json.
+# Only paths that stay inside the lambda are listed here; the ones that call
+# AWS services need fakes and are exercised by the lambdas' own tests.
+#
+
+from copy import deepcopy
+
+from tools.lambda_loader import load_event
+
+RECORDING_KEY = "9ff01357-23c5-4611-9dd3-f05f9d654faa-/9ff01357-23c5-4611-9dd3-f05f9d654faa-0.wav"
+
+
+def _event(name, event_type, action_data=None, attributes=None, bridged=False):
+    e = load_event(name)
+    e['InvocationEventType'] = event_type
+    if action_data is not None:
+        e['ActionData'] = action_data
+    if attributes is not None:
+        e['CallDetails']['TransactionAttributes'] = attributes
+    if bridged:
+        # a second, outbound, leg as seen after CallAndBridge
+        leg = deepcopy(e['CallDetails']['Participants'][0])
+        leg['Direction'] = "Outbound"
+        leg['CallId'] = "6b2a6b3a-cd67-4bd3-9d3d-2ab8f1b5a2b7"
+        leg['ParticipantTag'] = "LEG-B"
+        e['CallDetails']['Participants'].append(leg)
+
+    return e
+
+
+def _recorded():
+    return {'Type': "RecordAudio",
+            'RecordingDestination': {'Type': "S3",
+                                     'BucketName': "fake-bucket",
+                                     'Key': RECORDING_KEY}}
+
+
+def sample_events(name):
+    e = lambda *args, **kwargs: _event(name, *args, **kwargs)
+
+    samples = {
+        'call-play-recording': [
+            ('NEW_INBOUND_CALL', e('NEW_INBOUND_CALL')),
+            ('HANGUP', e('HANGUP')),
+        ],
+        'call-me-back': [
+            ('NEW_INBOUND_CALL', e('NEW_INBOUND_CALL')),
+            ('CALL_ANSWERED', e('CALL_ANSWERED')),
+        ],
+        'call-and-bridge': [
+            ('NEW_INBOUND_CALL', e('NEW_INBOUND_CALL')),
+            ('ACTION_SUCCESSFUL/SpeakAndGetDigits',
+             e('ACTION_SUCCESSFUL', {'Type': "SpeakAndGetDigits", 'ReceivedDigits': "12125551212"})),
+            ('ACTION_SUCCESSFUL/CallAndBridge',
+             e('ACTION_SUCCESSFUL', {'Type': "CallAndBridge"}, bridged=True)),
+            ('DIGITS_RECEIVED',
+             e('DIGITS_RECEIVED', {'Type': "ReceivedDigits", 'ReceivedDigits': "1"}, bridged=True)),
+            ('HANGUP', e('HANGUP')),
+        ],
+        'call-lex-bot': [
+            ('NEW_INBOUND_CALL', e('NEW_INBOUND_CALL')),
+            ('ACTION_SUCCESSFUL', e('ACTION_SUCCESSFUL')),
+            ('ACTION_SUCCESSFUL/FallbackIntent',
+             e('ACTION_SUCCESSFUL', {'IntentResult': {'SessionState': {'Intent': {'Name': "FallbackIntent"}}}})),
+            ('HANGUP', e('HANGUP')),
+        ],
+        'call-make-recording': [
+            ('NEW_INBOUND_CALL', e('NEW_INBOUND_CALL')),
+            ('ACTION_SUCCESSFUL/new', e('ACTION_SUCCESSFUL', attributes={'state': "new"})),
+            ('ACTION_SUCCESSFUL/beeping', e('ACTION_SUCCESSFUL', attributes={'state': "beeping"})),
+            ('ACTION_SUCCESSFUL/recording',
+             e('ACTION_SUCCESSFUL', _recorded(), attributes={'state': "recording"})),
+            ('ACTION_SUCCESSFUL/playing', e('ACTION_SUCCESSFUL', attributes={'state': "playing"})),
+        ],
+        'call-transcribe-recording': [
+            ('NEW_INBOUND_CALL', e('NEW_INBOUND_CALL')),
+            ('ACTION_SUCCESSFUL/new', e('ACTION_SUCCESSFUL', attributes={'state': "new"})),
+            ('ACTION_SUCCESSFUL/beeping', e('ACTION_SUCCESSFUL', attributes={'state': "beeping"})),
+            ('ACTION_SUCCESSFUL/playing', e('ACTION_SUCCESSFUL', attributes={'state': "playing"})),
+            ('HANGUP', e('HANGUP')),
+        ],
+    }
+
+    return samples[name]
@@ -0,0 +1,339 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+#
+# In-process SIP media application call-flow simulator.
+#
+#   python3 -m tools.simulator [--calls 1] [--trace] [lambda ...]
+#
+# Starts each call from the lambda's events/inbound.json, plays the Actions
+# the handler returns against a simulated clock (Speak takes as long as the
+# words, RecordAudio as long as the caller talks, ...) and sends the event
+# the SMA would send next - ACTION_SUCCESSFUL with the last action's
+# ActionData, DIGITS_RECEIVED, HANGUP - carrying TransactionAttributes over,
+# until the call hangs up.  Calls placed with create_sip_media_application_call
+# are then run as outbound calls (NEW_OUTBOUND_CALL, CALL_ANSWERED, ...).
+# S3, Transcribe and Chime are the fakes in tools.fakes.
+#
+# Reports, per lambda: call legs, invocations, simulated call time, handler
+# CPU and wall time, and the AWS calls made.
+#
+
+import argparse
+from contextlib import redirect_stdout
+from copy import deepcopy
+import json
+import os
+import random
+import re
+import time
+import uuid
+
+from tools.fakes import FakeChime, FakeS3, FakeTranscribe, api_calls, install
+from tools.lambda_loader import LAMBDAS, load_event, load_lambda
+
+
+SIM_BUCKET = "sim-wav-files"
+
+_tags = re.compile(r'<[^>]+>')
+
+
+# What the person on the other end of the call does
+class Caller:
+    def __init__(self, digits="12125551212", toggle_digit="1", bot_intent="OrderFlowers",
+                 record_ms=5000, talk_ms=20000, bot_ms=15000, ring_ms=5000,
+                 digits_ms=4000, play_ms=1500, ms_per_word=400):
+        self.digits = digits
+        self.toggle_digit = toggle_digit
+        self.bot_intent = bot_intent
+        self.record_ms = record_ms
+        self.talk_ms = talk_ms
+        self.bot_ms = bot_ms
+        self.ring_ms = ring_ms
+        self.digits_ms = digits_ms
+        self.play_ms = play_ms
+        self.ms_per_word = ms_per_word
+
+    def speak_ms(self, text):
+        return len(_tags.sub(' ', text or '').split()) * self.ms_per_word
+
+
+class SimContext:
+    def __init__(self, timeout_ms):
+        self.timeout_ms = timeout_ms
+
+    def get_remaining_time_in_millis(self):
+        return self.timeout_ms
+
+
+class CallStats:
+    def __init__(self):
+        self.legs = 0
+        self.invocations = 0
+        self.sim_ms = 0
+        self.cpu_s = 0.0
+        self.wall_s = 0.0
+        self.truncated = False
+        self.trace = []
+        # (InvocationEventType, state on the way in, handler seconds)
+        self.samples = []
+
+    def add(self, other):
+        self.legs += other.legs
+        self.invocations += other.invocations
+        self.sim_ms += other.sim_ms
+        self.cpu_s += other.cpu_s
+        self.wall_s += other.wall_s
+        self.truncated = self.truncated or other.truncated
+        self.trace.extend(other.trace)
+        self.samples.extend(other.samples)
+
+
+class Simulator:
+    def __init__(self, name, caller=None, transcribe_ms=8000, max_invocations=100, max_legs=2,
+                 timeout_ms=60000):
+        os.environ.setdefault('WAVFILE_BUCKET', SIM_BUCKET)
+
+        self.name = name
+        self.caller = caller or Caller()
+        self.max_invocations = max_invocations
+        self.max_legs = max_legs
+        self.context = SimContext(timeout_ms)
+        self.now_ms = 0
+        # whatever the handlers log is discarded
+        self.devnull = open(os.devnull, 'w')
+
+        self.lam = load_lambda(name)
+        self.s3 = FakeS3()
+        self.transcribe = FakeTranscribe(self.s3, clock=lambda: self.now_ms / 1000, duration_ms=transcribe_ms)
+        self.chime = FakeChime()
+        install(self.lam, self.s3, self.transcribe, self.chime)
+
+    def api_calls(self):
+        return api_calls(self.s3, self.transcribe, self.chime)
+
+    #
+    # events
+    #
+    def inbound_event(self):
+        e = load_event(self.name)
+        e['CallDetails']['TransactionId'] = str(uuid.uuid4())
+        e['CallDetails']['Participants'][0]['CallId'] = str(uuid.uuid4())
+        e['CallDetails']['Participants'][0]['From'] = f"+1555{random.randrange(10 ** 7):07d}"
+        return e
+
+    def outbound_event(self, params):
+        e = load_event(self.name)
+        e['InvocationEventType'] = "NEW_OUTBOUND_CALL"
+        e['CallDetails']['TransactionId'] = str(uuid.uuid4())
+        e['CallDetails']['SipMediaApplicationId'] = params.get('SipMediaApplicationId')
+        e['CallDetails']['Participants'] = [{
+            'CallId': str(uuid.uuid4()),
+            'ParticipantTag': "LEG-A",
+            'To': params.get('ToPhoneNumber'),
+            'From': params.get('FromPhoneNumber'),
+            'Direction': "Outbound",
+            'StartTimeInMilliseconds': str(self.now_ms),
+        }]
+        return e
+
+    def next_event(self, e, event_type, action_data=None):
+        e = deepcopy(e)
+        e['Sequence'] = e.get('Sequence', 1) + 1
+        e['InvocationEventType'] = event_type
+        e.pop('ActionData', None)
+        if action_data is not None:
+            e['ActionData'] = action_data
+        return e
+
+    #
+    # actions
+    #
+
+    # Play one action against the clock and return its ActionData
+    def play(self, e, action):
+        kind = action.get('Type')
+        params = action.get('Parameters', {})
+        data = {'Type': kind, 'Parameters': params}
+        caller = self.caller
+
+        if kind == 'Pause':
+            self.now_ms += int(params.get('DurationInMilliseconds', 0))
+        elif kind == 'Speak':
+            self.now_ms += caller.speak_ms(params.get('Text'))
+        elif kind == 'PlayAudio':
+            self.now_ms += caller.play_ms * int(params.get('Repeat', 1))
+        elif kind == 'SpeakAndGetDigits':
+            self.now_ms += caller.speak_ms(params.get('SpeechParameters', {}).get('Text')) + caller.digits_ms
+            data['ReceivedDigits'] = caller.digits
+        elif kind == 'RecordAudio':
+            self.now_ms += caller.record_ms
+            destination = params.get('RecordingDestination', {})
+            bucket = destination.get('BucketName') or SIM_BUCKET
+            key = f"{destination.get('Prefix', '')}{uuid.uuid4()}.wav"
+            self.s3.objects[(bucket, key)] = b'RIFF' + key.encode()
+            data['RecordingDestination'] = {'Type': "S3", 'BucketName': bucket, 'Key': key}
+        elif kind == 'CallAndBridge':
+            self.now_ms += caller.ring_ms
+            endpoint = (params.get('Endpoints') or [{}])[0]
+            e['CallDetails']['Participants'].append({
+                'CallId': str(uuid.uuid4()),
+                'ParticipantTag': "LEG-B",
+                'To': endpoint.get('Uri'),
+                'From': params.get('CallerIdNumber'),
+                'Direction': "Outbound",
+                'StartTimeInMilliseconds': str(self.now_ms),
+            })
+        elif kind == 'StartBotConversation':
+            self.now_ms += caller.bot_ms
+            data['IntentResult'] = {'SessionId': e['CallDetails']['TransactionId'],
+                                    'SessionState': {'Intent': {'Name': caller.bot_intent, 'State': "Fulfilled"}}}
+
+        return data
+
+    def invoke(self, e, stats, trace):
+        # the SMA sends JSON, never objects shared with a previous response
+        event = json.loads(json.dumps(e))
+
+        with redirect_stdout(self.devnull):
+            cpu = time.process_time()
+            wall = time.perf_counter()
+            r = self.lam.handler(event, self.context)
+            wall = time.perf_counter() - wall
+            stats.cpu_s += time.process_time() - cpu
+
+        stats.wall_s += wall
+        stats.invocations += 1
+        stats.samples.append((e['InvocationEventType'],
+                              e['CallDetails'].get('TransactionAttributes', {}).get('state'), wall))
+        r = json.loads(json.dumps(r))
+        if trace:
+            stats.trace.append((self.now_ms, e['InvocationEventType'],
+                                [a.get('Type') for a in r.get('Actions', [])],
+                                r.get('TransactionAttributes', {}).get('state')))
+        return r
+
+    # Run one call leg from its first event until it hangs up
+    def run_leg(self, e, trace=False):
+        stats = CallStats()
+        stats.legs = 1
+        start_ms = self.now_ms
+        listening = False
+        digits_sent = False
+
+        while True:
+            if stats.invocations >= self.max_invocations:
+                stats.truncated = True
+                break
+
+            r = self.invoke(e, stats, trace)
+            event_type = e['InvocationEventType']
+            if 'TransactionAttributes' in r:
+                e['CallDetails']['TransactionAttributes'] = r['TransactionAttributes']
+
+            if event_type == 'HANGUP':
+                break
+
+            if event_type == 'NEW_OUTBOUND_CALL':
+                self.now_ms += self.caller.ring_ms
+                e = self.next_event(e, "CALL_ANSWERED")
+                continue
+
+            actions = r.get('Actions', [])
+            if not actions:
+                # nothing left to do: the parties talk, press a digit if
+                # something is listening for one, and then hang up
+                bridged = len(e['CallDetails']['Participants']) > 1
+                if listening and not digits_sent:
+                    self.now_ms += self.caller.talk_ms // 2
+                    digits_sent = True
+                    e = self.next_event(e, "DIGITS_RECEIVED",
+                                        {'Type': "ReceivedDigits", 'ReceivedDigits': self.caller.toggle_digit})
+                else:
+                    self.now_ms += (self.caller.talk_ms // 2) if bridged else 0
+                    e = self.next_event(e, "HANGUP", {'Type': "Hangup", 'Parameters': {'ParticipantTag': "LEG-A"}})
+                continue
+
+            data = None
+            for action in actions:
+                data = self.play(e, action)
+                listening = listening or action.get('Type') == 'ReceiveDigits'
+                if action.get('Type') == 'Hangup':
+                    break
+
+            if data['Type'] == 'Hangup':
+                e = self.next_event(e, "HANGUP", data)
+            else:
+                e = self.next_event(e, "ACTION_SUCCESSFUL", data)
+
+        stats.sim_ms = self.now_ms - start_ms
+        return stats
+
+    # Run an inbound call, and any calls it places, to completion
+    def run_call(self, trace=False):
+        total = CallStats()
+        placed = len(self.chime.created)
+        legs = [self.inbound_event()]
+        while legs:
+            if total.legs >= self.max_legs:
+                total.truncated = True
+                break
+
+            stats = self.run_leg(legs.pop(0), trace)
+            total.add(stats)
+
+            legs.extend(self.outbound_event(p) for p in self.chime.created[placed:])
+            placed = len(self.chime.created)
+
+        return total
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-c', '--calls', type=int, default=1, help="calls per lambda")
+    parser.add_argument('--transcribe-ms', type=int, default=8000, help="how long the fake Transcribe jobs take")
+    parser.add_argument('--max-legs', type=int, default=2,
+                        help="stop after this many call legs (call-me-back calls back on every hangup)")
+    parser.add_argument('--trace', action='store_true', help="print every invocation")
+    parser.add_argument('lambdas', nargs='*', default=LAMBDAS)
+    args = parser.parse_args()
+
+    rows = []
+    for name in args.lambdas:
+        sim = Simulator(name, transcribe_ms=args.transcribe_ms, max_legs=args.max_legs)
+        total = CallStats()
+        for _ in range(args.calls):
+            stats = sim.run_call(trace=args.trace)
+            total.add(stats)
+            if args.trace:
+                print(f"\n{name}")
+                for at_ms, event_type, actions, state in stats.trace:
+                    print(f"  {at_ms / 1000:>7.1f}s  {event_type:<18} {state or '':<13} {', '.join(actions)}")
+
+        calls = ', '.join(f"{k}={v}" for k, v in sorted(sim.api_calls().items()))
+        rows.append((name, total, calls))
+
+    n = args.calls
+    print(f"\n{'lambda':<26} {'legs':>5} {'invocations':>11} {'call s':>7} {'cpu ms':>7} {'wall ms':>8}  aws calls (all {n} calls)")
+    for name, total, calls in rows:
+        print(f"{name:<26} {total.legs / n:>5.1f} {total.invocations / n:>11.1f} {total.sim_ms / n / 1000:>7.1f} "
+              f"{total.cpu_s / n * 1000:>7.2f} {total.wall_s / n * 1000:>8.2f}  "
+              f"{calls}{'  (truncated)' if total.truncated else ''}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+#
+# Soak benchmark: drive a lambda's handler() many times in one process, the
+# way a warm container sees it, and check that the response size, latency
+# and resident memory stay flat.
+#
+#   python3 -m tools.soak [-n 100000] [lambda ...]
+#
+# Exits non-zero if the response size changes across invocations.
+#
+
+import argparse
+from contextlib import redirect_stdout
+import json
+import os
+import resource
+import time
+
+from tools.lambda_loader import load_event, load_lambda
+
+
+# events that exercise each lambda without calling out to AWS
+soak_events = {
+    'call-me-back': ['NEW_INBOUND_CALL', 'CALL_ANSWERED'],
+    'call-play-recording': ['NEW_INBOUND_CALL'],
+}
+
+
+def rss_kb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except OSError:
+        # not linux - fall back to the high-water mark
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def soak(name, invocations, checkpoints=10):
+    handler = load_lambda(name).handler
+
+    events = []
+    for event_type in soak_events.get(name, ['NEW_INBOUND_CALL']):
+        event = load_event(name)
+        event['InvocationEventType'] = event_type
+        events.append(event)
+
+    window = max(1, invocations // checkpoints)
+    sizes = {}
+    rows = []
+
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        elapsed = 0.0
+        for i in range(invocations):
+            event = events[i % len(events)]
+
+            start = time.perf_counter()
+            r = handler(event, None)
+            body = json.dumps(r)
+            elapsed += time.perf_counter() - start
+
+            sizes.setdefault(event['InvocationEventType'], set()).add(len(body))
+
+            if (i + 1) % window == 0:
+                rows.append((i + 1, elapsed / window * 1e6, rss_kb(),
+                             {k: max(v) for k, v in sizes.items()}))
+                elapsed = 0.0
+
+    print(f"\n{name}")
+    print(f"{'invocations':>12} {'latency us':>11} {'rss KiB':>9}  response bytes")
+    for count, latency, rss, size in rows:
+        print(f"{count:>12} {latency:>11.2f} {rss:>9}  {size}")
+
+    constant = all(len(v) == 1 for v in sizes.values())
+    print(f"response size {'constant' if constant else 'GROWING'}, "
+          f"latency x{rows[-1][1] / rows[0][1]:.2f}, "
+          f"rss {rows[-1][2] - rows[0][2]:+d} KiB first to last checkpoint")
+
+    return constant
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--invocations', type=int, default=100000)
+    parser.add_argument('lambdas', nargs='*', default=sorted(soak_events))
+    args = parser.parse_args()
+
+    ok = [soak(name, args.invocations) for name in args.lambdas]
+    raise SystemExit(0 if all(ok) else 1)
+
+
+if __name__ == '__main__':
+    main()
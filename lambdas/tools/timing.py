@@ -0,0 +1,135 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+#
+# Per-invocation timing of every lambda's handler() over its sample events.
+#
+#   python3 -m tools.timing [-n 5000] [--metrics | --schema] [--routes] [lambda ...]
+#
+# --metrics times every event with sma_metrics off and on, alternating the
+# repeats so drift hits both equally, and reports the overhead of the EMF line.
+# --schema does the same with sma_schema off and strict, for the cost of
+# validating each event and response.  --routes adds each lambda's routing
+# table stats (sma_router): the hits on every route over the whole run, and
+# its handler time percentiles, to the power of two microseconds.
+#
+# Anything the handlers print or log is discarded, but still paid for: like
+# the Lambda runtime, the root logger gets a handler that writes to stdout.
+#
+
+import argparse
+from contextlib import redirect_stdout
+import logging
+import os
+import timeit
+
+from tools.lambda_loader import LAMBDAS, load_lambda
+from tools.sample_events import sample_events
+
+
+# Each comparison turns a feature off and on in a loaded lambda
+def _metrics(lam, on):
+    lam.sma_metrics.enabled = on
+
+
+def _schema(lam, on):
+    lam.sma_schema.mode = 'strict' if on else 'off'
+
+
+# the stats of a loaded lambda's router, or flow
+def route_stats(lam):
+    router = getattr(lam, 'router', None) or getattr(lam, 'flow', None)
+    return router.stats() if router is not None else {}
+
+
+def time_lambda(name, number, toggle=None, routes=None):
+    lam = load_lambda(name)
+    handler = lam.handler
+
+    def best(event):
+        return min(timeit.repeat(lambda: handler(event, None), number=number, repeat=5)) / number * 1e6
+
+    rows = []
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        runtime_handler = logging.StreamHandler(devnull)
+        logging.getLogger().addHandler(runtime_handler)
+        enabled, mode = lam.sma_metrics.enabled, lam.sma_schema.mode
+        try:
+            for label, event in sample_events(name):
+                if toggle is None:
+                    rows.append((label, best(event)))
+                    continue
+
+                off, on = [], []
+                for _ in range(3):
+                    toggle(lam, False)
+                    off.append(best(event))
+                    toggle(lam, True)
+                    on.append(best(event))
+                rows.append((label, min(off), min(on)))
+        finally:
+            lam.sma_metrics.enabled, lam.sma_schema.mode = enabled, mode
+            logging.getLogger().removeHandler(runtime_handler)
+
+    if routes is not None:
+        routes.update((f"{name}/{route}", stats) for route, stats in route_stats(lam).items())
+
+    return rows
+
+
+def print_routes(routes):
+    print(f"\n{'route':<65} {'hits':>9} {'p50 us':>9} {'p99 us':>9}")
+    for route, stats in routes.items():
+        print(f"{route:<65} {stats['hits']:>9} {stats['p50_us']:>9} {stats['p99_us']:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--number', type=int, default=5000)
+    toggles = parser.add_mutually_exclusive_group()
+    toggles.add_argument('--metrics', dest='toggle', action='store_const', const=_metrics,
+                         help="compare sma_metrics off and on")
+    toggles.add_argument('--schema', dest='toggle', action='store_const', const=_schema,
+                         help="compare sma_schema off and strict")
+    parser.add_argument('--routes', action='store_true', help="print the routing table stats after the run")
+    parser.add_argument('lambdas', nargs='*', default=LAMBDAS)
+    args = parser.parse_args()
+    routes = {} if args.routes else None
+
+    if args.toggle is None:
+        print(f"{'lambda':<26} {'event':<38} {'us/call':>9}")
+        for name in args.lambdas:
+            for label, us in time_lambda(name, args.number, routes=routes):
+                print(f"{name:<26} {label:<38} {us:>9.2f}")
+        if routes is not None:
+            print_routes(routes)
+        return
+
+    total_off = total_on = 0
+    print(f"{'lambda':<26} {'event':<38} {'off us':>9} {'on us':>9} {'overhead':>9}")
+    for name in args.lambdas:
+        for label, off, on in time_lambda(name, args.number, args.toggle, routes):
+            total_off += off
+            total_on += on
+            print(f"{name:<26} {label:<38} {off:>9.2f} {on:>9.2f} {(on - off) / off:>9.1%}")
+    print(f"{'total':<65} {total_off:>9.2f} {total_on:>9.2f} {(total_on - total_off) / total_off:>9.1%}")
+    if routes is not None:
+        print_routes(routes)
+
+
+if __name__ == '__main__':
+    main()